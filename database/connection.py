@@ -1,10 +1,25 @@
 """
 EstablishDBConnection: A class to easblish a connection to MongoDB.
 
+MongoClient instances are shared through a process-wide registry keyed by process id, so
+every caller in a process draws from one connection pool, and every worker process gets
+its own pool (MongoClient must not be shared across a fork). The shared client must not be
+closed by callers. Every client is created with a SlowQueryLogger, which logs slow
+commands with their explain plans.
+
+The connection is configured with the [MongoDB] section of configuration.ini:
+    [MongoDB]
+    connection_string = mongodb://localhost:27017
+    max_pool_size = 50
+    min_pool_size = 0
+    server_selection_timeout_ms = 5000
+    connect_timeout_ms = 5000
+    socket_timeout_ms = 30000
+
 Methods:
 --------
 establish_connection():
-    Attempts to connect to the MongoDB database and logs the connection status.
+    Returns the shared MongoClient of this process and logs the connection status.
 
 Example Usage:
 --------------
@@ -16,42 +31,98 @@ else:
     print("Failed to connect to the database.")
 """
 
+import os
+import logging
+import threading
 import pymongo
 from pymongo.errors import ConnectionFailure
-from ocrr_logger.ocrrlogger import OCRRLogger
+from helper.configuration import read_configuration
+from database.slow_queries import SlowQueryLogger
+
+# Process id -> shared MongoClient
+_db_clients = {}
+_db_clients_lock = threading.Lock()
+
+def _get_connection_settings() -> tuple:
+    # Read the connection string and MongoClient options from configuration.ini
+    config = read_configuration()
+    connection_string = config.get('MongoDB', 'connection_string', fallback='mongodb://localhost:27017') or 'mongodb://localhost:27017'
+    options = {
+        "maxPoolSize": config.getint('MongoDB', 'max_pool_size', fallback=50),
+        "minPoolSize": config.getint('MongoDB', 'min_pool_size', fallback=0),
+        "serverSelectionTimeoutMS": config.getint('MongoDB', 'server_selection_timeout_ms', fallback=5000),
+        "connectTimeoutMS": config.getint('MongoDB', 'connect_timeout_ms', fallback=5000),
+        "socketTimeoutMS": config.getint('MongoDB', 'socket_timeout_ms', fallback=30000)
+    }
+    return connection_string, options
+
+def get_db_client() -> pymongo.MongoClient:
+    """
+    Return the MongoClient of this process, creating and pinging it on first use.
+
+    :raises ConnectionFailure: If the server cannot be reached when the client is created.
+    """
+    pid = os.getpid()
+    client = _db_clients.get(pid)
+    if client is None:
+        with _db_clients_lock:
+            client = _db_clients.get(pid)
+            if client is None:
+                connection_string, options = _get_connection_settings()
+                slow_query_logger = SlowQueryLogger()
+                client = pymongo.MongoClient(connection_string, event_listeners=[slow_query_logger], **options)
+                slow_query_logger.bind_client(client)
+                # Ping the MongoDB server to verify the connection
+                client.admin.command('ping')
+                # Clients inherited from a parent process must not be used (or closed) here
+                _db_clients.clear()
+                _db_clients[pid] = client
+    return client
+
+def check_db_health(client: pymongo.MongoClient = None) -> bool:
+    """
+    Ping MongoDB with the shared client of this process.
+
+    :return: True if the server answered, False otherwise.
+    """
+    try:
+        client = client if client is not None else get_db_client()
+        client.admin.command('ping')
+        return True
+    except Exception as e:
+        logging.getLogger('OCRR').error(f"| MongoDB health check failed: {e}")
+        return False
+
+def close_db_client() -> None:
+    """
+    Close the shared client of this process, e.g. when the engine shuts down.
+    """
+    with _db_clients_lock:
+        client = _db_clients.pop(os.getpid(), None)
+    if client is not None:
+        client.close()
 
 class EstablishDBConnection:
     def __init__(self):
         """
-        Initializes the EstablishDBConnection class by setting up the logger and the MongoDB connection string.
+        Initializes the EstablishDBConnection class with the logger configured by the engine or worker process.
         """
-        # Set up the logger using the OCRRLogger configuration
-        # Instantiate the OCRRLogger class
-        logger_config = OCRRLogger()
-
-        # Get the configured logger instance
-        self.logger = logger_config.configure_logger() 
-
-        # MongoDB connection string
-        self.connection_string = "mongodb://localhost:27017"
+        self.logger = logging.getLogger('OCRR')
 
     def establish_connection(self):
         """
-        Establishes a connection to the MongoDB database.
+        Returns the shared MongoDB client of this process.
 
         Returns:
         --------
         pymongo.MongoClient or None
-            Returns a MongoClient instance if the connection is successful, otherwise returns None.
+            Returns the shared MongoClient instance if the connection is successful, otherwise returns None.
         """
         try:
-            # Attempt to create a MongoClient instance and ping the database to ensure connection is established
-            client = pymongo.MongoClient(self.connection_string)
-
-            # Ping the MongoDB server to verify the connection
-            client.admin.command('ping')
-
-            self.logger.info("| Successfully connected to MongoDB")
+            is_new_client = os.getpid() not in _db_clients
+            client = get_db_client()
+            if is_new_client:
+                self.logger.info("| Successfully connected to MongoDB")
             return client
         except ConnectionFailure as e:
             # Log an error message if connection to MongoDB fails due to a connection failure
@@ -60,4 +131,4 @@ class EstablishDBConnection:
         except Exception as e:
             # Log an error message if an unexpected exception occurs
             self.logger.error(f"| Failed to connect to MongoDB: {e}")
-            return None
\ No newline at end of file
+            return None
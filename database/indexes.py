@@ -0,0 +1,58 @@
+"""
+Index provisioning for the hot MongoDB query paths of the engine.
+
+The engine looks up upload.fileDetails by 'status' and 'taskId', upload.webhooks by
+'clientId' and ocrrworkspace.ocrr by 'taskId', none of which were indexed. On a
+fileDetails collection with millions of historical rows every claim was a collection
+scan. provision_indexes() creates the required indexes at startup; create_index is a
+no-op for an index which already exists, so it is safe to run on every start and from
+every node.
+
+The claim query only ever touches the active statuses, so it is served by a partial index
+covering just 'IN_PROGRESS' and 'IN_QUEUE' documents, which stays small no matter how many
+completed documents pile up. Partial filters with $in need MongoDB 6.0 or newer; on an
+older server the partial index is skipped and the plain 'status' index is used instead.
+
+Example usage:
+    provision_indexes(db_client, logger)
+"""
+
+import logging
+import pymongo
+from pymongo.errors import OperationFailure
+
+# Statuses of documents which can still be claimed or are being processed
+ACTIVE_STATUSES = ["IN_PROGRESS", "IN_QUEUE"]
+
+# (database, collection, keys, options)
+REQUIRED_INDEXES = [
+    ("upload", "fileDetails", [("taskId", pymongo.ASCENDING)], {"name": "taskId_1"}),
+    ("upload", "fileDetails", [("status", pymongo.ASCENDING)], {"name": "status_1"}),
+    ("upload", "fileDetails", [("status", pymongo.ASCENDING), ("leaseExpiresAt", pymongo.ASCENDING), ("nodeId", pymongo.ASCENDING)],
+     {"name": "active_status_lease", "partialFilterExpression": {"status": {"$in": ACTIVE_STATUSES}}}),
+    ("upload", "webhooks", [("clientId", pymongo.ASCENDING)], {"name": "clientId_1"}),
+    ("ocrrworkspace", "ocrr", [("taskId", pymongo.ASCENDING)], {"name": "taskId_1"}),
+    ("ocrrworkspace", "ocrr", [("nodeId", pymongo.ASCENDING)], {"name": "nodeId_1"}),
+    ("ocrrworkspace", "webhook_outbox", [("status", pymongo.ASCENDING), ("nextAttemptAt", pymongo.ASCENDING)], {"name": "status_nextAttemptAt"})
+]
+
+def provision_indexes(db_client: pymongo.MongoClient, logger: object = None) -> int:
+    """
+    Create the indexes required by the engine if they do not exist yet.
+
+    :param db_client: MongoClient to create the indexes with.
+    :return: Number of indexes which are in place.
+    """
+    logger = logger if logger is not None else logging.getLogger('OCRR')
+    provisioned = 0
+    for database, collection, keys, options in REQUIRED_INDEXES:
+        try:
+            db_client[database][collection].create_index(keys, **options)
+            provisioned += 1
+        except OperationFailure as e:
+            # An index with the same name or keys but other options already exists; it is left alone
+            logger.warning(f"| Index '{options['name']}' on {database}.{collection} not created: {e}")
+        except Exception as e:
+            logger.error(f"| Failed to create index '{options['name']}' on {database}.{collection}: {e}")
+    logger.info(f"| {provisioned} of {len(REQUIRED_INDEXES)} MongoDB indexes in place.")
+    return provisioned
@@ -0,0 +1,114 @@
+"""
+SlowQueryLogger: Logs slow MongoDB commands together with their explain plans.
+
+The listener is registered on the shared MongoClient of every process. It remembers the
+read and write commands the engine sends and, when one of them takes longer than the
+configured threshold, logs it as a warning. The explain plan is fetched on a daemon
+thread so the caller is never blocked by it; explain requests are dropped instead of
+queued up when the thread falls behind. A plan showing 'COLLSCAN' instead of 'IXSCAN'
+points at a missing index.
+
+Slow query logging is configured with the [SlowQueries] section of configuration.ini:
+    [SlowQueries]
+    threshold_ms = 100
+    explain = on
+
+Example usage:
+    client = pymongo.MongoClient(connection_string, event_listeners=[SlowQueryLogger()])
+"""
+
+import queue
+import logging
+import threading
+from pymongo import monitoring
+from helper.configuration import read_configuration
+
+# Commands which are timed and can be explained
+EXPLAINABLE_COMMANDS = {"find", "findAndModify", "update", "delete", "count", "distinct", "aggregate"}
+
+# Fields added by the driver which must not be passed to explain
+DRIVER_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+class SlowQueryLogger(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float = None, explain: bool = None, logger: object = None) -> None:
+        config = read_configuration()
+        self.threshold_ms = threshold_ms if threshold_ms is not None else config.getfloat('SlowQueries', 'threshold_ms', fallback=100)
+        self.explain = explain if explain is not None else config.get('SlowQueries', 'explain', fallback='on').strip().lower() == 'on'
+        self.logger = logger if logger is not None else logging.getLogger('OCRR')
+
+        # Request id -> (database, command) of commands in flight
+        self._commands = {}
+        self._commands_lock = threading.Lock()
+
+        # Slow commands waiting for their explain plan
+        self._explain_queue = queue.Queue(maxsize=32)
+        self._explain_thread = None
+        # Resolved lazily; the listener is created before the client it listens to
+        self._client = None
+
+    def bind_client(self, client: object) -> None:
+        """
+        Set the client used to explain slow commands.
+        """
+        self._client = client
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name not in EXPLAINABLE_COMMANDS:
+            return
+        # Change streams are long-running by design
+        if event.command_name == "aggregate" and any("$changeStream" in stage for stage in event.command.get("pipeline", [])):
+            return
+        with self._commands_lock:
+            self._commands[event.request_id] = (event.database_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        with self._commands_lock:
+            command = self._commands.pop(event.request_id, None)
+        if command is None:
+            return
+        duration_ms = event.duration_micros / 1000.0
+        if duration_ms >= self.threshold_ms:
+            self._log_slow_command(command[0], command[1], event.command_name, duration_ms)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        with self._commands_lock:
+            self._commands.pop(event.request_id, None)
+
+    def _log_slow_command(self, database: str, command: dict, command_name: str, duration_ms: float) -> None:
+        collection = command.get(command_name)
+        self.logger.warning(f"| Slow MongoDB {command_name} on {database}.{collection}: {duration_ms:.1f} ms")
+        if not self.explain or self._client is None:
+            return
+        explain_command = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        try:
+            self._explain_queue.put_nowait((database, command_name, collection, explain_command))
+        except queue.Full:
+            return
+        self._start_explain_thread()
+
+    def _start_explain_thread(self) -> None:
+        if self._explain_thread is None or not self._explain_thread.is_alive():
+            self._explain_thread = threading.Thread(target=self._explain_loop, name="OCRRSlowQueryExplain", daemon=True)
+            self._explain_thread.start()
+
+    def _explain_loop(self) -> None:
+        while True:
+            database, command_name, collection, command = self._explain_queue.get()
+            try:
+                plan = self._client[database].command({"explain": command, "verbosity": "queryPlanner"})
+                winning_plan = plan.get("queryPlanner", {}).get("winningPlan", {})
+                self.logger.warning(f"| Explain plan of slow {command_name} on {database}.{collection}: {self._summarize_plan(winning_plan)} | {winning_plan}")
+            except Exception as e:
+                self.logger.error(f"| Failed to explain slow {command_name} on {database}.{collection}: {e}")
+
+    @staticmethod
+    def _summarize_plan(plan: dict) -> str:
+        # Stage chain of the winning plan, e.g. 'FETCH <- IXSCAN(status_1)'
+        stages = []
+        while plan:
+            stage = plan.get("stage", "?")
+            if plan.get("indexName"):
+                stage = f"{stage}({plan['indexName']})"
+            stages.append(stage)
+            plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0] or plan.get("queryPlan")
+        return " <- ".join(stages)
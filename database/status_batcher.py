@@ -0,0 +1,162 @@
+"""
+StatusBatcher: Write-behind batching of the per-document MongoDB writes.
+
+Every claimed document used to cost separate round trips for its 'ocrr' workspace record
+and, for invalid documents, its status. The poller hands these writes, and the webhook
+outbox its entries, to the batcher, which collects them per collection and sends them as
+one bulk_write when max_batch_size writes are pending or when the oldest pending write is
+max_delay_ms old, whichever comes first, so a write is never delayed by more than
+max_delay_ms. The batched writes are independent of each other, so they are sent
+unordered: a rejected write does not stop the others. Callers which hand work to another
+process must flush() first, so that the other process sees the writes.
+
+Writes still pending when a process is killed are lost, so the worker flushes the terminal
+REDACTED/REJECTED status of a document and the removal of its 'ocrr' record together,
+synchronously, before it takes the next document: a lost terminal write would make the
+document be processed again.
+
+The batcher is configured with the [Batching] section of configuration.ini:
+    [Batching]
+    status_batch_size = 100
+    status_max_delay_ms = 500
+
+Example usage:
+    status_batcher = get_status_batcher()
+    status_batcher.insert_one('ocrrworkspace', 'ocrr', document_info)
+    status_batcher.update_one('upload', 'fileDetails', {"taskId": taskid}, {"$set": {"status": "INVALID"}})
+    status_batcher.flush()
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from helper.configuration import read_configuration
+from database.connection import get_db_client
+
+class StatusBatcher:
+    def __init__(self, max_batch_size: int = None, max_delay_ms: float = None, db_client: object = None, logger: object = None) -> None:
+        config = read_configuration()
+        self.max_batch_size = max_batch_size if max_batch_size else config.getint('Batching', 'status_batch_size', fallback=100)
+        self.max_delay_ms = max_delay_ms if max_delay_ms else config.getfloat('Batching', 'status_max_delay_ms', fallback=500)
+        self.db_client = db_client
+        self.logger = logger if logger is not None else logging.getLogger('OCRR')
+
+        # (database, collection) -> pending operations in submission order
+        self._pending = OrderedDict()
+        self._pending_count = 0
+        self._oldest_pending = None
+        self._pending_lock = threading.Lock()
+        # Serializes flushes
+        self._flush_lock = threading.Lock()
+
+        self._flush_event = threading.Event()
+        self._flusher_thread = None
+
+    def insert_one(self, database: str, collection: str, document: dict) -> None:
+        self._add(database, collection, InsertOne(document))
+
+    def update_one(self, database: str, collection: str, filter: dict, update: dict, upsert: bool = False) -> None:
+        self._add(database, collection, UpdateOne(filter, update, upsert=upsert))
+
+    def delete_one(self, database: str, collection: str, filter: dict) -> None:
+        self._add(database, collection, DeleteOne(filter))
+
+    def _add(self, database: str, collection: str, operation: object) -> None:
+        with self._pending_lock:
+            self._pending.setdefault((database, collection), []).append(operation)
+            self._pending_count += 1
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            batch_full = self._pending_count >= self.max_batch_size
+        self._start_flusher()
+        if batch_full:
+            self.flush()
+        else:
+            self._flush_event.set()
+
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    def flush(self) -> int:
+        """
+        Write all pending operations, one bulk_write per collection.
+
+        :return: Number of operations written.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, OrderedDict()
+                self._pending_count = 0
+                self._oldest_pending = None
+            written = 0
+            for (database, collection), operations in pending.items():
+                written += self._bulk_write(database, collection, operations)
+            return written
+
+    def _bulk_write(self, database: str, collection: str, operations: list) -> int:
+        try:
+            db_client = self.db_client if self.db_client is not None else get_db_client()
+            # Unordered: one rejected write must not abort the writes of unrelated documents
+            result = db_client[database][collection].bulk_write(operations, ordered=False)
+            self.logger.debug(f"| Flushed {len(operations)} writes to {database}.{collection}")
+            return result.inserted_count + result.modified_count + result.deleted_count + result.upserted_count
+        except BulkWriteError as e:
+            # Rejected writes (e.g. duplicate keys) cannot succeed on retry
+            self.logger.error(f"| Failed {len(e.details.get('writeErrors', []))} of {len(operations)} batched writes to {database}.{collection}: {e.details.get('writeErrors', [])[:1]}")
+            return e.details.get('nInserted', 0) + e.details.get('nModified', 0) + e.details.get('nRemoved', 0)
+        except PyMongoError as e:
+            # Connection errors: put the batch back in front of newer writes and retry on the next flush
+            self.logger.error(f"| Failed to flush {len(operations)} writes to {database}.{collection}, retrying: {e}")
+            with self._pending_lock:
+                self._pending[(database, collection)] = operations + self._pending.get((database, collection), [])
+                self._pending.move_to_end((database, collection), last=False)
+                self._pending_count += len(operations)
+                # Wait a full delay before the retry
+                self._oldest_pending = time.monotonic()
+            self._flush_event.set()
+            return 0
+
+    def _start_flusher(self) -> None:
+        if self._flusher_thread is None or not self._flusher_thread.is_alive():
+            with self._pending_lock:
+                if self._flusher_thread is None or not self._flusher_thread.is_alive():
+                    self._flusher_thread = threading.Thread(target=self._flusher_loop, name="OCRRStatusBatcher", daemon=True)
+                    self._flusher_thread.start()
+
+    def _flusher_loop(self) -> None:
+        # Flush when the oldest pending write reaches max_delay_ms
+        max_delay = self.max_delay_ms / 1000.0
+        while True:
+            self._flush_event.wait()
+            self._flush_event.clear()
+            while self._oldest_pending is not None:
+                remaining = max_delay - (time.monotonic() - self._oldest_pending)
+                if remaining > 0:
+                    time.sleep(remaining)
+                    continue
+                try:
+                    self.flush()
+                except Exception as e:
+                    self.logger.error(f"| Failed to flush batched writes: {e}")
+                    time.sleep(max_delay)
+
+_status_batcher = None
+_status_batcher_pid = None
+_status_batcher_lock = threading.Lock()
+
+def get_status_batcher() -> StatusBatcher:
+    """
+    Return the StatusBatcher of this process.
+    """
+    global _status_batcher, _status_batcher_pid
+    # The flusher thread and pending writes of a parent process are not inherited
+    if _status_batcher_pid != os.getpid():
+        with _status_batcher_lock:
+            if _status_batcher_pid != os.getpid():
+                _status_batcher = StatusBatcher()
+                _status_batcher_pid = os.getpid()
+    return _status_batcher
@@ -0,0 +1,274 @@
+"""
+TaskLease: Atomic, lease-based claiming of fileDetails documents.
+
+Several engine nodes can share one MongoDB. A node claims an 'IN_PROGRESS' document with a
+single find_one_and_update that moves it to 'IN_QUEUE' and records the claiming node and
+worker together with a lease expiry, so only one node can win the claim. The claiming node
+keeps its leases alive with a heartbeat; when a node dies its leases expire and any other
+node reclaims the documents. On startup a node only recovers its own stale leases, and when a worker process
+dies the documents it was processing are released for another claim.
+
+The heartbeat only renews the leases of documents the node still holds, as reported by the
+held_documents callback: documents waiting in the scheduler or the worker queue, and
+documents of live worker processes. A document lost inside the node expires and is
+reclaimed. Every claim counts an attempt; a document which was claimed max_attempts times
+without reaching a final status (e.g. because it crashes its worker) is REJECTED instead
+of being released or reclaimed again. The final status write removes the lease fields and
+the attempts (FINAL_UNSET_FIELDS).
+
+Lease fields stored on fileDetails documents:
+    nodeId          node which claimed the document
+    workerId        node id and pid of the process which claimed or is processing it
+    leaseExpiresAt  the document may be reclaimed by any node after this time
+    claimedAt       time of the claim
+    processingPid   pid of the worker process which is processing it
+    claimToken      id of the batch claim which claimed it
+    attempts        number of claims of the document, kept across releases until the final status
+
+The lease is configured with the [Lease] section of configuration.ini:
+    [Lease]
+    node_id =
+    duration_seconds = 120
+    heartbeat_seconds = 30
+    max_attempts = 3
+
+Example usage:
+    task_lease = TaskLease(db_client['upload']['fileDetails'])
+    task_lease.recover_node_leases()
+    task_lease.held_documents = lambda: (scheduler.held_task_ids(), worker_pool.live_pids())
+    task_lease.start_heartbeat()
+    documents = task_lease.claim_batch(50)
+"""
+
+import os
+import uuid
+import socket
+import logging
+import datetime
+import threading
+from pymongo import ReturnDocument
+from helper.configuration import read_configuration
+
+# Fields describing the lease of a claimed document
+LEASE_FIELDS = {"nodeId": "", "workerId": "", "leaseExpiresAt": "", "claimedAt": "", "processingPid": "", "claimToken": ""}
+# Removed when a document reaches a final status, so that a document set back to 'IN_PROGRESS' gets fresh attempts
+FINAL_UNSET_FIELDS = {**LEASE_FIELDS, "attempts": ""}
+
+def get_node_id() -> str:
+    """
+    Return the id of this engine node: [Lease] node_id, or the host name if unset.
+    """
+    config = read_configuration()
+    node_id = config.get('Lease', 'node_id', fallback='')
+    return node_id.strip() if node_id and node_id.strip() else socket.gethostname()
+
+class TaskLease:
+    def __init__(self, collection_filedetails: object, node_id: str = None, lease_seconds: float = None, heartbeat_seconds: float = None, logger: object = None) -> None:
+        config = read_configuration()
+        self.collection_filedetails = collection_filedetails
+        self.node_id = node_id if node_id else get_node_id()
+        self.lease_seconds = lease_seconds if lease_seconds else config.getfloat('Lease', 'duration_seconds', fallback=120)
+        self.heartbeat_seconds = heartbeat_seconds if heartbeat_seconds else config.getfloat('Lease', 'heartbeat_seconds', fallback=30)
+        self.max_attempts = max(1, config.getint('Lease', 'max_attempts', fallback=3))
+        # Returns the task ids and the worker pids this node holds; None renews every lease of the node
+        self.held_documents = None
+        self.logger = logger if logger is not None else logging.getLogger('OCRR')
+
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread = None
+
+    @property
+    def worker_id(self) -> str:
+        # Resolved on every call so that it is correct in forked processes
+        return f"{self.node_id}:{os.getpid()}"
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def _lease_update(self, claim_token: str = None) -> dict:
+        now = self._now()
+        lease_update = {"$set": {
+            "status": "IN_QUEUE",
+            "nodeId": self.node_id,
+            "workerId": self.worker_id,
+            "leaseExpiresAt": now + datetime.timedelta(seconds=self.lease_seconds),
+            "claimedAt": now
+        }, "$unset": {"processingPid": ""}, "$inc": {"attempts": 1}}
+        if claim_token:
+            lease_update["$set"]["claimToken"] = claim_token
+        else:
+            lease_update["$unset"]["claimToken"] = ""
+        return lease_update
+
+    def _waiting_filter(self) -> dict:
+        # 'IN_PROGRESS', or 'IN_QUEUE' with an expired lease, whatever the attempts
+        return {"$or": [
+            {"status": "IN_PROGRESS"},
+            {"status": "IN_QUEUE", "leaseExpiresAt": {"$lt": self._now()}}
+        ]}
+
+    def _claimable_filter(self, extra_filter: dict = None) -> dict:
+        claim_filter = {**self._waiting_filter(), "attempts": {"$not": {"$gte": self.max_attempts}}}
+        if extra_filter:
+            claim_filter = {"$and": [claim_filter, extra_filter]}
+        return claim_filter
+
+    def claim_next(self, extra_filter: dict = None) -> dict:
+        """
+        Claim one claimable document: 'IN_PROGRESS', or 'IN_QUEUE' with an expired lease.
+
+        :param extra_filter: Additional conditions on the document (e.g. excluded clients).
+        :return: The document as it was before the claim, or None if there is nothing to claim.
+        """
+        return self._claim(self._claimable_filter(extra_filter))
+
+    def claim_batch(self, limit: int, extra_filter: dict = None, sort: list = None) -> list:
+        """
+        Claim up to limit claimable documents in two round trips instead of one per document.
+
+        The candidates are found first, then claimed with one update_many tagged with a fresh
+        claim token. The update repeats the claim conditions, so candidates which another node
+        claimed in the meantime are skipped. When every candidate was claimed the documents
+        of the find are returned; otherwise the documents carrying the token, which are the
+        ones this call won, are read back. Waiting documents which are out of attempts are
+        rejected when the claim comes back short, as they never stop a full claim.
+
+        :param limit: Maximum number of documents to claim.
+        :param extra_filter: Additional conditions on the documents (e.g. excluded clients).
+        :param sort: Order in which candidates are claimed, insertion order by default.
+        :return: The claimed documents with their status before the claim, in claim order.
+        """
+        sort = sort if sort else [("_id", 1)]
+        if limit <= 0:
+            return []
+        claim_filter = self._claimable_filter(extra_filter)
+        # Documents before the claim: their status and owner report reclaimed leases
+        candidates = {document["_id"]: document for document in self.collection_filedetails.find(claim_filter).sort(sort).limit(limit)}
+        documents = []
+        if candidates:
+            claim_token = uuid.uuid4().hex
+            result = self.collection_filedetails.update_many({"$and": [{"_id": {"$in": list(candidates)}}, claim_filter]}, self._lease_update(claim_token))
+            if result.modified_count == len(candidates):
+                documents = list(candidates.values())
+            elif result.modified_count:
+                # Another node won some of the candidates; read back through the _id index, claimToken is not indexed
+                documents = list(self.collection_filedetails.find({"_id": {"$in": list(candidates)}, "claimToken": claim_token}).sort(sort))
+            for document in documents:
+                previous = candidates[document["_id"]]
+                if previous.get("status") == "IN_QUEUE":
+                    self.logger.warning(f"| Reclaimed expired lease of node '{previous.get('nodeId')}' for task: {document.get('taskId')}")
+                document["status"] = previous.get("status")
+        if len(documents) < limit:
+            # Waiting documents out of attempts are rejected rather than claimed again
+            self.reject_exhausted(self._waiting_filter())
+        return documents
+
+    def _claim(self, claim_filter: dict) -> dict:
+        document = self.collection_filedetails.find_one_and_update(claim_filter, self._lease_update(), return_document=ReturnDocument.BEFORE)
+        if document is not None and document.get("status") == "IN_QUEUE":
+            self.logger.warning(f"| Reclaimed expired lease of node '{document.get('nodeId')}' for task: {document.get('taskId')}")
+        return document
+
+    def claim(self, taskid: str) -> dict:
+        """
+        Claim a specific document if it is still claimable.
+
+        :return: The document as it was before the claim, or None if another node holds it or it is no longer 'IN_PROGRESS'.
+        """
+        return self._claim({**self._claimable_filter(), "taskId": taskid})
+
+    def mark_started(self, taskid: str) -> bool:
+        """
+        Record that the calling worker process started processing the document.
+        """
+        result = self.collection_filedetails.update_one(
+            {"taskId": taskid, "status": "IN_QUEUE", "nodeId": self.node_id},
+            {"$set": {"workerId": self.worker_id, "processingPid": os.getpid(),
+                      "leaseExpiresAt": self._now() + datetime.timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.modified_count > 0
+
+    def heartbeat(self) -> int:
+        """
+        Extend the leases of the documents this node still holds.
+
+        :return: Number of leases extended.
+        """
+        heartbeat_filter = {"status": "IN_QUEUE", "nodeId": self.node_id}
+        if self.held_documents is not None:
+            # Only documents waiting to be processed or being processed by a live worker
+            task_ids, pids = self.held_documents()
+            heartbeat_filter["$or"] = [{"taskId": {"$in": list(task_ids)}}, {"processingPid": {"$in": list(pids)}}]
+        result = self.collection_filedetails.update_many(
+            heartbeat_filter,
+            {"$set": {"leaseExpiresAt": self._now() + datetime.timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.modified_count
+
+    def _heartbeat_loop(self) -> None:
+        while not self._heartbeat_stop.wait(self.heartbeat_seconds):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                self.logger.error(f"| Failed to extend task leases: {e}")
+
+    def start_heartbeat(self) -> None:
+        """
+        Extend this node's leases every heartbeat_seconds on a daemon thread.
+        """
+        if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+            self._heartbeat_stop.clear()
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="OCRRLeaseHeartbeat", daemon=True)
+            self._heartbeat_thread.start()
+
+    def stop_heartbeat(self) -> None:
+        self._heartbeat_stop.set()
+
+    def reject_exhausted(self, document_filter: dict) -> int:
+        """
+        Reject the documents of the filter which were claimed max_attempts times.
+
+        :return: Number of documents rejected.
+        """
+        result = self.collection_filedetails.update_many(
+            {"$and": [document_filter, {"attempts": {"$gte": self.max_attempts}}]},
+            {"$set": {"status": "REJECTED", "taskResult": f"Document processing failed after {self.max_attempts} attempts"}, "$unset": FINAL_UNSET_FIELDS}
+        )
+        if result.modified_count:
+            self.logger.error(f"| Rejected {result.modified_count} documents which failed {self.max_attempts} processing attempts")
+        return result.modified_count
+
+    def release_worker(self, pid: int) -> int:
+        """
+        Return the documents of a dead worker process of this node to 'IN_PROGRESS',
+        rejecting those which have no attempts left.
+
+        :return: Number of documents released.
+        """
+        worker_filter = {"status": "IN_QUEUE", "nodeId": self.node_id, "processingPid": pid}
+        self.reject_exhausted(worker_filter)
+        result = self.collection_filedetails.update_many(
+            worker_filter,
+            {"$set": {"status": "IN_PROGRESS"}, "$unset": LEASE_FIELDS}
+        )
+        if result.modified_count:
+            self.logger.warning(f"| Released {result.modified_count} documents of worker process {pid}")
+        return result.modified_count
+
+    def recover_node_leases(self) -> int:
+        """
+        Return this node's documents left 'IN_QUEUE' by a previous run to 'IN_PROGRESS'.
+
+        Documents leased by other nodes are left alone; documents queued by an engine version
+        without leases (no nodeId) are recovered too, as no node owns them.
+
+        :return: Number of documents recovered.
+        """
+        node_filter = {"status": "IN_QUEUE", "$or": [{"nodeId": self.node_id}, {"nodeId": {"$exists": False}}]}
+        self.reject_exhausted(node_filter)
+        result = self.collection_filedetails.update_many(
+            node_filter,
+            {"$set": {"status": "IN_PROGRESS"}, "$unset": LEASE_FIELDS}
+        )
+        return result.modified_count
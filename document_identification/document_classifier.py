@@ -0,0 +1,99 @@
+"""
+DocumentClassifier: Score every supported document type in one scan of the OCR tokens.
+
+The target patterns of all Identify*Document classes are combined into one precompiled
+regular expression. Each target is an optional lookahead with a named group, so a single
+match per token reports every target found in it. The score of a document type is the
+number of tokens matching it, and the document is identified as the type with the highest
+score; the identification precedence order only breaks ties.
+
+The electronic documents carry the markers of their printed versions as well (an E-Aadhaar
+letter has the gender and authority lines of an Aadhaar card), so the tokens of the printed
+type count towards a matched electronic type. The electronic type therefore wins whenever
+its own markers are found, as it did in the first-match loop.
+
+Example usage:
+    classifier = DocumentClassifier()
+    scores = classifier.score_document_types(text_list)
+    document_type = classifier.best_document_type(scores)
+"""
+
+import re
+from document_identification.documents.identify_cdsl_doc import IdentifyCDSLDocument
+from document_identification.documents.identify_e_pancard import IdentifyEPancardDocument
+from document_identification.documents.identify_pancard import IdentifyPancardDocument
+from document_identification.documents.identify_e_aadhaar import IdentifyEAadhaarDocument
+from document_identification.documents.identify_aadhaar import IdentifyAadhaarDocument
+from document_identification.documents.identify_passport import IdentifyPassportDocument
+from document_identification.documents.identify_driving_license import IdentifyDrivingLicenseDocument
+
+# Document types in identification precedence order with their target patterns
+DOCUMENT_TYPE_TARGETS = {
+    "CDSL": IdentifyCDSLDocument.targets,
+    "E-PANCARD": IdentifyEPancardDocument.targets,
+    "PANCARD": IdentifyPancardDocument.targets,
+    "E-AADHAAR": IdentifyEAadhaarDocument.targets,
+    "PASSPORT": IdentifyPassportDocument.targets,
+    "AADHAAR": IdentifyAadhaarDocument.targets,
+    "DL": IdentifyDrivingLicenseDocument.targets
+}
+
+# Electronic document types and the printed type whose markers they also carry
+SPECIALISED_DOCUMENT_TYPES = {
+    "E-PANCARD": "PANCARD",
+    "E-AADHAAR": "AADHAAR"
+}
+
+def _compile_document_type_pattern(document_type_targets: dict) -> tuple:
+    # Build one optional lookahead per target: (?:(?=.*?(?P<group>target)))?
+    group_document_types = {}
+    lookaheads = []
+    for type_index, (document_type, targets) in enumerate(document_type_targets.items()):
+        for target_index, target in enumerate(targets):
+            group_name = f"t{type_index}_{target_index}"
+            group_document_types[group_name] = document_type
+            lookaheads.append(f"(?:(?=.*?(?P<{group_name}>{target})))?")
+    return re.compile("".join(lookaheads), flags=re.IGNORECASE | re.DOTALL), group_document_types
+
+class DocumentClassifier:
+    # Compiled once per process
+    pattern, group_document_types = _compile_document_type_pattern(DOCUMENT_TYPE_TARGETS)
+
+    def __init__(self, document_types: list = None) -> None:
+        # Precedence order used to break ties between matched document types
+        self.document_types = document_types if document_types is not None else list(DOCUMENT_TYPE_TARGETS)
+
+    def score_document_types(self, text_list: list) -> dict:
+        """
+        Count the OCR tokens matching each document type in a single pass.
+
+        :param text_list: OCR tokens of the document.
+        :return: {document_type: score} for every supported type.
+        """
+        scores = dict.fromkeys(DOCUMENT_TYPE_TARGETS, 0)
+        for text in text_list:
+            text = text.strip()
+            if not text:
+                continue
+            matched_groups = self.pattern.match(text).groupdict()
+            matched_document_types = {self.group_document_types[group] for group, value in matched_groups.items() if value is not None}
+            for document_type in matched_document_types:
+                scores[document_type] += 1
+        # Electronic documents also carry the markers of the printed type
+        token_counts = dict(scores)
+        for document_type, printed_document_type in SPECIALISED_DOCUMENT_TYPES.items():
+            if token_counts[document_type]:
+                scores[document_type] += token_counts[printed_document_type]
+        return scores
+
+    def best_document_type(self, scores: dict) -> str:
+        """
+        Return the document type with the highest score, or None if nothing matched.
+        Ties are broken by the precedence order.
+        """
+        best_document_type = None
+        for document_type in self.document_types:
+            # Strictly greater, so the earlier type in precedence order wins a tie
+            if scores.get(document_type, 0) > scores.get(best_document_type, 0):
+                best_document_type = document_type
+        return best_document_type
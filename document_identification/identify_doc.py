@@ -1,47 +1,23 @@
-import cv2
-import pytesseract
-from document_identification.documents.identify_cdsl_doc import IdentifyCDSLDocument
-from document_identification.documents.identify_e_pancard import IdentifyEPancardDocument
-from document_identification.documents.identify_pancard import IdentifyPancardDocument
-from document_identification.documents.identify_e_aadhaar import IdentifyEAadhaarDocument
-from document_identification.documents.identify_aadhaar import IdentifyAadhaarDocument
-from document_identification.documents.identify_passport import IdentifyPassportDocument
-from document_identification.documents.identify_driving_license import IdentifyDrivingLicenseDocument
+from helper.ocr_page import OCRPage
+from document_identification.document_classifier import DocumentClassifier
 
 class DocumentIdentification:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object) -> None:
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, ocr_page: OCRPage = None) -> None:
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
-        self.allowed_document_types = ['CDSL', 'E-PANCARD', 'PANCARD', 'E-AADHAAR', 'AADHAAR', 'PASSPORT', 'DL']
+        # Shared OCR results for the document, so every candidate type reuses one Tesseract run
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
     
     def _get_text_from_image(self) -> list:
-        # Load the image
-        img = cv2.imread(self.ocrr_workspace_doc_path)
-        # Convert the image to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         # Tesseract configuration
         tesseract_config = r'--oem 3 --psm 11'
-        # Apply OCR to the grayscale image
-        data_text = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT, config=tesseract_config)
+        # Apply OCR to the workspace document, which is already grayscale after pre-processing
+        data_text = self.ocr_page.image_to_data(lang="eng", config=tesseract_config)
         return data_text['text']
 
-    def identify_document_type(self, document_type: str) -> bool:
-        if document_type in self.allowed_document_types:
-            # Use match case to identify the document type
-            match document_type:
-                case 'CDSL':
-                    return IdentifyCDSLDocument(self._get_text_from_image(), self.logger).check_cdsl_document_match()
-                case 'E-PANCARD':
-                    return IdentifyEPancardDocument(self._get_text_from_image(), self.logger).check_e_pancard_document_match()
-                case 'PANCARD':
-                    return IdentifyPancardDocument(self._get_text_from_image(), self.logger).check_pancard_document_match()
-                case 'E-AADHAAR':
-                    return IdentifyEAadhaarDocument(self._get_text_from_image(), self.logger).check_e_aadhaar_document_match()
-                case 'AADHAAR':
-                    return IdentifyAadhaarDocument(self._get_text_from_image(), self.logger).check_aadhaar_document_match()
-                case 'PASSPORT':
-                    return IdentifyPassportDocument(self._get_text_from_image(), self.logger).check_passport_document_match()
-                case 'DL':
-                    return IdentifyDrivingLicenseDocument(self._get_text_from_image(), self.logger).check_driving_license_document_match()
-        else:
-            return False
\ No newline at end of file
+    def classify_document(self, document_types: list = None) -> str:
+        # Score every document type in one scan of the OCR tokens and pick the best match
+        classifier = DocumentClassifier(document_types)
+        scores = classifier.score_document_types(self._get_text_from_image())
+        self.logger.info(f"| Document type scores: {scores}")
+        return classifier.best_document_type(scores)
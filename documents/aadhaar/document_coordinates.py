@@ -1,23 +1,27 @@
-import pytesseract
 import re
-from PIL import Image
-from qreader import QReader
 from helper.text_coordinates import ImageTextCoordinates
-from helper.places import places_list
+from helper.ocr_page import OCRPage
+from helper.qr_detector import locate_qr_codes
+from helper.token_index import TokenIndex
+from helper.place_matcher import place_matcher
+from helper.keyword_index import keyword_index
 
 class AadhaarDocumentInfo:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int) -> None:
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int, ocr_page: OCRPage = None) -> None:
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
         self.redaction_level = redaction_level
-
-        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path).generate_text_coordinates()
-        # Tesseract configuration
-        tesseract_config = r'--oem 3 --psm 11'
-        self.text_data = pytesseract.image_to_string(self.ocrr_workspace_doc_path, lang="eng", config=tesseract_config)
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
+
+        text_coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, ocr_page=self.ocr_page)
+        self.coordinates = text_coordinates.generate_text_coordinates()
+        # Line text rebuilt from the same Tesseract run instead of a second image_to_string pass
+        self.text_data = text_coordinates.generate_text_data()
+        # Text index over the token boxes
+        self.token_index = TokenIndex(self.coordinates)
         print(self.coordinates)
-        # List of Places
-        self.places = places_list
+        # Matcher over the list of places
+        self.place_matcher = place_matcher
 
     # Method to extract Aadhaar Number and its Coordinates
     def _extract_aadhaar_number(self) -> dict:
@@ -75,15 +79,15 @@ class AadhaarDocumentInfo:
                 r"=|<<|~|-"]
 
             # Search keyword
-            search_keyword = [r"\b\w*(dob|doe|dow|rryoob|oob|D08B|birth|bieth|binh|dor|dow|dod)\b"]
+            search_keyword = ["dob", "birth"]
             search_keyword_index = 0            
             
             # Search Date Pattern
             dob_pattern = r'\b\d{2}/\d{2}/\d{4}|\b\d{2}/\d{5}|\b\d{2}-\d{2}-\d{4}|\b\d{4}/\d{4}|\b\d{2}/\d{2}/\d{2}|\b\d{1}/\d{2}/\d{4}|\b[Oo]?\d{1}/\d{5}|\b\d{4}\b'
             pattern = r'\b(?P<mm_dd_yyyy>\d{2}/\d{2}/\d{4})|(?P<mm_dd_yy>\d{2}/\d{2}/\d{2})|(?P<mm_dd_yyyy_dash>\d{2}-\d{2}-\d{4})|(?P<m_dd_yyyy>\d{1}/\d{2}/\d{4})|(?P<yyyy>\d{4})|(?P<mm_yyyy>\d{2}/\d{4})|(?P<mm_dd_yyyyy>\d{2}/\d{5})|(?P<yyyy_mm>\d{4}/\d{4})|(?P<o_mm_dddd>[Oo]?\d{1}/\d{5})\b'
 
-            # Search Gender Pattern
-            gender_pattern = r"\b(male|female|fmale|femalp|femali|femere|femala|mate|femate|#femste|fomale|fertale|malo|femsle|fade|ferme|famate)\b"
+            # Search Gender keyword
+            gender_keyword = ["male", "female"]
 
             # Get the text data in a list
             text_data_list = [text.strip() for text in self.text_data.split("\n") if len(text) != 0]
@@ -98,17 +102,15 @@ class AadhaarDocumentInfo:
 
             # Loop through the reversed filtered text data list and get the index of search text
             for index,text in enumerate(reversed_filtered_text_data_list):
-                for pattern in search_keyword:
-                    if re.search(pattern, text, flags=re.IGNORECASE):
-                        search_keyword_index = index
-                        break
+                if keyword_index.contains_keyword(text, search_keyword, suffix=True):
+                    search_keyword_index = index
             
             # Check if search keyword is found
             if search_keyword_index == 0:
                 self.logger.warning("| Search keyword DOB not found in Aadhaar document")
                 # Loop through the reversed filtered text data list and get the index of gender pattern
                 for index, text in enumerate(reversed_filtered_text_data_list):
-                    if re.search(gender_pattern, text, flags=re.IGNORECASE):
+                    if keyword_index.contains_keyword(text, gender_keyword):
                         search_keyword_index = index
                         break
                     if search_keyword_index == 0:
@@ -125,14 +127,8 @@ class AadhaarDocumentInfo:
                 return result
             name_list = name.split()
     
-            # Check if element of text is available in coordinates list
-            for x1, y1, x2, y2, text in self.coordinates:
-                if text in name_list:
-                    # Check if [x1, y1, x2, y2] is not available in name_coordinates
-                    if [x1, y1, x2, y2] not in name_coordinates:
-                        coordinates.append([x1, y1, x2, y2])
-                if len(name_coordinates) == len(name_list):
-                    break
+            # Get the coordinates of the name text
+            coordinates.extend(self.token_index.boxes_for(name_list))
             
             # Get the coordinates
             for i in name_coordinates:
@@ -167,7 +163,7 @@ class AadhaarDocumentInfo:
             dob_pattern = r'\b\d{2}/\d{2}/\d{4}|\b\d{2}/\d{5}|\b\d{2}-\d{2}-\d{4}|\b\d{4}/\d{4}|\b\d{2}/\d{2}/\d{2}|\b\d{1}/\d{2}/\d{4}|\b[Oo]?\d{1}/\d{5}|\b\d{4}\b'
             
             # DOB Search keyword
-            dob_search_keyword = r"\b\w*(dob|doe|rryoob|bieth|binh|dor|dow|dod)\b"
+            dob_search_keyword = ["dob", "birth"]
             dob_search_keyword_found = False
 
             # Loop through the coordinates
@@ -182,7 +178,7 @@ class AadhaarDocumentInfo:
                 # Loop through the text data
                 for text in text_data_list:
                     # Check if text matches the DOB search keyword
-                    if re.search(dob_search_keyword, text, flags=re.IGNORECASE):
+                    if keyword_index.contains_keyword(text, dob_search_keyword, suffix=True):
                         dob += " "+ text
                         break
                 
@@ -191,11 +187,8 @@ class AadhaarDocumentInfo:
                 # Remove '/' from dob list
                 dob_list = [x for x in dob_list if x != '/']
 
-                # Loop through the coordinates
-                for x1, y1, x2, y2, text in self.coordinates:
-                    # Check if text is in dob_list and not in coordinates
-                    if text in dob_list and [x1, y1, x2, y2] not in dob_coordinates:
-                        dob_coordinates.append([x1, y1, x2, y2])
+                # Get the coordinates of the dob text
+                dob_coordinates.extend(self.token_index.boxes_for(dob_list))
 
             # Update the result
             for i in dob_coordinates:
@@ -219,23 +212,16 @@ class AadhaarDocumentInfo:
             gender_list = []
             coordinates = []
 
-            gender_pattern = [
-                r"\b(?:male|female|fmale|femalp|femere|FEMALI|femala|mate|femate|#femste|fomale|fertale|malo|femsle|fade|ferme|famate)\b"
-            ]
+            gender_keyword = ["male", "female"]
 
             # Get the text data in a list
             text_data_list = [text.strip() for text in self.text_data.split("\n") if len(text) != 0]
 
             # Loop through the text data
             for text in text_data_list:
-                # Loop through the gender patterns
-                for pattern in gender_pattern:
-                    # Compile the pattern
-                    compiled_pattern = re.compile(pattern, flags=re.IGNORECASE)
-                    # Search for pattern in the text block
-                    if re.search(compiled_pattern, text):
-                        gender = text
-                        break
+                # Check if the text block contains a gender keyword
+                if keyword_index.contains_keyword(text, gender_keyword):
+                    gender = text
             
             # Check if Gender is not found
             if not gender:
@@ -248,10 +234,7 @@ class AadhaarDocumentInfo:
             gender_list = [x for x in gender_list if x != '/']
 
             # Get the coordinates
-            for x1, y1, x2, y2, text in self.coordinates:
-                if text in gender_list:
-                    if [x1, y1, x2, y2] not in coordinates:
-                        coordinates.append([x1, y1, x2, y2])
+            coordinates = self.token_index.boxes_for(gender_list)
 
             # Update the result
             result = {
@@ -272,12 +255,10 @@ class AadhaarDocumentInfo:
 
             # Loop through the coordinates
             for x1, y1, x2, y2, text in self.coordinates:
-                # Loop throgh list of places
-                for place in self.places:
-                    # Check if the text matches the place
-                    if re.search(place, text, flags=re.IGNORECASE):
-                        address += " " + text
-                        coordinates.append([x1, y1, x2, y2])
+                # Check if the text matches any of the places
+                if self.place_matcher.contains_place(text):
+                    address += " " + text
+                    coordinates.append([x1, y1, x2, y2])
 
             # Check if Address is not found
             if not address:
@@ -368,17 +349,14 @@ class AadhaarDocumentInfo:
     def _extract_aadhaar_qr_codes(self) -> list:
         result = {"Aadhaar QRCodes": "", "Coordinates": []}
         try:
-            # Initialize QRCode Reader
-            qrreader = QReader()
-    
             # Initialize list to store QRCode coordinates
             qrcodes_coordinates = []
 
-            # Load the image
-            image = Image.open(self.ocrr_workspace_doc_path)
+            # The image decoded once for the whole document; boxes are mapped back to its original size
+            image = self.ocr_page.get_document_image()
 
-            # Detect and Decode QR Codes
-            qrcodes = qrreader.detect(image)
+            # Locate QR Codes; the document must carry one, so fall back to the QReader model
+            qrcodes = locate_qr_codes(image, qr_required=True)
 
             # Check if qrcodes not found
             if not qrcodes:
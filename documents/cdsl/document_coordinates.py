@@ -1,11 +1,13 @@
 from helper.text_coordinates import ImageTextCoordinates
+from helper.ocr_page import OCRPage
 
 class CDSLDocumentInfo:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int):
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int, ocr_page: OCRPage = None):
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
         self.redaction_level = redaction_level
-        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, lang="default").generate_text_coordinates()
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
+        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, lang="default", ocr_page=self.ocr_page).generate_text_coordinates()
 
     def _extract_pancard_number(self) -> dict:
         result = {"CDSL Pancard Number": "","Coordinates": []}
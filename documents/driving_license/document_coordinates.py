@@ -1,23 +1,26 @@
-import pytesseract
 import re
-from PIL import Image
-from qreader import QReader
 from helper.text_coordinates import ImageTextCoordinates
-from helper.places import places_list
+from helper.ocr_page import OCRPage
+from helper.qr_detector import locate_qr_codes
+from helper.token_index import TokenIndex
+from helper.place_matcher import place_matcher
 
 class DrivingLicenseDocumentInfo:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int) -> None:
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int, ocr_page: OCRPage = None) -> None:
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
         self.redaction_level = redaction_level
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
 
-        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path).generate_text_coordinates()
-        # Tesseract configuration
-        tesseract_config = r'--oem 3 --psm 11'
-        self.text_data = pytesseract.image_to_string(self.ocrr_workspace_doc_path, lang="eng", config=tesseract_config)
+        text_coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, ocr_page=self.ocr_page)
+        self.coordinates = text_coordinates.generate_text_coordinates()
+        # Line text rebuilt from the same Tesseract run instead of a second image_to_string pass
+        self.text_data = text_coordinates.generate_text_data()
+        # Text index over the token boxes
+        self.token_index = TokenIndex(self.coordinates)
         print(self.coordinates)
-        # List of Places
-        self.places = places_list
+        # Matcher over the list of places
+        self.place_matcher = place_matcher
 
 
     # Method to extract Driving License Number and its Coordinates
@@ -164,11 +167,7 @@ class DrivingLicenseDocumentInfo:
                 return result
 
             # Get the coordinates of name text
-            for x1, y1, x2, y2, text in self.coordinates:
-                if text in names_text_list:
-                    # Check if coordinates are not available in the list
-                    if [x1, y1, x2, y2] not in names_coordinates:
-                        names_coordinates.append([x1, y1, x2, y2])
+            names_coordinates = self.token_index.boxes_for(names_text_list)
 
             # Update the result
             result = {
@@ -189,12 +188,10 @@ class DrivingLicenseDocumentInfo:
 
             # Loop through the coordinates
             for x1, y1, x2, y2, text in self.coordinates:
-                # Loop throgh list of places
-                for place in self.places:
-                    # Check if the text matches the place
-                    if re.search(place, text, flags=re.IGNORECASE):
-                        address += " " + text
-                        coordinates.append([x1, y1, x2, y2])
+                # Check if the text matches any of the places
+                if self.place_matcher.contains_place(text):
+                    address += " " + text
+                    coordinates.append([x1, y1, x2, y2])
 
             # Check if Address is not found
             if not address:
@@ -215,17 +212,14 @@ class DrivingLicenseDocumentInfo:
     def _extract_driving_license_qr_codes(self) -> list:
         result = {"Driving License QRCodes": "", "Coordinates": []}
         try:
-            # Initialize QRCode Reader
-            qrreader = QReader()
-    
             # Initialize list to store QRCode coordinates
             qrcodes_coordinates = []
 
-            # Load the image
-            image = Image.open(self.ocrr_workspace_doc_path)
+            # The image decoded once for the whole document; boxes are mapped back to its original size
+            image = self.ocr_page.get_document_image()
 
-            # Detect and Decode QR Codes
-            qrcodes = qrreader.detect(image)
+            # Locate QR Codes; the QR Code is optional, so the QReader model is not used
+            qrcodes = locate_qr_codes(image, qr_required=False)
 
             # Check if qrcodes not found
             if not qrcodes:
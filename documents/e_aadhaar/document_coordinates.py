@@ -1,23 +1,27 @@
-import pytesseract
 import re
-from PIL import Image
-from qreader import QReader
 from helper.text_coordinates import ImageTextCoordinates
-from helper.places import places_list
+from helper.ocr_page import OCRPage
+from helper.qr_detector import locate_qr_codes
+from helper.token_index import TokenIndex
+from helper.place_matcher import place_matcher
+from helper.keyword_index import keyword_index
 
 class EAadhaarDocumentInfo:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int) -> None:
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int, ocr_page: OCRPage = None) -> None:
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
         self.redaction_level = redaction_level
-
-        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path).generate_text_coordinates()
-        # Tesseract configuration
-        tesseract_config = r'--oem 3 --psm 11'
-        self.text_data = pytesseract.image_to_string(self.ocrr_workspace_doc_path, lang="eng", config=tesseract_config)
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
+
+        text_coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, ocr_page=self.ocr_page)
+        self.coordinates = text_coordinates.generate_text_coordinates()
+        # Line text rebuilt from the same Tesseract run instead of a second image_to_string pass
+        self.text_data = text_coordinates.generate_text_data()
+        # Text index over the token boxes
+        self.token_index = TokenIndex(self.coordinates)
         print(self.coordinates)
-        # List of Places
-        self.places = places_list
+        # Matcher over the list of places
+        self.place_matcher = place_matcher
 
 
     # Method to extract E-Aadhaar Number and its Coordinates
@@ -75,15 +79,28 @@ class EAadhaarDocumentInfo:
         except Exception as e:
             self.logger.error(f"| Error while getting keyword index: {e}")
             return match_index
+
+    # Method to get the index number of an OCR-tolerant anchor keyword
+    def _get_anchor_keyword_index(self, keywords: list, text_data_list: list) -> int:
+        try:
+            match_index = 0
+            # Loop through the text data list
+            for index,text in enumerate(text_data_list):
+                # Check if a word of the text is one of the keywords
+                if keyword_index.contains_keyword(text, keywords, suffix=True):
+                    match_index = index
+                    break
+            return match_index
+        except Exception as e:
+            self.logger.error(f"| Error while getting anchor keyword index: {e}")
+            return match_index
         
     # Method to get the coordinates
     def _get_coordinates(self, name_list: list) -> list:
         try:
             coordinates = []
-            # Loop through the coordinates
-            for x1, y1, x2, y2, text in self.coordinates:
-                if text in name_list:
-                    coordinates.append([x1, y1, x2, y2])
+            # Get the boxes of the name text
+            coordinates = self.token_index.boxes_for(name_list)
             return coordinates
         except Exception as e:
             self.logger.error(f"| Error while getting coordinates: {e}")
@@ -105,7 +122,7 @@ class EAadhaarDocumentInfo:
             top_name_coordinates = []
 
             # Enrollment serach keyword
-            enrollment_search_keyword = [r"\b(enrollment|enrolment|enrolknant|enrollment|enrolment|encolent|enroiiment|enrotment|encol ent no|enroliment|enrolment|enrotiment|/enrolment|enrotimant|enrallment|evavenrolment|eivavenrolment|ehyollment|enrollmentno)\b"]
+            enrollment_search_keyword = ["enrolment"]
             enrollment_search_keyword_index = 0
             enrollment_name = ""
             enrollment_name_list = []
@@ -152,7 +169,7 @@ class EAadhaarDocumentInfo:
             # print(f"TOP: {top_name_list}")
 
             ## Enrollment Search Keyword
-            enrollment_search_keyword_index = self._get_keyword_index(enrollment_search_keyword, filtered_text_data_list)
+            enrollment_search_keyword_index = self._get_anchor_keyword_index(enrollment_search_keyword, filtered_text_data_list)
             if  enrollment_search_keyword_index != 0:
                 # Loop through filtered text data
                 for index,text in enumerate(filtered_text_data_list[enrollment_search_keyword_index + 1 : enrollment_search_keyword_index + 4]):
@@ -256,24 +273,17 @@ class EAadhaarDocumentInfo:
             gender_list = []
             coordinates = []
 
-            # Gender Pattern: Male, Female
-            gender_pattern = [
-                r"\b\w*(male|female|femalp|femere|mate|femala|fenate|mala|mate|femate|#femste|fomale|fertale|malo|femsle|fade|ferme|famate)\b"
-            ]
+            # Gender keyword: Male, Female
+            gender_keyword = ["male", "female"]
 
             # Get the text data in a list
             text_data_list = [text.strip() for text in self.text_data.split("\n") if len(text) != 0]
 
             # Loop through the text data
             for text in text_data_list:
-                # Loop through the gender patterns
-                for pattern in gender_pattern:
-                    # Compile the pattern
-                    compiled_pattern = re.compile(pattern, flags=re.IGNORECASE)
-                    # Search for pattern in the text block
-                    if re.search(compiled_pattern, text):
-                        gender = text
-                        break
+                # Check if the text block contains a gender keyword
+                if keyword_index.contains_keyword(text, gender_keyword, suffix=True):
+                    gender = text
 
             # Check if Gender is not found
             if not gender:
@@ -287,15 +297,8 @@ class EAadhaarDocumentInfo:
             if '/' in gender_list:
                 gender_list.remove('/')
 
-            # Get the coordinates
-            for x1, y1, x2, y2,text in self.coordinates:
-                if text in gender_list:
-                    # Check if coordinates are not available in the list
-                    if [x1, y1, x2, y2] not in coordinates:
-                        coordinates.append([x1, y1, x2, y2])
-                    # Check if the length of gender_list is equal to coordinates list
-                    if len(gender_list) == len(coordinates):
-                        break
+            # Get the coordinates, at most one box per gender word
+            coordinates = self.token_index.boxes_for(gender_list, limit=len(gender_list))
 
             # Update the result
             result = {
@@ -317,14 +320,12 @@ class EAadhaarDocumentInfo:
 
             # Loop through the coordinates
             for x1, y1, x2, y2, text in self.coordinates:
-                # Loop throgh list of places
-                for place in self.places:
-                    # Check if the text matches the place
-                    if re.search(place, text, flags=re.IGNORECASE):
-                        # Check if the text matches the ignore keyword regex
-                        if not re.search(ignore_keyword_regex, text, flags=re.IGNORECASE):
-                            address += " " + text
-                            coordinates.append([x1, y1, x2, y2])
+                # Check if the text matches any of the places
+                if self.place_matcher.contains_place(text):
+                    # Check if the text matches the ignore keyword regex
+                    if not re.search(ignore_keyword_regex, text, flags=re.IGNORECASE):
+                        address += " " + text
+                        coordinates.append([x1, y1, x2, y2])
 
             # Check if Address is not found
             if not address:
@@ -415,17 +416,14 @@ class EAadhaarDocumentInfo:
     def _extract_e_aadhaar_qr_codes(self) -> list:
         result = {"E-Aadhaar QRCodes": "", "Coordinates": []}
         try:
-            # Initialize QRCode Reader
-            qrreader = QReader()
-    
             # Initialize list to store QRCode coordinates
             qrcodes_coordinates = []
 
-            # Load the image
-            image = Image.open(self.ocrr_workspace_doc_path)
+            # The image decoded once for the whole document; boxes are mapped back to its original size
+            image = self.ocr_page.get_document_image()
 
-            # Detect and Decode QR Codes
-            qrcodes = qrreader.detect(image)
+            # Locate QR Codes; the document must carry one, so fall back to the QReader model
+            qrcodes = locate_qr_codes(image, qr_required=True)
 
             # Check if qrcodes not found
             if not qrcodes:
@@ -1,19 +1,19 @@
-import pytesseract
 import re
-from PIL import Image
-from qreader import QReader
 from helper.text_coordinates import ImageTextCoordinates
+from helper.ocr_page import OCRPage
+from helper.qr_detector import locate_qr_codes
 
 class EPancardDocumentInfo:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int) -> None:
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int, ocr_page: OCRPage = None) -> None:
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
         self.redaction_level = redaction_level
-        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path).generate_text_coordinates()
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
+        text_coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, ocr_page=self.ocr_page)
+        self.coordinates = text_coordinates.generate_text_coordinates()
         print(self.coordinates)
-        # Tesseract configuration
-        tesseract_config = r'--oem 3 --psm 11'
-        self.text_data = pytesseract.image_to_string(self.ocrr_workspace_doc_path, lang="eng", config=tesseract_config)
+        # Line text rebuilt from the same Tesseract run instead of a second image_to_string pass
+        self.text_data = text_coordinates.generate_text_data()
         
     # Method to extract E-Pancard Number and its Coordinates
     def _extract_pancard_number(self) -> dict:
@@ -286,17 +286,14 @@ class EPancardDocumentInfo:
         result = {"E-Pancard QRCodes": "", "Coordinates": []}
         try:
             # Extract QR Codes coordinates from Pancard Document
-            # Initialize QRCode Reader
-            qrreader = QReader()
-    
             # Initialize list to store QRCode coordinates
             qrcodes_coordinates = []
 
-            # Load the image
-            image = Image.open(self.ocrr_workspace_doc_path)
+            # The image decoded once for the whole document; boxes are mapped back to its original size
+            image = self.ocr_page.get_document_image()
 
-            # Detect and Decode QR Codes
-            qrcodes = qrreader.detect(image)
+            # Locate QR Codes; the document must carry one, so fall back to the QReader model
+            qrcodes = locate_qr_codes(image, qr_required=True)
 
             # Check if qrcodes not found
             if not qrcodes:
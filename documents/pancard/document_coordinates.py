@@ -1,21 +1,22 @@
-import pytesseract
 import re
-from PIL import Image
-from qreader import QReader
 from documents.pancard.pattern1 import PancardPattern1
 from documents.pancard.pattern2 import PancardPattern2
 from helper.text_coordinates import ImageTextCoordinates
+from helper.ocr_page import OCRPage
+from helper.qr_detector import locate_qr_codes
+from helper.keyword_index import keyword_index
 
 
 class PancardDocumentInfo:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int) -> None:
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int, ocr_page: OCRPage = None) -> None:
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
         self.redaction_level = redaction_level
-        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path).generate_text_coordinates()
-        # Tesseract configuration
-        tesseract_config = r'--oem 3 --psm 11'
-        self.text_data = pytesseract.image_to_string(self.ocrr_workspace_doc_path, lang="eng", config=tesseract_config)
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
+        text_coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, ocr_page=self.ocr_page)
+        self.coordinates = text_coordinates.generate_text_coordinates()
+        # Line text rebuilt from the same Tesseract run instead of a second image_to_string pass
+        self.text_data = text_coordinates.generate_text_data()
         #print(self.coordinates)
         # Pancard Pattern
         self.pancard_pattern_1 = [
@@ -105,17 +106,13 @@ class PancardDocumentInfo:
             # Get the text from data list
             text_data_list = [text.strip() for text in self.text_data.split("\n") if len(text) != 0]
             
-            # Pancard Pattern 1 regex keywords
+            # Pancard Pattern 1 anchor keywords
             pancard_pattern_1_found = False
-            pancard_pattern_1 = [ r"\b\w*(father['’]s|father|eather['’]s|fathar['’]s|fathers|ffatugr|ffatubr['’]s)\b",
-                                 r"\b\w*(hratlifies|facer|pacers|hratlieies|gather)\b"]
+            pancard_pattern_1 = ["father"]
             # Identify the Pancard Pattern
             for text in text_data_list:
-                for pattern in pancard_pattern_1:
-                    if re.search(pattern, text, flags=re.IGNORECASE):
-                        pancard_pattern_1_found = True
-                        break
-                if pancard_pattern_1_found:
+                if keyword_index.contains_keyword(text, pancard_pattern_1, suffix=True):
+                    pancard_pattern_1_found = True
                     break
             
             # Check if Pancard Pattern 1 is found
@@ -156,17 +153,14 @@ class PancardDocumentInfo:
         try:
             # Extract QR Codes coordinates from Pancard Document
 
-            # Initialize QRCode Reader
-            qrreader = QReader()
-    
             # Initialize list to store QRCode coordinates
             qrcodes_coordinates = []
 
-            # Load the image
-            image = Image.open(self.ocrr_workspace_doc_path)
+            # The image decoded once for the whole document; boxes are mapped back to its original size
+            image = self.ocr_page.get_document_image()
 
-            # Detect and Decode QR Codes
-            qrcodes = qrreader.detect(image)
+            # Locate QR Codes; the QR Code is optional, so the QReader model is not used
+            qrcodes = locate_qr_codes(image, qr_required=False)
 
             # Check if qrcodes not found
             if not qrcodes:
@@ -1,7 +1,11 @@
 import re
+from helper.keyword_index import keyword_index
+from helper.token_index import TokenIndex
+
 class PancardPattern1:
     def __init__(self, coordinate_data: list, text_data_list: list, logger: object) -> None:
         self.coordinates = coordinate_data
+        self.token_index = TokenIndex(coordinate_data)
         self.text_data_list = text_data_list
         print(self.coordinates)
         self.logger = logger
@@ -10,10 +14,9 @@ class PancardPattern1:
         try:
             # Skip Keywords
             skip_keywords = [
-                r"\b\w*(name|uiname|mame|nun|alatar|fname|hehe|itiame)\b",
-                r"\b\w*(father['’]s|father|eather['’]s|fathar['’]s|fathers|ffatugr|ffatubr['’]s)\b",
-                r"\b\w*(hratlifies|facer|pacers|hratlieies|name|gather)\b"
+                r"\b\w*(name|uiname|mame|nun|alatar|fname|hehe|itiame)\b"
                 ]
+            skip_anchor_keywords = ["father"]
             
             # Break Keywords
             break_keywords = [r"\b\w*(gate|auth|ory)\b"]
@@ -53,20 +56,15 @@ class PancardPattern1:
                 if break_loop_match_found:
                     break
                 # Check if text does'nt match the skip keywords
-                if not any(re.search(pattern, text, flags=re.IGNORECASE) for pattern in skip_keywords):
+                if not any(re.search(pattern, text, flags=re.IGNORECASE) for pattern in skip_keywords) and not keyword_index.contains_keyword(text, skip_anchor_keywords, suffix=True):
                     name += " "+ text
             
             # Update name list
             name_list = name.strip().split()
             print(name_list)
 
-            # Loop through the coordinates
-            for index,(x1, y1, x2, y2, text) in enumerate(self.coordinates):
-                if text in name_list:
-                    if [x1, y1, x2, y2] not in coordinates:
-                        coordinates.append([x1, y1, x2, y2])
-                if len(coordinates) == len(name_list):
-                    break
+            # Get the coordinates, at most one box per name word
+            coordinates = self.token_index.boxes_for(name_list, limit=len(name_list))
             # Check for coordinates
             if not coordinates:
                 return {"names": "", "coordinates": []}
@@ -1,21 +1,25 @@
-import pytesseract
 import re
 from PIL import Image
 from helper.text_coordinates import ImageTextCoordinates
-from helper.places import places_list
+from helper.ocr_page import OCRPage
+from helper.token_index import TokenIndex
+from helper.place_matcher import place_matcher
 
 class PassportDocumentInfo:
-    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int) -> None:
+    def __init__(self, ocrr_workspace_doc_path: str, logger: object, redaction_level: int, ocr_page: OCRPage = None) -> None:
         self.ocrr_workspace_doc_path = ocrr_workspace_doc_path
         self.logger = logger
         self.redaction_level = redaction_level
-        self.coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path).generate_text_coordinates()
-        # Tesseract configuration
-        tesseract_config = r'--oem 3 --psm 11'
-        self.text_data = pytesseract.image_to_string(self.ocrr_workspace_doc_path, lang="eng", config=tesseract_config)
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(ocrr_workspace_doc_path)
+        text_coordinates = ImageTextCoordinates(self.ocrr_workspace_doc_path, ocr_page=self.ocr_page)
+        self.coordinates = text_coordinates.generate_text_coordinates()
+        # Line text rebuilt from the same Tesseract run instead of a second image_to_string pass
+        self.text_data = text_coordinates.generate_text_data()
+        # Text index over the token boxes
+        self.token_index = TokenIndex(self.coordinates)
         print(self.coordinates)
-        # List of Places
-        self.places = places_list
+        # Matcher over the list of places
+        self.place_matcher = place_matcher
 
     
     # Method to extract Passport Number and its Coordinates
@@ -25,6 +29,7 @@ class PassportDocumentInfo:
             # Extract Passport Number and its Coordinates
             passport_number = ""
             passport_number_coordinates = []
+            seen_boxes = set()
             
             # Lambada function
             check_passport_string = lambda s: re.match(r'^[A-Z][0-9]{7}$', s) is not None
@@ -36,32 +41,38 @@ class PassportDocumentInfo:
                 if check_passport_string(text):
                     passport_number += " "+text
                     # Check if [x1, y1, x2, y2] is already appended to the list
-                    if [x1, y1, x2, y2] not in passport_number_coordinates:
+                    if (x1, y1, x2, y2) not in seen_boxes:
+                        seen_boxes.add((x1, y1, x2, y2))
                         passport_number_coordinates.append([x1, y1, x2, y2])
                 elif len(text) in (6,7,8) and text.isdigit():
                     passport_number += " "+text
                     # Check if [x1, y1, x2, y2] is already appended to the list
-                    if [x1, y1, x2, y2] not in passport_number_coordinates:
+                    if (x1, y1, x2, y2) not in seen_boxes:
+                        seen_boxes.add((x1, y1, x2, y2))
                         passport_number_coordinates.append([x1, y1, x2, y2])
                 elif len(text) in (6,9,10) and text[0].isalpha() and text[0].isupper() and all_valid_characters:
                     passport_number += " "+text
                     # Check if [x1, y1, x2, y2] is already appended to the list
-                    if [x1, y1, x2, y2] not in passport_number_coordinates:
+                    if (x1, y1, x2, y2) not in seen_boxes:
+                        seen_boxes.add((x1, y1, x2, y2))
                         passport_number_coordinates.append([x1, y1, x2, y2])
                 elif len(text) in (6,7,8) and text.isupper() and text.isdigit():
                     passport_number += " "+text
                     # Check if [x1, y1, x2, y2] is already appended to the list
-                    if [x1, y1, x2, y2] not in passport_number_coordinates:
+                    if (x1, y1, x2, y2) not in seen_boxes:
+                        seen_boxes.add((x1, y1, x2, y2))
                         passport_number_coordinates.append([x1, y1, x2, y2])
                 elif len(text) in (6,7,8) and text.isdigit():
                     passport_number += " "+text
                     # Check if [x1, y1, x2, y2] is already appended to the list
-                    if [x1, y1, x2, y2] not in passport_number_coordinates:
+                    if (x1, y1, x2, y2) not in seen_boxes:
+                        seen_boxes.add((x1, y1, x2, y2))
                         passport_number_coordinates.append([x1, y1, x2, y2])
                 elif len(text) in (6, 7, 8) and all_valid_characters:
                     passport_number += " "+text
                     # Check if [x1, y1, x2, y2] is already appended to the list
-                    if [x1, y1, x2, y2] not in passport_number_coordinates:
+                    if (x1, y1, x2, y2) not in seen_boxes:
+                        seen_boxes.add((x1, y1, x2, y2))
                         passport_number_coordinates.append([x1, y1, x2, y2])
                     
             # Check if passport number is empty
@@ -148,10 +159,7 @@ class PassportDocumentInfo:
             passport_names_list = passport_names.split()
 
             # Get the coordinates of the passport names
-            for x1,y1,x2,y2,text in self.coordinates:
-                if text in passport_names_list:
-                    if [x1, y1, x2, y2] not in passport_names_coordinates:
-                        passport_names_coordinates.append([x1,y1,x2,y2])
+            passport_names_coordinates = self.token_index.boxes_for(passport_names_list)
             
             # Update the result
             for i in passport_names_coordinates:
@@ -212,19 +220,19 @@ class PassportDocumentInfo:
 
             # Loop through the coordinates
             for x1, y1, x2, y2, text in self.coordinates:
-                # Loop throgh list of places
-                for place in self.places:
-                    # Check if the text matches the place
-                    if re.search(place, text, flags=re.IGNORECASE):
-                        address += " " + text
-                        coordinates.append([x1, y1, x2, y2])
-            
+                # Check if the text matches any of the places
+                if self.place_matcher.contains_place(text):
+                    address += " " + text
+                    coordinates.append([x1, y1, x2, y2])
+            seen_boxes = {tuple(box) for box in coordinates}
+
             # Loop through the coordinates again to find the pincode
             for x1, y1, x2, y2, text in self.coordinates:
                 # Check if the text is a valid pincode number
                 if len(text) == 6 and text.isdigit():
                     address += " " + text
-                    if [x1, y1, x2, y2] not in coordinates:
+                    if (x1, y1, x2, y2) not in seen_boxes:
+                        seen_boxes.add((x1, y1, x2, y2))
                         coordinates.append([x1, y1, x2, y2])
 
             # Check if Address is not found
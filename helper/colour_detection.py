@@ -0,0 +1,78 @@
+"""
+Sampled grayscale/colour detection of documents.
+
+Grayscale used to be detected by comparing the three full-size channels of a second decode
+of the document for exact equality, which allocated two full-size masks and called every
+JPEG colour because chroma subsampling never leaves the channels exactly equal. Detection
+now works on as little of the image as possible:
+  - a grayscale mode in the file header ('L', '1', ...) answers without reading pixels
+  - a JPEG is decoded at 1/8 resolution (cv2.IMREAD_REDUCED_COLOR_8), which skips most of
+    the decode work
+  - an already decoded image is inspected on a strided sample
+A pixel is colour when the spread of its channels (max - min) exceeds tolerance, and the
+image is colour when more than max_colour_fraction of the sampled pixels are. The sample is
+scanned in bands of rows and the scan stops as soon as the colour limit is exceeded, so
+only band-sized temporaries are allocated and colour documents return after the first
+few bands.
+
+Example usage:
+    grayscale = detect_grayscale('/path/to/upload/document.jpg')
+    grayscale = is_grayscale_array(document_image.array, sample_step=4)
+"""
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# PIL modes of single-channel images
+GRAYSCALE_MODES = {'1', 'L', 'LA', 'I', 'I;16', 'I;16B', 'I;16L', 'F'}
+
+def is_grayscale_array(array: np.ndarray, tolerance: int = 12, max_colour_fraction: float = 0.002, sample_step: int = 4, band_rows: int = 128) -> bool:
+    """
+    Return True if a decoded image is grayscale within tolerance.
+
+    :param sample_step: Every sample_step-th row and column is inspected.
+    :param band_rows: Sampled rows inspected at a time.
+    """
+    if array.ndim == 2 or array.shape[2] == 1:
+        return True
+    sample = array[::sample_step, ::sample_step, :3]
+    colour_limit = int(max_colour_fraction * sample.shape[0] * sample.shape[1])
+    colour_pixels = 0
+    for row in range(0, sample.shape[0], band_rows):
+        band = sample[row:row + band_rows]
+        blue, green, red = band[..., 0], band[..., 1], band[..., 2]
+        # Element-wise over the channel views (a reduction over the channel axis is much slower);
+        # max >= min, so the uint8 difference cannot wrap around
+        spread = np.maximum(np.maximum(blue, green), red) - np.minimum(np.minimum(blue, green), red)
+        colour_pixels += int(np.count_nonzero(spread > tolerance))
+        if colour_pixels > colour_limit:
+            return False
+    return True
+
+def get_header_grayscale(path: str) -> bool:
+    """
+    Return True if the file header declares a grayscale image, None if it does not tell.
+    """
+    try:
+        # PIL only parses the header on open
+        with Image.open(path) as image:
+            return True if image.mode in GRAYSCALE_MODES else None
+    except Exception:
+        return None
+
+def detect_grayscale(path: str, tolerance: int = 12, max_colour_fraction: float = 0.002) -> bool:
+    """
+    Return whether an image file is grayscale, or None if only a full decode can tell.
+    """
+    if get_header_grayscale(path):
+        return True
+    with open(path, 'rb') as file:
+        is_jpeg = file.read(2) == b'\xff\xd8'
+    if not is_jpeg:
+        # Other formats are fully decoded even for a reduced image; check the decoded document instead
+        return None
+    array = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_REDUCED_COLOR_8)
+    if array is None:
+        return None
+    return is_grayscale_array(array, tolerance, max_colour_fraction, sample_step=1)
@@ -0,0 +1,22 @@
+"""
+Shared access to the OCRR Engine configuration file.
+
+Example usage:
+    config = read_configuration()
+    backend = config.get('OCR', 'backend', fallback='pytesseract')
+"""
+
+import configparser
+
+# Location of the OCRR Engine configuration file
+CONFIGURATION_PATH = r'C:\Program Files\OCRR\settings\configuration.ini'
+
+def read_configuration() -> configparser.ConfigParser:
+    """
+    Read and return the OCRR Engine configuration.
+
+    :return: ConfigParser loaded from CONFIGURATION_PATH (empty if the file is missing).
+    """
+    config = configparser.ConfigParser(allow_no_value=True)
+    config.read(CONFIGURATION_PATH)
+    return config
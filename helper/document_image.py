@@ -0,0 +1,130 @@
+"""
+DocumentImage: The decoded image of a document, shared by every stage of its processing.
+
+A document used to be copied into the workspace, decoded, converted to grayscale and
+re-encoded to JPEG, after which identification, Tesseract, QR detection and the rejected
+path each decoded the workspace file again. The worker now decodes the upload once into a
+DocumentImage and hands it to every consumer: the NumPy array for OpenCV, a PIL view
+(derived on first use) for Tesseract and QR detection, and the dimensions and pixel hash
+for the OCR cache and the rejected path. Nothing is written to disk unless save() is called.
+
+Files are read with np.fromfile and cv2.imdecode so that non-ASCII paths work on Windows.
+
+An image may be a downscaled version of the document (see
+process_documents/normalise_document.py). It then records its scale relative to the
+original and maps boxes back with to_original_box(), so that every coordinate leaving the
+pipeline is in original pixel space.
+
+Example usage:
+    document_image = DocumentImage.from_file('/path/to/upload/document.jpg').to_grayscale()
+    width, height = document_image.size
+    data = ocr_backend.image_to_data(document_image.pil)
+    document_image.save('/path/to/ocrr/workspace/document.jpg')
+"""
+
+import os
+import cv2
+import hashlib
+import numpy as np
+from PIL import Image
+
+class DocumentImage:
+    def __init__(self, array: np.ndarray, source_path: str = None, original_size: tuple = None) -> None:
+        """
+        :param array: Decoded image, 2-D grayscale or 3-D BGR(A) as returned by OpenCV.
+        :param source_path: File the image was decoded from.
+        :param original_size: (width, height) of the original document if the array was downscaled.
+        """
+        self.array = array
+        self.source_path = source_path
+        self.original_size = tuple(original_size) if original_size else self.size
+
+        # Scale of the array relative to the original, per axis
+        width, height = self.size
+        self.scale = (width / self.original_size[0], height / self.original_size[1])
+
+        # Derived lazily
+        self._pil_image = None
+        self._hash = None
+
+    @classmethod
+    def from_file(cls, path: str, flags: int = cv2.IMREAD_COLOR) -> 'DocumentImage':
+        """
+        Decode an image file.
+
+        :param flags: cv2.IMREAD_* decode flags.
+        :raises ValueError: If the file cannot be decoded.
+        """
+        array = cv2.imdecode(np.fromfile(path, dtype=np.uint8), flags)
+        if array is None:
+            raise ValueError(f"Failed to decode image: {path}")
+        return cls(array, source_path=path)
+
+    def to_grayscale(self) -> 'DocumentImage':
+        """
+        Return the single-channel version of the image (self if it already is).
+        """
+        if self.array.ndim == 2:
+            return self
+        if self.array.shape[2] == 4:
+            return DocumentImage(cv2.cvtColor(self.array, cv2.COLOR_BGRA2GRAY), self.source_path, self.original_size)
+        return DocumentImage(cv2.cvtColor(self.array, cv2.COLOR_BGR2GRAY), self.source_path, self.original_size)
+
+    @property
+    def is_grayscale(self) -> bool:
+        return self.array.ndim == 2
+
+    @property
+    def size(self) -> tuple:
+        """
+        (width, height) of the image.
+        """
+        height, width = self.array.shape[:2]
+        return width, height
+
+    @property
+    def is_scaled(self) -> bool:
+        return self.scale != (1.0, 1.0)
+
+    def to_original_box(self, box) -> list:
+        """
+        Map an [x1, y1, x2, y2] box of the array to original pixel space.
+        """
+        scale_x, scale_y = self.scale
+        x1, y1, x2, y2 = box[:4]
+        return [x1 / scale_x, y1 / scale_y, x2 / scale_x, y2 / scale_y]
+
+    @property
+    def pil(self) -> Image.Image:
+        """
+        PIL view of the image ('L' or 'RGB'), created on first use.
+        """
+        if self._pil_image is None:
+            if self.array.ndim == 2:
+                self._pil_image = Image.fromarray(self.array)
+            elif self.array.shape[2] == 4:
+                self._pil_image = Image.fromarray(cv2.cvtColor(self.array, cv2.COLOR_BGRA2RGB))
+            else:
+                self._pil_image = Image.fromarray(cv2.cvtColor(self.array, cv2.COLOR_BGR2RGB))
+        return self._pil_image
+
+    def get_hash(self) -> str:
+        """
+        Return the SHA-256 of the pixels, shape and dtype.
+        """
+        if self._hash is None:
+            image_hash = hashlib.sha256(f"{self.array.shape}|{self.array.dtype}".encode('utf-8'))
+            image_hash.update(np.ascontiguousarray(self.array).tobytes())
+            self._hash = image_hash.hexdigest()
+        return self._hash
+
+    def save(self, path: str) -> bool:
+        """
+        Encode the image to a file; the format follows the file extension.
+        """
+        extension = os.path.splitext(path)[1] or '.jpg'
+        encoded, buffer = cv2.imencode(extension, self.array)
+        if not encoded:
+            return False
+        buffer.tofile(path)
+        return True
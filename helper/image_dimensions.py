@@ -0,0 +1,115 @@
+"""
+Header-only image dimension probe.
+
+The rejected-document path only needs the width and height of the document, but it used to
+decode the whole image for them, on every rejection. get_image_dimensions() reads them from
+the file header instead: the SOF segment of a JPEG (honouring the EXIF orientation, which
+OpenCV applies when it decodes), the first IFD of a TIFF, or the IHDR chunk of a PNG. Other
+formats fall back to a lazy PIL open, which also reads the header only. A few hundred bytes
+are read, however large the scan is.
+
+Example usage:
+    width, height = get_image_dimensions('/path/to/upload/document.jpg')
+"""
+
+import struct
+from PIL import Image
+
+# JPEG start-of-frame markers (all except DHT, JPG and DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# JPEG markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+
+# TIFF tags
+TIFF_IMAGE_WIDTH = 256
+TIFF_IMAGE_LENGTH = 257
+TIFF_ORIENTATION = 274
+
+def _read_tiff_tags(data: bytes, tags: set) -> dict:
+    # Read SHORT/LONG values of the wanted tags from the first IFD of a TIFF structure
+    byte_order = {b'II': '<', b'MM': '>'}.get(data[:2])
+    if byte_order is None or struct.unpack(byte_order + 'H', data[2:4])[0] != 42:
+        return {}
+    ifd_offset = struct.unpack(byte_order + 'I', data[4:8])[0]
+    entry_count = struct.unpack(byte_order + 'H', data[ifd_offset:ifd_offset + 2])[0]
+    values = {}
+    for index in range(entry_count):
+        entry = data[ifd_offset + 2 + 12 * index:ifd_offset + 14 + 12 * index]
+        if len(entry) < 12:
+            break
+        tag, field_type = struct.unpack(byte_order + 'HH', entry[:4])
+        if tag not in tags:
+            continue
+        # SHORT values are left-aligned in the 4-byte value field
+        if field_type == 3:
+            values[tag] = struct.unpack(byte_order + 'H', entry[8:10])[0]
+        elif field_type == 4:
+            values[tag] = struct.unpack(byte_order + 'I', entry[8:12])[0]
+    return values
+
+def _probe_jpeg(file) -> tuple:
+    orientation = 1
+    file.seek(2)
+    while True:
+        byte = file.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = file.read(1)
+        # Fill bytes
+        while marker == b'\xff':
+            marker = file.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in JPEG_STANDALONE_MARKERS or marker == 0x00:
+            continue
+        segment_length = struct.unpack('>H', file.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            _, height, width = struct.unpack('>BHH', file.read(5))
+            # Orientations 5-8 are rotated by 90 degrees when decoded
+            if orientation in (5, 6, 7, 8):
+                return height, width
+            return width, height
+        segment = file.read(segment_length - 2)
+        if marker == 0xE1 and segment.startswith(b'Exif\x00\x00'):
+            orientation = _read_tiff_tags(segment[6:], {TIFF_ORIENTATION}).get(TIFF_ORIENTATION, 1)
+
+def _probe_tiff(file) -> tuple:
+    # The first IFD is usually at the start of the file; read more only when it is not
+    file.seek(0)
+    data = file.read(64 * 1024)
+    ifd_offset = struct.unpack(('<' if data[:2] == b'II' else '>') + 'I', data[4:8])[0]
+    if ifd_offset + 2 + 12 * 64 > len(data):
+        file.seek(0)
+        data = file.read(ifd_offset + 2 + 12 * 256)
+    values = _read_tiff_tags(data, {TIFF_IMAGE_WIDTH, TIFF_IMAGE_LENGTH})
+    if TIFF_IMAGE_WIDTH in values and TIFF_IMAGE_LENGTH in values:
+        return values[TIFF_IMAGE_WIDTH], values[TIFF_IMAGE_LENGTH]
+    return None
+
+def get_image_dimensions(path: str) -> tuple:
+    """
+    Return the (width, height) of an image file without decoding its pixels.
+
+    :raises OSError: If the file cannot be read or is not an image.
+    """
+    dimensions = None
+    with open(path, 'rb') as file:
+        signature = file.read(8)
+        try:
+            if signature[:2] == b'\xff\xd8':
+                dimensions = _probe_jpeg(file)
+            elif signature[:4] in (b'II*\x00', b'MM\x00*'):
+                dimensions = _probe_tiff(file)
+            elif signature == b'\x89PNG\r\n\x1a\n':
+                file.seek(16)
+                dimensions = struct.unpack('>II', file.read(8))
+        except struct.error:
+            dimensions = None
+    if dimensions is None:
+        # Unknown or unusual layout: PIL only parses the header on open
+        with Image.open(path) as image:
+            dimensions = image.size
+    return tuple(dimensions)
@@ -0,0 +1,160 @@
+"""
+KeywordIndex: OCR-tolerant lookup of the anchor keywords used by the extractors.
+
+The extractors locate fields relative to anchor words such as "enrolment", "female", "dob"
+and "father". OCR garbles them in many ways, and each variant seen in the field used to be
+appended to a hand-written regex alternation scanned with re.search for every line.
+KeywordIndex stores the canonical keywords, together with the legacy variants as aliases,
+in a BK-tree and answers "is this word ~ keyword K" by edit distance. The allowed distance
+grows with the length of the indexed word (0 up to 4 characters, 1 up to 7, 2 beyond), so
+new misspellings of long words match without being listed while short words stay exact.
+Keywords in EXACT_KEYWORDS match their listed variants only: one edit away from "father"
+are surnames such as "Rather" and "Mather", which must not be taken for the anchor.
+Lookups are memoized, so repeated words are answered in constant time.
+
+Example usage:
+    if keyword_index.contains_keyword(text, ["dob", "birth"]):
+        ...
+    canonical_keyword = keyword_index.lookup("Fermale")   # "female"
+"""
+
+import re
+import threading
+
+# Canonical keywords with the OCR variants observed in the field
+OCR_KEYWORDS = {
+    "enrolment": ["enrollment", "enrolknant", "encolent", "enroiiment", "enrotment", "enroliment", "enrotiment",
+                  "enrotimant", "enrallment", "ehyollment", "enrollmentno"],
+    "female": ["fmale", "femalp", "femali", "femere", "femala", "fenate", "femate", "femste", "fomale", "fertale",
+               "femsle", "fade", "ferme", "famate"],
+    "male": ["mate", "mala", "malo"],
+    "dob": ["doe", "dow", "dor", "dod", "oob", "rryoob", "d08b"],
+    "birth": ["bieth", "binh"],
+    "father": ["eather", "fathar", "fathers", "ffatugr", "ffatubr", "hratlifies", "facer", "pacers", "hratlieies", "gather"]
+}
+
+# Keywords close to common names; only their listed variants match
+EXACT_KEYWORDS = {"father"}
+
+# Words of OCR text
+WORD_REGEX = re.compile(r"\w+")
+
+def _levenshtein_distance(word_1: str, word_2: str) -> int:
+    # Classic dynamic programming edit distance on two rows
+    if len(word_1) < len(word_2):
+        word_1, word_2 = word_2, word_1
+    previous_row = list(range(len(word_2) + 1))
+    for i, char_1 in enumerate(word_1, start=1):
+        current_row = [i]
+        for j, char_2 in enumerate(word_2, start=1):
+            current_row.append(min(previous_row[j] + 1, current_row[j - 1] + 1, previous_row[j - 1] + (char_1 != char_2)))
+        previous_row = current_row
+    return previous_row[-1]
+
+def max_edit_distance(word: str) -> int:
+    """
+    Return the number of OCR errors tolerated for an indexed word of this length.
+    """
+    if len(word) <= 4:
+        return 0
+    if len(word) <= 7:
+        return 1
+    return 2
+
+class KeywordIndex:
+    def __init__(self, keywords: dict) -> None:
+        # Indexed word -> canonical keyword
+        self._canonical = {}
+        for keyword, aliases in keywords.items():
+            for word in [keyword] + aliases:
+                self._canonical[word.lower()] = keyword
+        self._suffix_lengths = sorted({len(word) for word in self._canonical})
+        self._max_distance = max(self._tolerance(word) for word in self._canonical)
+
+        # BK-tree node: [word, {distance: child node}]
+        self._root = None
+        for word in self._canonical:
+            self._add(word)
+
+        # Memoized lookups; OCR text repeats the same words across documents
+        self._cache = {}
+        self._cache_size = 50000
+        self._lock = threading.Lock()
+
+    def _tolerance(self, word: str) -> int:
+        # Edit distance tolerated for an indexed word
+        if self._canonical[word] in EXACT_KEYWORDS:
+            return 0
+        return max_edit_distance(word)
+
+    def _add(self, word: str) -> None:
+        if self._root is None:
+            self._root = [word, {}]
+            return
+        node = self._root
+        while True:
+            distance = _levenshtein_distance(word, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [word, {}]
+                return
+            node = child
+
+    def _search(self, word: str) -> str:
+        # Walk the BK-tree within the largest tolerated distance and keep the closest hit
+        best_word, best_distance = None, None
+        nodes = [self._root]
+        while nodes:
+            node_word, children = nodes.pop()
+            distance = _levenshtein_distance(word, node_word)
+            if distance <= self._tolerance(node_word) and (best_distance is None or distance < best_distance):
+                best_word, best_distance = node_word, distance
+            for child_distance, child in children.items():
+                if distance - self._max_distance <= child_distance <= distance + self._max_distance:
+                    nodes.append(child)
+        return self._canonical[best_word] if best_word is not None else None
+
+    def lookup(self, word: str) -> str:
+        """
+        Return the canonical keyword the word is a (possibly misread) form of, or None.
+        """
+        word = word.lower()
+        if word in self._cache:
+            return self._cache[word]
+        canonical_keyword = self._canonical.get(word)
+        if canonical_keyword is None and self._root is not None:
+            canonical_keyword = self._search(word)
+        with self._lock:
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[word] = canonical_keyword
+        return canonical_keyword
+
+    def _has_suffix(self, word: str, keywords: list) -> bool:
+        # Exact match of an indexed word of the keywords at the end of a longer word, e.g. "enrolment" in "evavenrolment"
+        word = word.lower()
+        for length in self._suffix_lengths:
+            if length >= len(word):
+                break
+            # Every suffix is checked; a shorter one may belong to another keyword
+            if self._canonical.get(word[-length:]) in keywords:
+                return True
+        return False
+
+    def contains_keyword(self, text: str, keywords: list, suffix: bool = False) -> bool:
+        """
+        Check if any word of the text is one of the canonical keywords.
+
+        :param text: OCR token or line.
+        :param keywords: Canonical keywords to look for.
+        :param suffix: Also accept words ending with a keyword (legacy \\b\\w*(...) patterns).
+        """
+        for word in WORD_REGEX.findall(text):
+            if self.lookup(word) in keywords:
+                return True
+            if suffix and self._has_suffix(word, keywords):
+                return True
+        return False
+
+# Built once per process from the OCR keyword list
+keyword_index = KeywordIndex(OCR_KEYWORDS)
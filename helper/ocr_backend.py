@@ -0,0 +1,178 @@
+"""
+OCR backends used by OCRPage to run Tesseract.
+
+PytesseractBackend forks the tesseract binary for every call, reloading the language
+models each time. TesserocrBackend keeps a TessBaseAPI handle per worker thread with the
+traineddata loaded once and reuses it across documents; '-c' variables of a call are reset
+afterwards so they do not leak into calls with another config. tesserocr is an optional
+dependency (see requirements.txt). Both return the same image_to_data DICT layout so
+consumers do not care which one is in use.
+
+The backend is selected with the [OCR] section of configuration.ini:
+    [OCR]
+    backend = tesserocr
+    tessdata_path = C:\\Program Files\\Tesseract-OCR\\tessdata
+
+Example usage:
+    ocr_backend = get_ocr_backend()
+    data = ocr_backend.image_to_data('/path/to/document.jpg', lang="eng", config=r'--oem 3 --psm 11')
+"""
+
+import logging
+import shlex
+import threading
+import pytesseract
+from PIL import Image
+from helper.configuration import read_configuration
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Column layout of the Tesseract TSV output
+TSV_COLUMNS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num', 'left', 'top', 'width', 'height', 'conf', 'text']
+
+class PytesseractBackend:
+    name = "pytesseract"
+
+    def image_to_data(self, image, lang: str = "eng", config: str = "") -> dict:
+        """
+        Run Tesseract through the pytesseract subprocess wrapper.
+        """
+        return pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT, lang=lang, config=config)
+
+class TesserocrBackend:
+    name = "tesserocr"
+
+    def __init__(self, tessdata_path: str = None) -> None:
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed")
+        self.tessdata_path = tessdata_path
+        # One set of TessBaseAPI handles per worker thread
+        self._local = threading.local()
+
+    def _get_api(self, lang: str, oem: int) -> object:
+        # Get the handle for this thread, loading the traineddata on first use only
+        handles = getattr(self._local, 'handles', None)
+        if handles is None:
+            handles = self._local.handles = {}
+        key = (lang, oem)
+        if key not in handles:
+            if self.tessdata_path:
+                handles[key] = tesserocr.PyTessBaseAPI(path=self.tessdata_path, lang=lang, oem=tesserocr.OEM(oem))
+            else:
+                handles[key] = tesserocr.PyTessBaseAPI(lang=lang, oem=tesserocr.OEM(oem))
+        return handles[key]
+
+    @staticmethod
+    def _parse_config(lang: str, config: str) -> tuple:
+        # Translate tesseract command line options to TessBaseAPI settings
+        oem = 3
+        psm = 3
+        variables = {}
+        options = shlex.split(config or "")
+        index = 0
+        while index < len(options):
+            option = options[index]
+            value = options[index + 1] if index + 1 < len(options) else None
+            if option == '--oem':
+                oem = int(value)
+                index += 1
+            elif option == '--psm':
+                psm = int(value)
+                index += 1
+            elif option == '-l':
+                lang = value
+                index += 1
+            elif option == '-c':
+                name, _, variable_value = value.partition('=')
+                variables[name] = variable_value
+                index += 1
+            index += 1
+        return lang, oem, psm, variables
+
+    @staticmethod
+    def _tsv_to_dict(tsv: str) -> dict:
+        # Convert TSV rows to the pytesseract.Output.DICT layout
+        data = {column: [] for column in TSV_COLUMNS}
+        for row in tsv.splitlines():
+            if not row:
+                continue
+            cells = row.split('\t')
+            if len(cells) < len(TSV_COLUMNS):
+                cells.append('')
+            for column, cell in zip(TSV_COLUMNS, cells):
+                if column != 'text':
+                    try:
+                        cell = int(float(cell))
+                    except ValueError:
+                        pass
+                data[column].append(cell)
+        return data
+
+    def image_to_data(self, image, lang: str = "eng", config: str = "") -> dict:
+        """
+        Run Tesseract in-process on the worker's persistent TessBaseAPI handle.
+        """
+        lang, oem, psm, variables = self._parse_config(lang, config)
+        api = self._get_api(lang, oem)
+        # Values the -c variables had before this call; the handle is reused with other configs
+        previous_values = {}
+        try:
+            api.SetPageSegMode(tesserocr.PSM(psm))
+            for name, value in variables.items():
+                previous_values[name] = api.GetVariableAsString(name)
+                api.SetVariable(name, value)
+            if isinstance(image, str):
+                api.SetImageFile(image)
+            elif isinstance(image, Image.Image):
+                api.SetImage(image)
+            else:
+                api.SetImage(Image.fromarray(image))
+            api.Recognize()
+            return self._tsv_to_dict(api.GetTSVText(0))
+        finally:
+            # Drop the page but keep the loaded language models
+            api.Clear()
+            for name, value in previous_values.items():
+                if value is not None:
+                    api.SetVariable(name, value)
+
+    def end(self) -> None:
+        """
+        Release the TessBaseAPI handles of the calling thread.
+        """
+        for api in getattr(self._local, 'handles', {}).values():
+            api.End()
+        self._local.handles = {}
+
+_ocr_backend = None
+_ocr_backend_lock = threading.Lock()
+
+def get_ocr_backend() -> object:
+    """
+    Return the process-wide OCR backend selected in configuration.ini.
+
+    Falls back to pytesseract when tesserocr is requested but not available.
+    """
+    global _ocr_backend
+    if _ocr_backend is None:
+        with _ocr_backend_lock:
+            if _ocr_backend is None:
+                config = read_configuration()
+                backend_name = config.get('OCR', 'backend', fallback='pytesseract').strip().lower()
+                tessdata_path = config.get('OCR', 'tessdata_path', fallback=None)
+                _ocr_backend = create_ocr_backend(backend_name, tessdata_path)
+    return _ocr_backend
+
+def create_ocr_backend(backend_name: str, tessdata_path: str = None) -> object:
+    """
+    Create an OCR backend by name ('pytesseract' or 'tesserocr').
+    """
+    if backend_name == TesserocrBackend.name:
+        try:
+            return TesserocrBackend(tessdata_path)
+        except Exception as e:
+            logging.getLogger('OCRR').warning(f"| Failed to initialize tesserocr backend, falling back to pytesseract: {e}")
+    return PytesseractBackend()
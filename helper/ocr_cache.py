@@ -0,0 +1,133 @@
+"""
+OCRCache: A persistent, content-addressed cache of Tesseract token tables.
+
+Entries are keyed by the SHA-256 of the decoded image and the OCR configuration
+(backend, lang, --oem/--psm options), so a re-uploaded scan or a document re-processed
+after a restart skips Tesseract entirely. The cache lives in a SQLite database in the
+OCRR workspace, is bounded in size and evicts the least recently used entries first.
+
+The cache is configured with the [OCRCache] section of configuration.ini:
+    [OCRCache]
+    enabled = on
+    max_size_mb = 512
+    path = C:\\Program Files\\OCRR\\workspace\\ocr_cache.sqlite3
+
+Example usage:
+    ocr_cache = get_ocr_cache()
+    data = ocr_cache.get(image_hash, ocr_config)
+    if data is None:
+        data = ocr_backend.image_to_data(image, lang=lang, config=config)
+        ocr_cache.put(image_hash, ocr_config, data)
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from helper.configuration import read_configuration
+
+class OCRCache:
+    def __init__(self, cache_path: str, max_size_bytes: int) -> None:
+        self.cache_path = cache_path
+        self.max_size_bytes = max_size_bytes
+
+        # Hit/miss counters for this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        self._connection = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS ocr_cache (cache_key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_access ON ocr_cache (last_access)")
+
+    @staticmethod
+    def _cache_key(image_hash: str, ocr_config: str) -> str:
+        return f"{image_hash}|{ocr_config}"
+
+    def get(self, image_hash: str, ocr_config: str) -> dict:
+        """
+        Return the cached token table or None on a miss.
+        """
+        cache_key = self._cache_key(image_hash, ocr_config)
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM ocr_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE ocr_cache SET last_access = ? WHERE cache_key = ?", (time.time(), cache_key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, image_hash: str, ocr_config: str, data: dict) -> None:
+        """
+        Store a token table and evict least recently used entries beyond the size bound.
+        """
+        cache_key = self._cache_key(image_hash, ocr_config)
+        blob = zlib.compress(json.dumps(data).encode('utf-8'))
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO ocr_cache (cache_key, data, size, last_access) VALUES (?, ?, ?, ?)", (cache_key, blob, len(blob), time.time()))
+            self._evict()
+
+    def _evict(self) -> None:
+        # Delete the least recently used entries until the cache fits in max_size_bytes
+        total_size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+        rows = self._connection.execute("SELECT cache_key, size FROM ocr_cache ORDER BY last_access ASC").fetchall()
+        evicted_keys = []
+        for cache_key, size in rows:
+            if total_size <= self.max_size_bytes:
+                break
+            evicted_keys.append((cache_key,))
+            total_size -= size
+        self._connection.executemany("DELETE FROM ocr_cache WHERE cache_key = ?", evicted_keys)
+        self.evictions += len(evicted_keys)
+
+    def get_stats(self) -> dict:
+        """
+        Return the hit/miss/eviction counters of this process.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+_ocr_cache = None
+_ocr_cache_pid = None
+_ocr_cache_lock = threading.Lock()
+
+def get_ocr_cache() -> OCRCache:
+    """
+    Return the OCR cache of this process, or None if it is disabled in configuration.ini.
+    """
+    global _ocr_cache, _ocr_cache_pid
+    # SQLite connections must not be shared with forked worker processes
+    if _ocr_cache_pid != os.getpid():
+        with _ocr_cache_lock:
+            if _ocr_cache_pid != os.getpid():
+                _ocr_cache = _create_ocr_cache()
+                _ocr_cache_pid = os.getpid()
+    return _ocr_cache
+
+def _create_ocr_cache() -> OCRCache:
+    config = read_configuration()
+    if config.get('OCRCache', 'enabled', fallback='off').strip().lower() != 'on':
+        return None
+    try:
+        cache_path = config.get('OCRCache', 'path', fallback=None)
+        if not cache_path:
+            cache_path = os.path.join(config.get('Paths', 'workspace', fallback=os.getcwd()), 'ocr_cache.sqlite3')
+        max_size_bytes = int(float(config.get('OCRCache', 'max_size_mb', fallback='512')) * 1024 * 1024)
+        return OCRCache(cache_path, max_size_bytes)
+    except Exception as e:
+        logging.getLogger('OCRR').error(f"| Failed to open OCR cache, continuing without it: {e}")
+        return None
@@ -0,0 +1,126 @@
+"""
+OCRPage: A per-document holder for Tesseract results.
+
+A single document used to be OCR'd once for every candidate document type during
+identification and then again by the matched extractor. OCRPage runs Tesseract at most
+once per distinct (lang, config) pair and hands the memoized result to every consumer
+of the document: identification, the extractors and the rejected document path.
+
+Tesseract is run through the configured OCR backend (see helper/ocr_backend.py) and
+token tables are looked up in the persistent OCR cache first (see helper/ocr_cache.py).
+The cache is an optimisation only: when it fails (e.g. a lock timeout on the shared SQLite
+file), the error is logged and Tesseract runs as without a cache.
+
+The page also carries the decoded DocumentImage of the document (see
+helper/document_image.py). Workers pass the image they decoded from the upload; without
+one, the document path is decoded on first use. When the image was downscaled by the
+normalisation stage, image_to_data() maps the token boxes back to original pixel space,
+so consumers always work in the coordinates of the original document.
+
+Example usage:
+    ocr_page = OCRPage(document_path, document_image=document_image)
+    data = ocr_page.image_to_data(lang="eng", config=r'--oem 3 --psm 11')
+    width, height = ocr_page.get_image_size()
+    qrcodes = locate_qr_codes(ocr_page.get_document_image())
+"""
+
+import logging
+from PIL import Image
+from helper.ocr_backend import get_ocr_backend
+from helper.ocr_cache import get_ocr_cache
+from helper.document_image import DocumentImage
+from helper.image_dimensions import get_image_dimensions
+
+class OCRPage:
+    def __init__(self, document_path: str, ocr_backend: object = None, ocr_cache: object = None, document_image: DocumentImage = None, logger: object = None) -> None:
+        self.document_path = document_path
+        self.logger = logger if logger is not None else logging.getLogger('OCRR')
+        self.ocr_backend = ocr_backend if ocr_backend is not None else get_ocr_backend()
+        self.ocr_cache = ocr_cache if ocr_cache is not None else get_ocr_cache()
+
+        # Memoized Tesseract results keyed by (lang, config)
+        self._ocr_data = {}
+
+        # Decoded image of the document; decoded from document_path on first use if not given
+        self.document_image = document_image
+
+        # Image dimensions (width, height) probed from the file header
+        self._image_size = None
+
+    def image_to_data(self, lang: str = "eng", config: str = "") -> dict:
+        """
+        Return the image_to_data DICT output, running Tesseract only on the first call.
+        """
+        key = (lang, config)
+        if key not in self._ocr_data:
+            data = None
+            ocr_config = f"{self.ocr_backend.name}|{lang}|{config}"
+            if self.ocr_cache is not None:
+                try:
+                    data = self.ocr_cache.get(self.get_image_hash(), ocr_config)
+                except Exception as e:
+                    self.logger.warning(f"| OCR cache lookup failed, running Tesseract: {e}")
+            if data is None:
+                data = self.ocr_backend.image_to_data(self._get_ocr_input(), lang=lang, config=config)
+                if self.ocr_cache is not None:
+                    try:
+                        self.ocr_cache.put(self.get_image_hash(), ocr_config, data)
+                    except Exception as e:
+                        self.logger.warning(f"| Failed to store OCR result in the cache: {e}")
+            self._ocr_data[key] = self._to_original_coordinates(data)
+        return self._ocr_data[key]
+
+    def _to_original_coordinates(self, data: dict) -> dict:
+        # Map the token boxes of a downscaled image back to original pixel space
+        if self.document_image is None or not self.document_image.is_scaled:
+            return data
+        data = dict(data)
+        lefts, tops, widths, heights = [], [], [], []
+        for left, top, width, height in zip(data['left'], data['top'], data['width'], data['height']):
+            x1, y1, x2, y2 = self.document_image.to_original_box([left, top, left + width, top + height])
+            x1, y1, x2, y2 = int(round(x1)), int(round(y1)), int(round(x2)), int(round(y2))
+            lefts.append(x1)
+            tops.append(y1)
+            widths.append(x2 - x1)
+            heights.append(y2 - y1)
+        data['left'], data['top'], data['width'], data['height'] = lefts, tops, widths, heights
+        return data
+
+    def _get_ocr_input(self) -> object:
+        # The in-memory image when the worker decoded one; otherwise Tesseract reads the file itself
+        if self.document_image is not None:
+            return self.document_image.pil
+        return self.document_path
+
+    def get_document_image(self) -> DocumentImage:
+        """
+        Return the decoded image of the document.
+        """
+        if self.document_image is None:
+            self.document_image = DocumentImage.from_file(self.document_path)
+        return self.document_image
+
+    def get_pil_image(self) -> Image.Image:
+        """
+        Return the PIL view of the document image.
+        """
+        return self.get_document_image().pil
+
+    def get_image_hash(self) -> str:
+        """
+        Return the SHA-256 of the decoded image pixels.
+        """
+        return self.get_document_image().get_hash()
+
+    def get_image_size(self) -> tuple:
+        """
+        Return the (width, height) of the document image.
+
+        Known from the image when it is in memory (the original size if it was downscaled),
+        otherwise read from the file header without decoding the pixels.
+        """
+        if self.document_image is not None:
+            return self.document_image.original_size
+        if self._image_size is None:
+            self._image_size = get_image_dimensions(self.document_path)
+        return self._image_size
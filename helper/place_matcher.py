@@ -0,0 +1,101 @@
+"""
+PlaceMatcher: Find the places of helper.places.places_list in OCR text in one pass.
+
+The address extractors used to run re.search(place, text, flags=re.IGNORECASE) for every
+entry of places_list against every OCR token. PlaceMatcher compiles the list once into a
+case-insensitive Aho-Corasick automaton, so each token (or a whole line, for multi-word
+places) is scanned once, whatever the number of places. The matching semantics stay the
+same: a token matches if any place occurs anywhere in it. The few entries containing regex
+metacharacters (e.g. "p.n.patti", "neyveli (TS)") keep being evaluated as regular
+expressions, exactly as before.
+
+Example usage:
+    if place_matcher.contains_place(text):
+        address += " " + text
+    places = place_matcher.find_places("near firozpur road, ludhiana")
+"""
+
+import re
+from collections import deque
+from helper.places import places_list
+
+# Characters which give a place entry a regex meaning different from its literal text
+REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
+
+class PlaceMatcher:
+    def __init__(self, places: list) -> None:
+        # Automaton: goto transitions, failure links and the places ending at each state
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        # Entries which must still be evaluated as regular expressions
+        self._regex_places = []
+
+        for place in places:
+            if not place:
+                continue
+            if any(char in REGEX_METACHARACTERS for char in place):
+                self._regex_places.append((place, re.compile(place, flags=re.IGNORECASE)))
+            else:
+                self._add_place(place)
+        self._build_failure_links()
+
+    def _add_place(self, place: str) -> None:
+        state = 0
+        for char in place.lower():
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(place)
+
+    def _build_failure_links(self) -> None:
+        # Breadth-first walk; every state inherits the outputs of its failure state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and char not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._goto[fail_state].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _scan(self, text: str):
+        # Yield the places found while walking the automaton over the text once
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                yield from output[state]
+
+    def contains_place(self, text: str) -> bool:
+        """
+        Return True if any place occurs in the text (case-insensitive substring match).
+        """
+        for _ in self._scan(text):
+            return True
+        return any(pattern.search(text) for _, pattern in self._regex_places)
+
+    def find_places(self, text: str) -> list:
+        """
+        Return every distinct place occurring in the text, in order of first occurrence.
+
+        The text may be a single token or a whole line, so multi-word places are found too.
+        """
+        places = list(dict.fromkeys(self._scan(text)))
+        places.extend(place for place, pattern in self._regex_places if pattern.search(text))
+        return places
+
+# Built once per process from the list of places
+place_matcher = PlaceMatcher(places_list)
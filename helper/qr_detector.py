@@ -0,0 +1,157 @@
+"""
+Process-wide QR code detector shared by the document extractors.
+
+Constructing QReader loads the QR detection model, which used to happen inside every
+_extract_*_qr_codes call. The detector is now created lazily once per process, reused
+across documents and threads, and can be warmed up at engine start so the first
+QR-bearing document does not pay the model load.
+
+locate_qr_codes() is a tiered locator: OpenCV's QRCodeDetector first runs on a downscaled
+grayscale copy of the document, and the deep QReader model is only used when that cheap
+pass finds nothing on a document type which must carry a QR code (Aadhaar, E-Aadhaar,
+E-Pancard). On those types a missed code would reject the document or leave its personal
+data unredacted. Driving License and Pancard codes are optional, so their documents only
+get the cheap pass. [QRDetection] predetect = off skips the cheap pass and runs QReader on
+every document, as before. Whether a missing QR code rejects the document stays with the
+extractors. Both tiers return detections with a 'bbox_xyxy' in original image coordinates.
+Given a DocumentImage which was downscaled by the normalisation stage, the boxes are mapped
+back to the original document.
+
+Example usage:
+    warm_up_qr_reader(logger)
+    qrcodes = locate_qr_codes(image, qr_required=True)
+    for qr in qrcodes:
+        x1, y1, x2, y2 = qr['bbox_xyxy']
+"""
+
+import os
+import cv2
+import logging
+import threading
+import numpy as np
+from PIL import Image
+from qreader import QReader
+from helper.configuration import read_configuration
+from helper.document_image import DocumentImage
+
+# Longest side of the grayscale copy scanned by the OpenCV pre-detector
+QR_PREDETECT_MAX_SIDE = 1280
+
+_qr_reader = None
+_qr_reader_pid = None
+_qr_reader_lock = threading.Lock()
+_predetect_enabled = None
+# Model inference is not guaranteed to be thread-safe; serialize detect calls
+_qr_detect_lock = threading.Lock()
+
+def get_qr_reader() -> QReader:
+    """
+    Return the QReader of this process, loading the model on first use.
+    """
+    global _qr_reader, _qr_reader_pid
+    # Model handles must not be shared with forked worker processes
+    if _qr_reader_pid != os.getpid():
+        with _qr_reader_lock:
+            if _qr_reader_pid != os.getpid():
+                _qr_reader = QReader()
+                _qr_reader_pid = os.getpid()
+    return _qr_reader
+
+def detect_qr_codes(image) -> list:
+    """
+    Detect the QR codes of an image with the shared QReader.
+
+    :param image: PIL image or numpy array of the document.
+    :return: QReader detections, each with a 'bbox_xyxy' entry.
+    """
+    qr_reader = get_qr_reader()
+    with _qr_detect_lock:
+        return qr_reader.detect(image)
+
+def warm_up_qr_reader(logger: object = None) -> None:
+    """
+    Load the QR detection model and run one inference on a blank image.
+    """
+    logger = logger if logger is not None else logging.getLogger('OCRR')
+    try:
+        detect_qr_codes(np.zeros((64, 64, 3), dtype=np.uint8))
+        logger.info("| QR detector model loaded.")
+    except Exception as e:
+        logger.error(f"| Failed to warm up QR detector: {e}")
+
+def _to_grayscale_array(image) -> np.ndarray:
+    # PIL images and RGB/BGR/gray arrays are all reduced to one 8-bit channel
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert('L'))
+    if image.ndim == 3 and image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+def predetect_qr_codes(image, max_side: int = QR_PREDETECT_MAX_SIDE) -> list:
+    """
+    Locate QR codes with OpenCV's QRCodeDetector on a downscaled grayscale copy.
+
+    :param image: PIL image or numpy array of the document.
+    :param max_side: Longest side of the copy that is scanned.
+    :return: Detections with 'bbox_xyxy' rescaled to the original image.
+    """
+    gray = _to_grayscale_array(image)
+    height, width = gray.shape[:2]
+    scale = min(1.0, max_side / float(max(height, width)))
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+    found, points = cv2.QRCodeDetector().detectMulti(gray)
+    if not found or points is None:
+        return []
+
+    qrcodes = []
+    for quad in points:
+        # Corner points back to original coordinates, then to an axis-aligned box
+        quad = np.asarray(quad, dtype=np.float64).reshape(-1, 2) / scale
+        x1, y1 = np.clip(quad.min(axis=0), 0, None)
+        x2, y2 = quad.max(axis=0)
+        qrcodes.append({
+            'bbox_xyxy': np.array([x1, y1, min(x2, width), min(y2, height)]),
+            'quad_xy': quad,
+            'confidence': None
+        })
+    return qrcodes
+
+def is_predetect_enabled() -> bool:
+    """
+    Return the [QRDetection] predetect setting, read once per process.
+    """
+    global _predetect_enabled
+    if _predetect_enabled is None:
+        config = read_configuration()
+        _predetect_enabled = config.get('QRDetection', 'predetect', fallback='on').strip().lower() == 'on'
+    return _predetect_enabled
+
+def locate_qr_codes(image, qr_required: bool = True) -> list:
+    """
+    Locate QR codes with the OpenCV pre-detector, escalating to QReader if needed.
+
+    :param image: DocumentImage, PIL image or numpy array of the document.
+    :param qr_required: The document type must carry a QR code; run QReader when the cheap pass finds nothing.
+    :return: Detections, each with a 'bbox_xyxy' entry in original coordinates.
+    """
+    if isinstance(image, DocumentImage):
+        qrcodes = locate_qr_codes(image.pil, qr_required)
+        if image.is_scaled:
+            for qr in qrcodes:
+                qr['bbox_xyxy'] = np.array(image.to_original_box(qr['bbox_xyxy']))
+        return qrcodes
+    if not is_predetect_enabled():
+        return detect_qr_codes(image)
+    try:
+        qrcodes = predetect_qr_codes(image)
+        if qrcodes:
+            return qrcodes
+    except Exception as e:
+        logging.getLogger('OCRR').warning(f"| OpenCV QR pre-detection failed: {e}")
+    if not qr_required:
+        return []
+    return detect_qr_codes(image)
@@ -1,24 +1,29 @@
-import cv2
-import pytesseract
+from helper.ocr_page import OCRPage
 
 class ImageTextCoordinates:
-    def __init__(self, document_path: str, lang=None):
+    def __init__(self, document_path: str, lang=None, ocr_page: OCRPage = None):
         self.document_path = document_path
         self.lang = lang
-    
-    def generate_text_coordinates(self) -> list:
+        # Reuse the document's OCR results when available
+        self.ocr_page = ocr_page if ocr_page is not None else OCRPage(document_path)
+
+    def _get_ocr_data(self) -> dict:
         data = None
         if self.lang is None:
             # Tesseract configuration
             tesseract_config = r'--oem 3 --psm 11'
-            data = pytesseract.image_to_data(self.document_path, output_type=pytesseract.Output.DICT, lang="eng", config=tesseract_config)
+            data = self.ocr_page.image_to_data(lang="eng", config=tesseract_config)
         elif self.lang == "default":
-            data = pytesseract.image_to_data(self.document_path, output_type=pytesseract.Output.DICT, lang="eng")
+            data = self.ocr_page.image_to_data(lang="eng")
         elif self.lang == "regionalplus":
             # Tesseract configuration
             tesseract_config = r'--oem 3 --psm 11 -l hin+eng'
-            data = pytesseract.image_to_data(self.document_path, output_type=pytesseract.Output.DICT, lang="hin+eng", config=tesseract_config)
-        
+            data = self.ocr_page.image_to_data(lang="hin+eng", config=tesseract_config)
+        return data
+
+    def generate_text_coordinates(self) -> list:
+        data = self._get_ocr_data()
+
         coordinates = []
         for i in range(len(data['text'])):
             text = data['text'][i]
@@ -26,4 +31,39 @@ class ImageTextCoordinates:
             # Filter out empty strings and  special characters
             if text.strip() != '':
                 coordinates.append((x, y, x + w, y + h, text))
-        return coordinates
\ No newline at end of file
+        return coordinates
+
+    def generate_text_lines(self) -> list:
+        """
+        Rebuild the text lines of the document from the image_to_data token table.
+
+        Tokens sharing the same (block_num, par_num, line_num) form one line, in the
+        order Tesseract reports them, which is the order image_to_string prints them.
+
+        :return: List of lines, each {"text": str, "coordinates": [(x1, y1, x2, y2, text), ...]}.
+        """
+        data = self._get_ocr_data()
+
+        lines = []
+        current_line_key = None
+        for i in range(len(data['text'])):
+            text = data['text'][i]
+            # Filter out empty strings
+            if text.strip() == '':
+                continue
+            line_key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            if line_key != current_line_key:
+                lines.append({"text": "", "coordinates": []})
+                current_line_key = line_key
+            x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
+            lines[-1]["coordinates"].append((x, y, x + w, y + h, text))
+
+        for line in lines:
+            line["text"] = " ".join(text.strip() for *_, text in line["coordinates"])
+        return lines
+
+    def generate_text_data(self) -> str:
+        """
+        Return the newline separated line text, a drop-in replacement for image_to_string output.
+        """
+        return "\n".join(line["text"] for line in self.generate_text_lines())
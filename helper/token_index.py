@@ -0,0 +1,50 @@
+"""
+TokenIndex: Text index over the OCR token boxes of a document.
+
+Extractors used to scan the full coordinates list for every word they wanted to locate and
+to check "[x1, y1, x2, y2] not in coordinates" against a growing list, which is quadratic
+on dense pages. TokenIndex is built once per document in linear time, and its text -> token
+map answers "boxes for these words". Results are always returned in document (OCR) order,
+so callers keep the ordering of the previous linear scans.
+
+Example usage:
+    token_index = TokenIndex(coordinates)
+    boxes = token_index.boxes_for(name_list, limit=len(name_list))
+"""
+
+from collections import defaultdict
+
+class TokenIndex:
+    def __init__(self, coordinates: list) -> None:
+        """
+        :param coordinates: OCR tokens as (x1, y1, x2, y2, text) in document order.
+        """
+        self.tokens = [tuple(token) for token in coordinates]
+
+        # Text -> token positions in document order
+        self._positions_by_text = defaultdict(list)
+        for position, token in enumerate(self.tokens):
+            self._positions_by_text[token[4]].append(position)
+
+    def boxes_for(self, words: list, limit: int = None) -> list:
+        """
+        Return the distinct boxes of the tokens whose text is one of the words.
+
+        :param words: Token texts to look up (exact match, as with "text in words").
+        :param limit: Stop after this many boxes.
+        :return: [[x1, y1, x2, y2], ...] in document order.
+        """
+        if limit is not None and limit <= 0:
+            return []
+        positions = sorted({position for word in set(words) for position in self._positions_by_text.get(word, ())})
+        boxes = []
+        seen_boxes = set()
+        for position in positions:
+            box = self.tokens[position][:4]
+            if box in seen_boxes:
+                continue
+            seen_boxes.add(box)
+            boxes.append(list(box))
+            if limit is not None and len(boxes) == limit:
+                break
+        return boxes
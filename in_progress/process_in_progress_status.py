@@ -8,41 +8,115 @@
         doc_in_progress_status_queue (object): Queue to hold documents in 'IN_PROGRESS' status.
         logger (object): Logger for logging messages and errors.
 
+    The poll interval adapts to the load: the next poll runs immediately after a poll that
+    returned documents, and the interval doubles (up to max_poll_interval) while polls come
+    back empty. Idle/busy metrics of the poll cycles are available from get_poll_metrics().
+
+    With ingestion_mode 'change_stream', upload.fileDetails is watched through a MongoDB change
+    stream instead, filtered to inserts and updates that reach 'IN_PROGRESS'. Events trigger
+    the same batched claims as polling, which also run on a timer and when room frees up in
+    the queue. The resume token is stored in ocrrworkspace.resume_tokens, so a restart resumes
+    where it stopped. Change streams need a replica set (a single-node one started with
+    `mongod --replSet rs0` and `rs.initiate()` is enough); on a standalone mongod the class
+    falls back to polling.
+
+    Documents are claimed claim_batch_size at a time. The 'ocrr' records of a batch and the
+    'INVALID_DOCUMENT' statuses are written through the status batcher with one bulk write
+    per collection, which is flushed before the documents are handed to the workers.
+    Webhooks of invalid documents are recorded in the webhook outbox with the same flush and
+    delivered by the WebhookDispatcher.
+
+    The queue is bounded (queue_capacity entries, tied to the number of workers) and the
+    poller only claims as many documents as there is free room in it, so the rest of a
+    backlog stays 'IN_PROGRESS' and claimable by other nodes. Queue depth is part of the poll
+    metrics; every queued document carries 'queuedAt' for the workers' wait time metrics.
+
+    When the queue is a FairScheduler, documents of clients which already fill their share
+    of the scheduler are not claimed, and documents are claimed in priority order. Polls
+    which left such clients out are counted as saturated_tenant_polls; they do not shorten
+    the poll interval unless the queue itself is full.
+
     Example Usage:
         logger = setup_logger()
         queue = Queue()
-        processor = ProcessInProgressStatusDocuments('/path/to/uploads', queue, logger)
+        processor = ProcessInProgressStatusDocuments('/path/to/uploads', '/path/to/workspace', queue, logger)
         processor.query_in_progress_status_documents()
 """
 
 import sys
 import os
+import time
+import datetime
 from time import sleep
+from pymongo.errors import OperationFailure, PyMongoError
 from database.connection import EstablishDBConnection
-from webhook.post_trigger import WebhookPostTrigger
+from database.task_lease import TaskLease
+from database.status_batcher import get_status_batcher
+from webhook.outbox import WebhookOutbox
+from process_documents.fair_scheduler import FairScheduler
 
 class ProcessInProgressStatusDocuments:
-    def __init__(self, doc_upload_path: str, ocrr_workspace_path: str, doc_in_progress_status_queue: object, logger: object) -> None:
+    def __init__(self, doc_upload_path: str, ocrr_workspace_path: str, doc_in_progress_status_queue: object, logger: object,
+                 min_poll_interval: float = 0.25, max_poll_interval: float = 5, metrics_log_interval: float = 60,
+                 ingestion_mode: str = "polling", task_lease: object = None, claim_batch_size: int = 50, queue_capacity: int = 0) -> None:
         self.doc_upload_path = doc_upload_path
         self.ocrr_workspace_path = ocrr_workspace_path
         self.doc_in_progress_status_queue = doc_in_progress_status_queue
         self.logger = logger
+
+        # 'polling' or 'change_stream'
+        self.ingestion_mode = ingestion_mode
+
+        # Atomic claiming of documents shared with other engine nodes
+        self.task_lease = task_lease
+
+        # Documents claimed per round trip
+        self.claim_batch_size = claim_batch_size
+
+        # Maximum documents waiting in the queue (0: unbounded)
+        self.queue_capacity = queue_capacity
+
+        # Write-behind batching of the 'ocrr' records and statuses
+        self.status_batcher = get_status_batcher()
+
+        # Adaptive poll interval bounds in seconds
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.metrics_log_interval = metrics_log_interval
+
+        # Poll cycle metrics
+        self.poll_metrics = {
+            "polls": 0,
+            "busy_polls": 0,
+            "idle_polls": 0,
+            "documents": 0,
+            "busy_seconds": 0.0,
+            "idle_seconds": 0.0,
+            "poll_interval": 0.0,
+            "queue_full_polls": 0,
+            "saturated_tenant_polls": 0
+        }
         
         self.db_client = None
         self.collection_filedetails = None
         self.collection_ocrr = None
         self.collection_webhooks = None
-
+        self.collection_resume_tokens = None
+        self.webhook_outbox = None
 
     def _initialize_db_connection(self):
         try:
-            # Establish connection to MongoDB
+            # Get the shared MongoDB client of this process
             self.db_client = EstablishDBConnection().establish_connection()
 
             if self.db_client is not None:
                 self.collection_filedetails = self.db_client['upload']['fileDetails']
                 self.collection_webhooks = self.db_client['upload']['webhooks']
                 self.collection_ocrr = self.db_client['ocrrworkspace']['ocrr']
+                self.collection_resume_tokens = self.db_client['ocrrworkspace']['resume_tokens']
+                self.webhook_outbox = WebhookOutbox(self.db_client, logger=self.logger)
+                if self.task_lease is None:
+                    self.task_lease = TaskLease(self.collection_filedetails, logger=self.logger)
             else:
                 self.logger.error(f"| Failed to connect to MongoDB.")
                 sys.exit(1)
@@ -54,20 +128,225 @@ class ProcessInProgressStatusDocuments:
         try:
             # Initialize database connection
             self._initialize_db_connection()
-            while True:
-                documents = self.collection_filedetails.find({'status': 'IN_PROGRESS'})
-                for document in documents:
-                    document_path = f"{self.doc_upload_path}{'\\'.join(document['uploadDir'].split('/'))}"
-                    # Check if document path exists and document extension is valid
-                    if self._check_document_path(document_path) and self._check_document_extension(document['fileExtension'].lower()):
-                        self._insert_in_progress_status_document_to_queue(document)
-                    else:
-                        self._update_status_to_invalid_document(document['taskId'], document['uploadDir'])
-                        self._webhook_post_request(document['taskid'])
-                sleep(5)      
+
+            # Watch the change stream if enabled, otherwise (or if unsupported) poll
+            if self.ingestion_mode == "change_stream" and self.watch_in_progress_status_documents():
+                return
+            self._poll_in_progress_status_documents_loop()
         except Exception as e:
             self.logger.error(f"| Failed to initialize database connection while Processing 'IN_PROGRESS' status documents: {e}")
             sys.exit(1)
+
+    def _poll_in_progress_status_documents_loop(self):
+        # Poll 'IN_PROGRESS' documents with an adaptive interval
+        poll_interval = 0
+        last_metrics_log = time.monotonic()
+        while True:
+            poll_start = time.monotonic()
+            documents_found = self._poll_in_progress_status_documents()
+            busy_seconds = time.monotonic() - poll_start
+
+            # Poll again immediately after work, back off while idle.
+            # While the queue is full, check again soon: room is made as the workers take documents.
+            if "extra_filter" in self._claim_options():
+                # Clients held back by the scheduler; their documents are claimed once it drains
+                self.poll_metrics["saturated_tenant_polls"] += 1
+            if self._free_queue_capacity() <= 0:
+                poll_interval = self.min_poll_interval
+                self.poll_metrics["queue_full_polls"] += 1
+            elif documents_found:
+                poll_interval = 0
+            else:
+                poll_interval = min(self.max_poll_interval, max(self.min_poll_interval, poll_interval * 2))
+            self._record_poll_cycle(documents_found, busy_seconds, poll_interval)
+
+            # Log a summary of the poll cycles periodically
+            if time.monotonic() - last_metrics_log >= self.metrics_log_interval:
+                self.logger.info(f"| Poll metrics: {self.get_poll_metrics()}")
+                last_metrics_log = time.monotonic()
+
+            if poll_interval:
+                sleep(poll_interval)
+
+    def _poll_in_progress_status_documents(self, claimed_task_ids: dict = None) -> int:
+        # Claim 'IN_PROGRESS' documents (and expired leases) in batches, move them to the queue and return how many were claimed.
+        # claimed_task_ids collects the task ids of the recent claims (used as an ordered set).
+        documents_found = 0
+        while True:
+            # Only claim what the queue can take; the rest stays claimable by other nodes
+            claim_limit = min(self.claim_batch_size, self._free_queue_capacity())
+            if claim_limit <= 0:
+                break
+            documents = self.task_lease.claim_batch(claim_limit, **self._claim_options())
+            if documents:
+                documents_found += len(documents)
+                if claimed_task_ids is not None:
+                    claimed_task_ids.update(dict.fromkeys(document['taskId'] for document in documents))
+                    # Only recent claims can still have change events in flight
+                    while len(claimed_task_ids) > 10 * self.claim_batch_size:
+                        del claimed_task_ids[next(iter(claimed_task_ids))]
+                self._process_in_progress_status_documents(documents)
+            if len(documents) < claim_limit:
+                break
+        return documents_found
+
+    def _claim_options(self) -> dict:
+        # Claim conditions and order of the fair scheduler
+        if not isinstance(self.doc_in_progress_status_queue, FairScheduler):
+            return {}
+        claim_options = {"sort": [(self.doc_in_progress_status_queue.priority_field, -1), ("_id", 1)]}
+        # Leave the documents of clients which fill their share of the scheduler in MongoDB
+        saturated_tenants = self.doc_in_progress_status_queue.saturated_tenants()
+        if saturated_tenants:
+            claim_options["extra_filter"] = {"clientId": {"$nin": saturated_tenants}}
+        return claim_options
+
+    def _queue_depth(self) -> int:
+        # Documents waiting in the queue; None where the platform cannot tell (macOS)
+        try:
+            return self.doc_in_progress_status_queue.qsize()
+        except NotImplementedError:
+            return None
+
+    def _free_queue_capacity(self) -> int:
+        # Room left in the bounded queue
+        if not self.queue_capacity:
+            return self.claim_batch_size
+        queue_depth = self._queue_depth()
+        if queue_depth is None:
+            # put() still blocks on a full queue
+            return self.queue_capacity
+        return max(0, self.queue_capacity - queue_depth)
+
+    def _process_in_progress_status_documents(self, documents: list):
+        # Validate the claimed documents; their writes are flushed before the documents reach the workers
+        queued_documents = []
+        for document in documents:
+            document_path = f"{self.doc_upload_path}{'\\'.join(document['uploadDir'].split('/'))}"
+            # Check if document path exists and document extension is valid
+            if self._check_document_path(document_path) and self._check_document_extension(document['fileExtension'].lower()):
+                document_info = self._insert_in_progress_status_document_to_queue(document)
+                if document_info is not None:
+                    queued_documents.append((document, document_info))
+            else:
+                self._update_status_to_invalid_document(document['taskId'], document['uploadDir'])
+                self._webhook_post_request(document)
+
+        # Write the 'ocrr' records, 'INVALID_DOCUMENT' statuses and webhooks with one bulk write per collection
+        self.status_batcher.flush()
+
+        for document, document_info in queued_documents:
+            # Enqueue time for the wait time metrics of the workers
+            document_info["queuedAt"] = time.time()
+            self.doc_in_progress_status_queue.put(document_info)
+            self.logger.info(f"| Added document to 'IN_PROGRESS' queue: {document['fileName']}")
+
+    def watch_in_progress_status_documents(self) -> bool:
+        """
+        Process documents reaching 'IN_PROGRESS' from a change stream on upload.fileDetails.
+
+        The events only wake the claimer: documents are always claimed by claim passes
+        (_poll_in_progress_status_documents), so event-driven claims take the same fair
+        scheduler conditions and priority order as polling. A claim pass runs when an event
+        reports a document this node has not claimed yet, when room frees up in a queue which
+        was full, and every max_poll_interval seconds for documents no event points at
+        (a backlog beyond the free room, expired leases of other nodes, documents of clients
+        which were held back). The stream cursor is never blocked on the queue.
+
+        Blocks while the stream is open. Returns False if change streams are not supported
+        by the deployment (standalone mongod), so the caller can fall back to polling.
+        """
+        pipeline = [{'$match': {
+            'operationType': {'$in': ['insert', 'update', 'replace']},
+            'fullDocument.status': 'IN_PROGRESS'
+        }}]
+        while True:
+            resume_token = self._load_resume_token()
+            try:
+                with self.collection_filedetails.watch(pipeline, full_document='updateLookup', resume_after=resume_token,
+                                                       max_await_time_ms=1000) as stream:
+                    self.logger.info(f"| Watching 'upload.fileDetails' change stream{' from saved resume token' if resume_token else ''}.")
+                    # Pick up documents which reached 'IN_PROGRESS' before the stream was opened
+                    claimed_task_ids = {}
+                    self._poll_in_progress_status_documents(claimed_task_ids)
+                    last_claim_pass = time.monotonic()
+                    queue_was_full = self._free_queue_capacity() <= 0
+                    saved_resume_token = resume_token
+                    while stream.alive:
+                        # Returns None when no event arrived within max_await_time_ms
+                        change = stream.try_next()
+                        document = change.get('fullDocument') if change is not None else None
+                        new_document = document is not None and document.get('taskId') not in claimed_task_ids
+                        queue_has_room = self._free_queue_capacity() > 0
+
+                        claim_pass = (queue_has_room and (new_document or queue_was_full)) or time.monotonic() - last_claim_pass >= self.max_poll_interval
+                        if claim_pass:
+                            self._poll_in_progress_status_documents(claimed_task_ids)
+                            last_claim_pass = time.monotonic()
+                            queue_was_full = self._free_queue_capacity() <= 0
+                        elif new_document:
+                            # No room: the document stays 'IN_PROGRESS' for the pass run when room frees up
+                            queue_was_full = True
+
+                        # Saved after a claim pass or while the stream is idle rather than after every event.
+                        # Documents are claimed from MongoDB, not from the events, so events skipped on a
+                        # restart are covered by the pass at stream open.
+                        if stream.resume_token != saved_resume_token and (claim_pass or change is None):
+                            self._save_resume_token(stream.resume_token)
+                            saved_resume_token = stream.resume_token
+            except OperationFailure as e:
+                # 40573: change streams are only supported on replica sets and sharded clusters
+                if e.code == 40573:
+                    self.logger.warning(f"| Change streams are not supported by MongoDB, falling back to polling: {e}")
+                    return False
+                # 260/286: the saved resume token is invalid or no longer in the oplog
+                if e.code in (260, 286):
+                    self.logger.warning(f"| Cannot resume change stream, restarting without resume token: {e}")
+                    self._save_resume_token(None)
+                    continue
+                raise
+            except PyMongoError as e:
+                self.logger.error(f"| Change stream interrupted, reopening: {e}")
+                sleep(1)
+
+    def _load_resume_token(self) -> dict:
+        # Get the saved resume token of the fileDetails change stream
+        token_document = self.collection_resume_tokens.find_one({"_id": "upload.fileDetails"})
+        return token_document.get("resumeToken") if token_document is not None else None
+
+    def _save_resume_token(self, resume_token: dict):
+        # Persist the resume token so that a restart neither misses nor replays events
+        self.collection_resume_tokens.update_one(
+            {"_id": "upload.fileDetails"},
+            {"$set": {"resumeToken": resume_token, "updatedAt": datetime.datetime.now(datetime.timezone.utc)}},
+            upsert=True
+        )
+
+    def _record_poll_cycle(self, documents_found: int, busy_seconds: float, poll_interval: float) -> None:
+        # Update the idle/busy metrics with one poll cycle
+        self.poll_metrics["polls"] += 1
+        self.poll_metrics["documents"] += documents_found
+        self.poll_metrics["busy_seconds"] += busy_seconds
+        self.poll_metrics["idle_seconds"] += poll_interval
+        self.poll_metrics["poll_interval"] = poll_interval
+        if documents_found:
+            self.poll_metrics["busy_polls"] += 1
+        else:
+            self.poll_metrics["idle_polls"] += 1
+        self.logger.debug(f"| Poll cycle: {documents_found} documents in {busy_seconds:.3f}s, next poll in {poll_interval:.2f}s")
+
+    def get_poll_metrics(self) -> dict:
+        """
+        Return the idle/busy metrics of the poll cycles so far.
+        """
+        metrics = dict(self.poll_metrics)
+        total_seconds = metrics["busy_seconds"] + metrics["idle_seconds"]
+        metrics["busy_seconds"] = round(metrics["busy_seconds"], 3)
+        metrics["idle_seconds"] = round(metrics["idle_seconds"], 3)
+        metrics["idle_ratio"] = round(self.poll_metrics["idle_seconds"] / total_seconds, 3) if total_seconds else 0.0
+        metrics["queue_depth"] = self._queue_depth()
+        metrics["queue_capacity"] = self.queue_capacity
+        return metrics
     
     def _check_document_path(self, document_path: str) -> bool:
         # Check if document path exists
@@ -83,8 +362,8 @@ class ProcessInProgressStatusDocuments:
         else:
             return False
     
-    def _insert_in_progress_status_document_to_queue(self, document: dict):
-        # Insert a valid document to the 'IN_PROGRESS' queue and update its status in the database
+    def _insert_in_progress_status_document_to_queue(self, document: dict) -> dict:
+        # Prepare the queue entry of a valid document and batch its 'ocrr' record
         room_name = list(filter(None, document['uploadDir'].split("/")))[0]
         room_id = list(filter(None, document['uploadDir'].split("/")))[1]
         try:
@@ -100,16 +379,19 @@ class ProcessInProgressStatusDocuments:
                 "roomName": room_name,
                 "roomId": room_id,
                 "redactedPath": os.path.join(f"{self.doc_upload_path}\\{room_name}\\{room_id}", "Redacted"),
-                "ocrrworkspace_doc_path": os.path.join(self.ocrr_workspace_path, self._rename_document(document['uploadDir']))
+                "ocrrworkspace_doc_path": os.path.join(self.ocrr_workspace_path, self._rename_document(document['uploadDir'])),
+                "nodeId": self.task_lease.node_id
             }
-            self.collection_ocrr.insert_one(document_info)
-            self.doc_in_progress_status_queue.put(document_info)
-            self.collection_filedetails.update_one({"taskId": document['taskId']}, {"$set": {"status": "IN_QUEUE"}})
-            self.logger.info(f"| Added document to 'IN_PROGRESS' queue: {document['fileName']}")
-            return True
+            if isinstance(self.doc_in_progress_status_queue, FairScheduler):
+                # Priority lane of the document
+                document_info["priority"] = self.doc_in_progress_status_queue.get_priority(document)
+            # The document was already moved to 'IN_QUEUE' by its claim.
+            # The record is copied: insert_one adds an '_id' which must not reach the queue.
+            self.status_batcher.insert_one('ocrrworkspace', 'ocrr', dict(document_info))
+            return document_info
         except Exception as e:
             self.logger.error(f"| Failed to insert document to 'IN_PROGRESS' queue: {e}")
-            return False
+            return None
     
     def _rename_document(self, upload_dir: str) -> str:
         # Split the upload directory
@@ -124,35 +406,25 @@ class ProcessInProgressStatusDocuments:
         # Update the status of the document to 'INVALID_DOCUMENT' in the database if invalid
         try:
             update_query = {"$set": {"status": "INVALID_DOCUMENT", "taskResult": "Invalid Document"}}
-            self.collection_filedetails.update_one({"taskId": taskid}, update_query)
+            self.status_batcher.update_one('upload', 'fileDetails', {"taskId": taskid}, update_query)
             self.logger.info(f"| Updated status to 'INVALID_DOCUMENT' for document: {filepath}")
         except Exception as e:
             self.logger.error(f"| Failed to update status to 'INVALID_DOCUMENT' for document: {filepath}: {e}")
             sys.exit(1)
     
-    def _webhook_post_request(self, taskid: str):
-        # Send a webhook request for the task with the specified task ID
+    def _webhook_post_request(self, document: dict):
+        # Record a webhook request for an invalid document in the outbox; it is delivered by the webhook dispatcher
+        taskid = document['taskId']
         try:
-            # Prepare the payload data for the webhook request
-            webhook_data = self.collection_filedetails.find_one({"taskId": taskid})
-            if webhook_data is not None:
-                payload = {
-                    "taskId": taskid,
-                    "status": webhook_data['status'],
-                    "taskResult": webhook_data['taskResult'],
-                    "clientId": webhook_data['clientId'],
-                    "uploadDir": webhook_data['uploadDir']
-                }
-                # Get the URL from collection webhooks
-                webhook_url = self.collection_webhooks.find_one({"clientId": webhook_data['clientId']})
-                if webhook_url is not None:
-                    webhook_url = webhook_url['url']
-                    # Send the webhook request
-                    if WebhookPostTrigger(webhook_url, payload).send_post():
-                        self.logger.info(f"| Webhook request sent successfully for task: {taskid}")
-                    else:
-                        self.logger.error(f"| Failed to send webhook request for task: {taskid}")
-                        sys.exit(1)
+            # Prepare the payload data from the claimed document; its status was just set to 'INVALID_DOCUMENT'
+            payload = {
+                "taskId": taskid,
+                "status": "INVALID_DOCUMENT",
+                "taskResult": "Invalid Document",
+                "clientId": document['clientId'],
+                "uploadDir": document['uploadDir']
+            }
+            if self.webhook_outbox.enqueue(payload):
+                self.logger.info(f"| Webhook request queued for task: {taskid}")
         except Exception as e:
-            self.logger.error(f"| Failed to send webhook request for task: {taskid}: {e}")
-            sys.exit(1)
\ No newline at end of file
+            self.logger.error(f"| Failed to queue webhook request for task: {taskid}: {e}")
@@ -1,4 +1,6 @@
 from database.connection import EstablishDBConnection
+from database.task_lease import TaskLease, FINAL_UNSET_FIELDS
+from database.status_batcher import get_status_batcher
 from document_identification.identify_doc import DocumentIdentification
 from documents.cdsl.document_coordinates import CDSLDocumentInfo
 from documents.e_pancard.document_coordinates import EPancardDocumentInfo
@@ -10,15 +12,21 @@ from documents.passport.document_coordinates import PassportDocumentInfo
 from prepare_xml.redacted import WriteRedactedDocumentXML
 from prepare_xml.rejected import WriteRejectedDocumentXML
 from prepare_xml.rejected_doc_coordinates import GetRejectedDocumentCoordinates
-from webhook.post_trigger import WebhookPostTrigger
+from webhook.outbox import WebhookOutbox
+from helper.ocr_page import OCRPage
+from helper.document_image import DocumentImage
 import os
 import sys
 
 class ProcessDocumentOCRR:
-    def __init__(self, docuemnt_info: dict, logger: object, redaction_level: int) -> None:
+    def __init__(self, docuemnt_info: dict, logger: object, redaction_level: int, document_image: DocumentImage = None) -> None:
         self.document_info = docuemnt_info
         self.logger = logger
         self.redaction_level = redaction_level
+
+        # Decoded image and OCR results shared by identification, extraction and the rejected path of this document.
+        # Without an in-memory image (pre-processing failed) the upload is decoded; no workspace copy is written by default.
+        self.ocr_page = OCRPage(self.document_info['path'], document_image=document_image, logger=self.logger)
         
         self.db_client = None
         self.collection_filedetails = None
@@ -37,8 +45,11 @@ class ProcessDocumentOCRR:
             }
 
     def _initialize_db_connection(self):
+        # The shared client of this worker process is reused across status updates
+        if self.db_client is not None:
+            return
         try:
-            # Establish connection to MongoDB
+            # Get the shared MongoDB client of this process
             self.db_client = EstablishDBConnection().establish_connection()
 
             if self.db_client is not None:
@@ -53,26 +64,21 @@ class ProcessDocumentOCRR:
     def start_ocrr(self):
         try:
             self.logger.info("| Starting OCRR Process")
+            # Record this worker process on the lease of the document
+            self._mark_document_started(self.document_info['taskId'])
             # Initialize DocumentIdentification
-            identified_document = DocumentIdentification(self.document_info['ocrrworkspace_doc_path'], self.logger)
-            
-            # Set Flag for Docuemnt Identified
-            document_identified = False
+            identified_document = DocumentIdentification(self.document_info['ocrrworkspace_doc_path'], self.logger, self.ocr_page)
             
-            # Loop through document types and identify the document type
-            for document_type in self.document_types:
-                document_status = identified_document.identify_document_type(document_type)
-                if document_status:
-                    self.logger.info(f"| Document Identified as {document_type}")
-                    # Process the document
-                    docuemnt_process = self.document_type_ocrr_methods[f"{document_type}"]
-                    docuemnt_process()
-                    # Set the Flag
-                    document_identified = True
-                    break
+            # Identify the document type in a single scan of the OCR tokens
+            document_type = identified_document.classify_document(self.document_types)
+            if document_type:
+                self.logger.info(f"| Document Identified as {document_type}")
+                # Process the document
+                docuemnt_process = self.document_type_ocrr_methods[f"{document_type}"]
+                docuemnt_process()
             
             # Check if document is un-identified
-            if not document_identified:
+            if not document_type:
                 self.logger.info(f"| Document Un-identified for task id: {self.document_info['taskId']}")
                 self._write_xml_rejected_status("Document Un-identified")
             # Final Stage of OCRR Process
@@ -97,8 +103,10 @@ class ProcessDocumentOCRR:
     # Write XML for REJECTED status
     def _write_xml_rejected_status(self, message: str):
         self.logger.info("| Writing XML for REJECTED status document")
-        # Get the 80% coordinates for the rejected document
-        rejected_doc_80_percent_coordinates = GetRejectedDocumentCoordinates(self.document_info['ocrrworkspace_doc_path']).get_coordinates()
+        # Get the 80% coordinates for the rejected document; the dimensions are known from the
+        # in-memory image, or read from the header of the upload when it could not be decoded
+        image_size = self.ocr_page.document_image.original_size if self.ocr_page.document_image is not None else None
+        rejected_doc_80_percent_coordinates = GetRejectedDocumentCoordinates(self.document_info['path'], image_size).get_coordinates()
         write_xml_coordinates = WriteRejectedDocumentXML(self.document_info['redactedPath'], self.document_info['document_name'], rejected_doc_80_percent_coordinates, self.logger)
         write_xml_coordinates.writexml()
         self.logger.info(f"| XML Coordinate ready for {self.document_info['document_name']}")
@@ -108,7 +116,7 @@ class ProcessDocumentOCRR:
     # OCRR Process CDSL Document
     def _cdsl_ocrr_process(self):
         self.logger.info("| Starting OCRR Process for CDSL Document")
-        result = CDSLDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level).collect_document_info()
+        result = CDSLDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level, self.ocr_page).collect_document_info()
         # Write XML for coordinates for REDACTED or REJECTED status
         if result['status'] == "REDACTED":
             self._write_xml_redacted_status(result['data'], result['message'])
@@ -118,7 +126,7 @@ class ProcessDocumentOCRR:
     # OCRR Process E-PANCARD Document
     def _e_pancard_ocrr_process(self):
         self.logger.info("| Starting OCRR Process for E-PANCARD Document")
-        result = EPancardDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level).collect_document_info()
+        result = EPancardDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level, self.ocr_page).collect_document_info()
         # Write XML for coordinates for REDACTED or REJECTED status
         if result['status'] == "REDACTED":
             self._write_xml_redacted_status(result['data'], result['message'])
@@ -128,7 +136,7 @@ class ProcessDocumentOCRR:
     # OCRR Process PANCARD Document
     def _pancard_ocrr_process(self):
         self.logger.info("| Starting OCRR Process for PANCARD Document")
-        result = PancardDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level).collect_document_info()
+        result = PancardDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level, self.ocr_page).collect_document_info()
         # Write XML for coordinates for REDACTED or REJECTED status
         if result['status'] == "REDACTED":
             self._write_xml_redacted_status(result['data'], result['message'])
@@ -138,7 +146,7 @@ class ProcessDocumentOCRR:
     # OCRR Process E-AADHAAR Document
     def _e_aadhaar_ocrr_process(self):
         self.logger.info("| Starting OCRR Process for E-AADHAAR Document")
-        result = EAadhaarDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level).collect_document_info()
+        result = EAadhaarDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level, self.ocr_page).collect_document_info()
         # Write XML for coordinates for REDACTED or REJECTED status
         if result['status'] == "REDACTED":
             self._write_xml_redacted_status(result['data'], result['message'])
@@ -148,7 +156,7 @@ class ProcessDocumentOCRR:
     # OCRR Process AADHAAR Document
     def _aadhaar_ocrr_process(self):
         self.logger.info("| Starting OCRR Process for AADHAAR Document")
-        result = AadhaarDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level).collect_document_info()
+        result = AadhaarDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level, self.ocr_page).collect_document_info()
         # Write XML for coordinates for REDACTED or REJECTED status
         if result['status'] == "REDACTED":
             self._write_xml_redacted_status(result['data'], result['message'])
@@ -158,7 +166,7 @@ class ProcessDocumentOCRR:
     # OCRR Process Passport Document
     def _passport_ocrr_process(self):
         self.logger.info("| Starting OCRR Process for Passport Document")
-        result = PassportDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level).collect_document_info()
+        result = PassportDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level, self.ocr_page).collect_document_info()
         # Write XML for coordinates for REDACTED or REJECTED status
         if result['status'] == "REDACTED":
             self._write_xml_redacted_status(result['data'], result['message'])
@@ -168,13 +176,25 @@ class ProcessDocumentOCRR:
     # OCRR Process DL Document
     def _dl_ocrr_process(self):
         self.logger.info("| Starting OCRR Process for Driving License Document")
-        result = DrivingLicenseDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level).collect_document_info()
+        result = DrivingLicenseDocumentInfo(self.document_info['ocrrworkspace_doc_path'], self.logger, self.redaction_level, self.ocr_page).collect_document_info()
         # Write XML for coordinates for REDACTED or REJECTED status
         if result['status'] == "REDACTED":
             self._write_xml_redacted_status(result['data'], result['message'])
         else:
             self._write_xml_rejected_status(result['message'])
 
+    # Record the worker process processing the document on its lease
+    def _mark_document_started(self, taskid: str):
+        try:
+            # Initialize the database connection
+            self._initialize_db_connection()
+            if not TaskLease(self.collection_filedetails, logger=self.logger).mark_started(taskid):
+                self.logger.warning(f"| Lease of task {taskid} is not held by this node")
+            return True
+        except Exception as e:
+            self.logger.error(f"| Error in recording the worker process of task {taskid}: {e}")
+            return False
+
     # Update the document status in the database
     def _update_document_status(self, taskid: str, status: str, message: str):
         try:
@@ -182,8 +202,10 @@ class ProcessDocumentOCRR:
             self._initialize_db_connection()
             self.logger.info(f"| Updating document {status} status in the database")
             taskid_filter = {"taskId": taskid}
-            update = {"$set": {"status": status, "taskResult": message}}
-            self.collection_filedetails.update_one(taskid_filter, update)
+            # The document is finished: its lease and attempts are cleared
+            update = {"$set": {"status": status, "taskResult": message}, "$unset": FINAL_UNSET_FIELDS}
+            # Sent with the removal of the 'ocrr' record in the flush of the final stage
+            get_status_batcher().update_one('upload', 'fileDetails', taskid_filter, update)
             return True
         except Exception as e:
             self.logger.error(f"| Error in updating document status in the database: {e}")
@@ -192,6 +214,9 @@ class ProcessDocumentOCRR:
     # Remove document from the OCRR workspace
     def _remove_document_from_ocrr_workspace(self, document_path: str) -> bool:
         try:
+            # Documents processed in memory have no workspace copy
+            if not os.path.exists(document_path):
+                return True
             self.logger.info(f"| Removing document from the OCRR workspace: {document_path}")
             os.remove(document_path)
             return True
@@ -205,10 +230,9 @@ class ProcessDocumentOCRR:
             self.logger.info(f"| Removing document from the OCRR workspace ocrr collection: {taskid}")
             database_name = "ocrrworkspace"
             collection_name = "ocrr"
-            database = self.db_client[database_name]
-            collection = database[collection_name]
             taskid_filter = {"taskId": taskid}
-            collection.delete_one(taskid_filter)
+            # Sent with the terminal status in the flush of the final stage
+            get_status_batcher().delete_one(database_name, collection_name, taskid_filter)
             return True
         except Exception as e:
             self.logger.error(f"| Error in removing document from the OCRR workspace collection: {e}")
@@ -216,7 +240,7 @@ class ProcessDocumentOCRR:
 
     
     def _webhook_post_request(self, taskid: str):
-        # Send a webhook request for the task with the specified task ID
+        # Record a webhook request for the task in the outbox; it is delivered by the webhook dispatcher
         try:
             # Prepare the payload data for the webhook request
             webhook_data = self.collection_filedetails.find_one({"taskId": taskid})
@@ -228,17 +252,12 @@ class ProcessDocumentOCRR:
                     "clientId": webhook_data['clientId'],
                     "uploadDir": webhook_data['uploadDir']
                 }
-                # Get the URL from collection webhooks
-                webhook_url = self.collection_webhooks.find_one({"clientId": webhook_data['clientId']})
-                if webhook_url is not None:
-                    webhook_url = webhook_url['url']
-                    # Send the webhook request
-                    if WebhookPostTrigger(webhook_url, payload).send_post():
-                        self.logger.info(f"| Webhook request sent successfully for task: {taskid}")
-                    else:
-                        self.logger.error(f"| Failed to send webhook request for task: {taskid}")
+                if WebhookOutbox(self.db_client, logger=self.logger).enqueue(payload):
+                    # The outbox entry must not wait in the buffer of this worker
+                    get_status_batcher().flush()
+                    self.logger.info(f"| Webhook request queued for task: {taskid}")
         except Exception as e:
-            self.logger.error(f"| Failed to send webhook request for task: {taskid}: {e}")
+            self.logger.error(f"| Failed to queue webhook request for task: {taskid}: {e}")
     
     # Final stage of OCRR process
     def _final_stage_ocrr_process(self, ocrrworkspace_doc_path: str, taskid: str):
@@ -247,7 +266,18 @@ class ProcessDocumentOCRR:
         
         # Remove document from ocrrworkspace database ocrr collection
         self._remove_document_from_ocrr_workspace_collection_ocrr(taskid)
+
+        # Write the terminal status and the 'ocrr' removal before the document is finished;
+        # pending writes would be lost with the worker and the document processed again
+        try:
+            get_status_batcher().flush()
+        except Exception as e:
+            self.logger.error(f"| Error in writing the final status of task {taskid}: {e}")
         self.logger.info(f"| OCRR Process completed for: {taskid}")
+
+        # Log the OCR cache counters of this worker
+        if self.ocr_page.ocr_cache is not None:
+            self.logger.info(f"| OCR cache stats: {self.ocr_page.ocr_cache.get_stats()}")
         
         # Send Webhook POST request for the TASKID
         # self._webhook_post_request(taskid)
@@ -1,17 +1,22 @@
 import sys
-import configparser
-import queue
-from concurrent.futures import ThreadPoolExecutor
+import threading
+import multiprocessing
 from ocrr_logger.ocrrlogger import OCRRLogger
-from database.connection import EstablishDBConnection
+from helper.configuration import read_configuration
+from database.connection import EstablishDBConnection, close_db_client
+from database.status_batcher import get_status_batcher
+from database.task_lease import TaskLease
+from database.indexes import provision_indexes
+from webhook.outbox import WebhookOutbox
+from webhook.dispatcher import WebhookDispatcher
 from in_progress.process_in_progress_status import ProcessInProgressStatusDocuments
-from process_documents.process_queue_documents import ProcessQueueDocuments
+from process_documents.worker_pool import DocumentWorkerPool, get_worker_count
+from process_documents.fair_scheduler import FairScheduler
 
 class OCRREngine:
     def __init__(self):
         # Read configuration settings from configuration.ini file
-        config = configparser.ConfigParser(allow_no_value=True)
-        config.read(r'C:\Program Files\OCRR\settings\configuration.ini')
+        config = read_configuration()
 
         # Retrieve paths for document upload and OCR workspace from configuration
         self.document_upload_path = config['Paths']['upload']
@@ -20,6 +25,16 @@ class OCRREngine:
         # Retrieve the Redaction Level in integer
         self.redaction_level = int(config['RedactionLevel']['level'])
 
+        # Retrieve the bounds of the adaptive poll interval in seconds
+        self.min_poll_interval = config.getfloat('Polling', 'min_interval', fallback=0.25)
+        self.max_poll_interval = config.getfloat('Polling', 'max_interval', fallback=5)
+
+        # Retrieve the number of documents claimed per round trip
+        self.claim_batch_size = config.getint('Batching', 'claim_batch_size', fallback=50)
+
+        # Retrieve the ingestion mode: 'polling' or 'change_stream'
+        self.ingestion_mode = config.get('Ingestion', 'mode', fallback='polling').strip().lower()
+
         # Configure logger
         logger_config = OCRRLogger()
         self.logger = logger_config.configure_logger()
@@ -27,34 +42,66 @@ class OCRREngine:
         # Initialize database connection
         self._initialize_db_connection()
         
-        # Initialize queue for 'IN_PROGRESS' documents
-        self.in_progress_queue = queue.Queue()
-        self.logger.info(f"| Queue initialized for 'IN_PROGRESS' documents.")
+        # Initialize the bounded queue for 'IN_PROGRESS' documents, shared with the worker processes.
+        # It holds prefetch documents per worker; the poller only claims what fits.
+        worker_count = get_worker_count()
+        self.worker_count = worker_count
+        self.queue_capacity = worker_count * max(1, config.getint('Workers', 'prefetch', fallback=2))
+        self.in_progress_queue = multiprocessing.Queue(maxsize=self.queue_capacity)
+        self.logger.info(f"| Queue initialized for 'IN_PROGRESS' documents with capacity {self.queue_capacity}.")
+
+        # Initialize the per-client fair scheduler between the poller and the worker queue
+        scheduler_capacity = config.getint('Scheduling', 'capacity', fallback=0) or 4 * self.queue_capacity
+        self.fair_scheduler = FairScheduler(scheduler_capacity, logger=self.logger)
+        self.logger.info(f"| Fair scheduler initialized with capacity {scheduler_capacity}, {self.fair_scheduler.max_per_tenant} documents per client.")
+
+        # Initialize the pool of worker processes; each one warms up its own OCR and QR engines.
+        # Documents of a worker which dies are released for another claim.
+        self.worker_pool = DocumentWorkerPool(worker_count, self.in_progress_queue, self.document_upload_path, self.ocrr_workspace_path, self.redaction_level, self.logger,
+                                              on_worker_exit=self.task_lease.release_worker)
+
+        # The lease heartbeat only renews documents which are still held by this node
+        self.task_lease.held_documents = self._held_documents
+
+    def _held_documents(self) -> tuple:
+        # Documents in the scheduler or the worker queue, and documents of live workers
+        return self.fair_scheduler.held_task_ids(), self.worker_pool.live_pids()
 
     def _initialize_db_connection(self):
         try:
-            # Establish connection to MongoDB
+            # Get the shared MongoDB client of this process; it stays open for the poller and the lease heartbeat
             db_client = EstablishDBConnection().establish_connection()
 
             if db_client is not None:
+                # Task leases of this node, shared with the poller and the worker pool
+                self.task_lease = TaskLease(db_client['upload']['fileDetails'], logger=self.logger)
+                self.logger.info(f"| Engine node id: {self.task_lease.node_id}")
+
                 # Check if 'ocrrworkspace' database exists
                 db_name_list = db_client.list_database_names()
                 if 'ocrrworkspace' in db_name_list:
-                    # Check if 'ocrr' collection exists in 'ocrrworkspace' database. If it exists, clean all the documents in ocrr collection.
+                    # Check if 'ocrr' collection exists in 'ocrrworkspace' database. If it exists, clean the documents of this node in ocrr collection.
                     db_collection_list = db_client['ocrrworkspace'].list_collection_names()
                     if 'ocrr' in db_collection_list:
-                        db_client['ocrrworkspace']['ocrr'].delete_many({})
-                        self.logger.info(f"| Cleaned all documents in 'ocrr' collection.")
+                        db_client['ocrrworkspace']['ocrr'].delete_many({'$or': [{'nodeId': self.task_lease.node_id}, {'nodeId': {'$exists': False}}]})
+                        self.logger.info(f"| Cleaned documents of this node in 'ocrr' collection.")
                 else:
                     # If it doesn't exist, create 'ocrrworkspace' database with collection 'ocrr'
                     db_client['ocrrworkspace'].create_collection('ocrr')
                     self.logger.info(f"| Created new 'ocrrworkspace' database with collection 'ocrr'.")
 
-                # Update the status of documents from 'IN_QUEUE' to 'IN_PROGRESS' in the 'fileDetails' collection
-                db_client['upload']['fileDetails'].update_many({'status': 'IN_QUEUE'}, {'$set': {'status': 'IN_PROGRESS'}})
-                self.logger.info(f"| Updated document status from 'IN_QUEUE' to 'IN_PROGRESS'.")
-                # Close the DB connection
-                db_client.close()
+                # Make sure the hot query paths are indexed; existing indexes are left as they are
+                provision_indexes(db_client, self.logger)
+
+                # Return the documents this node left 'IN_QUEUE' to 'IN_PROGRESS'; other nodes' leases are untouched
+                recovered_documents = self.task_lease.recover_node_leases()
+                self.logger.info(f"| Updated status of {recovered_documents} documents of this node from 'IN_QUEUE' to 'IN_PROGRESS'.")
+
+                # Keep this node's leases alive while the engine runs
+                self.task_lease.start_heartbeat()
+
+                # Deliver webhooks from the outbox, decoupled from document processing
+                self.webhook_dispatcher = WebhookDispatcher(WebhookOutbox(db_client, logger=self.logger), self.logger)
             else:
                 self.logger.error(f"| Failed to connect to MongoDB.")
                 sys.exit(1)
@@ -64,23 +111,44 @@ class OCRREngine:
             sys.exit(1)
 
     def query_in_progress_status_documents(self):
-        filter_in_progress_status_doc = ProcessInProgressStatusDocuments(self.document_upload_path, self.ocrr_workspace_path, self.in_progress_queue, self.logger)
+        # The poller feeds the fair scheduler, which feeds the worker queue
+        filter_in_progress_status_doc = ProcessInProgressStatusDocuments(self.document_upload_path, self.ocrr_workspace_path, self.fair_scheduler, self.logger,
+                                                                         min_poll_interval=self.min_poll_interval, max_poll_interval=self.max_poll_interval,
+                                                                         ingestion_mode=self.ingestion_mode, task_lease=self.task_lease,
+                                                                         claim_batch_size=self.claim_batch_size, queue_capacity=self.fair_scheduler.capacity)
         filter_in_progress_status_doc.query_in_progress_status_documents()
     
     def process_queue_documents(self):
-        process_queue_doc = ProcessQueueDocuments(self.in_progress_queue, self.document_upload_path, self.ocrr_workspace_path, self.logger, self.redaction_level)
-        process_queue_doc.process_queue_document()
+        # Start the worker processes and supervise them until the engine stops
+        self.worker_pool.start()
+        self.fair_scheduler.start_dispatcher(self.in_progress_queue, recent_dispatch_limit=self.queue_capacity + self.worker_count + 1)
+        try:
+            self.worker_pool.supervise()
+        finally:
+            self.worker_pool.stop()
 
 def main():
     try:
         engine = OCRREngine()
         engine.logger.info(f"| OCR engine initialized successfully.")
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            executor.submit(engine.query_in_progress_status_documents)
-            executor.submit(engine.process_queue_documents)
+        # Poll 'IN_PROGRESS' documents in a thread of the main process
+        poller = threading.Thread(target=engine.query_in_progress_status_documents, name="OCRRPoller", daemon=True)
+        poller.start()
+        # Deliver webhooks in the background
+        engine.webhook_dispatcher.start()
+        # Process the queue in the worker pool
+        engine.process_queue_documents()
     except Exception as e:
         engine.logger.error(f"| Failed to initialize OCR engine: {e}")
         sys.exit(1)
+    finally:
+        # Write the pending batched writes and close the MongoDB client of the engine process
+        try:
+            get_status_batcher().flush()
+        finally:
+            close_db_client()
 
 if __name__ == '__main__':
+    # Required for worker processes of a frozen executable on Windows
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -19,8 +19,8 @@ Example usage:
 """
 
 import logging
-import configparser
 import os
+from helper.configuration import read_configuration
 
 class OCRRLogger:
     def __init__(self, log_file='ocrr.log', log_level=logging.INFO) -> None:
@@ -71,10 +71,9 @@ class OCRRLogger:
         
         :return: Log path specified in the configuration file or current working directory.
         """
-        config = configparser.ConfigParser(allow_no_value=True)
         try:
             # Read configuration file
-            config.read(r'C:\Program Files\OCRR\settings\configuration.ini')
+            config = read_configuration()
 
             # Return the log path if specified in the configuration file
             if 'Logging' in config and 'path' in config['Logging']:
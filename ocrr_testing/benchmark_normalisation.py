@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.ocr_page import OCRPage
+from helper.document_image import DocumentImage
+from process_documents.normalise_document import normalise_document
+
+def ocr_tokens(document_image, lang, config):
+    # OCR without the persistent cache so every run is timed
+    ocr_page = OCRPage(document_image.source_path, document_image=document_image)
+    ocr_page.ocr_cache = None
+    start = time.perf_counter()
+    data = ocr_page.image_to_data(lang=lang, config=config)
+    ocr_ms = (time.perf_counter() - start) * 1000
+    tokens = []
+    for i in range(len(data['text'])):
+        text = data['text'][i].strip()
+        if text:
+            tokens.append((text, [data['left'][i], data['top'][i], data['left'][i] + data['width'][i], data['top'][i] + data['height'][i]]))
+    return tokens, ocr_ms
+
+def iou(box_a, box_b):
+    x1, y1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    x2, y2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - intersection
+    return intersection / union if union else 0.0
+
+def compare_tokens(reference_tokens, tokens):
+    # Pair tokens with the same text in reading order; report recall and box drift in original pixels
+    candidates = defaultdict(list)
+    for text, box in tokens:
+        candidates[text].append(box)
+    matched, ious, shifts = 0, [], []
+    for text, reference_box in reference_tokens:
+        if candidates[text]:
+            box = candidates[text].pop(0)
+            matched += 1
+            ious.append(iou(reference_box, box))
+            shifts.append(max(abs(reference_box[i] - box[i]) for i in range(4)))
+    recall = matched / len(reference_tokens) if reference_tokens else 1.0
+    mean_iou = sum(ious) / len(ious) if ious else 0.0
+    return recall, mean_iou, max(shifts) if shifts else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare OCR latency and output drift of full-resolution and normalised documents.")
+    parser.add_argument("image_paths", nargs="+", help="Paths to the reference document images")
+    parser.add_argument("--target-dpi", type=float, default=300, help="Target resolution of the normalisation")
+    parser.add_argument("--min-trusted-dpi", type=float, default=150, help="Lowest recorded resolution which is trusted")
+    parser.add_argument("--max-long-side", type=int, default=3600, help="Longest side in pixels of documents without a trusted resolution")
+    parser.add_argument("--lang", default="eng", help="Tesseract language")
+    parser.add_argument("--config", default=r"--oem 3 --psm 11", help="Tesseract configuration")
+
+    args = parser.parse_args()
+    settings = {"enabled": True, "target_dpi": args.target_dpi, "min_trusted_dpi": args.min_trusted_dpi, "max_long_side": args.max_long_side}
+
+    totals = defaultdict(float)
+    for image_path in args.image_paths:
+        start = time.perf_counter()
+        full_image = DocumentImage.from_file(image_path).to_grayscale()
+        full_decode_ms = (time.perf_counter() - start) * 1000
+        full_tokens, full_ocr_ms = ocr_tokens(full_image, args.lang, args.config)
+
+        start = time.perf_counter()
+        normalised_image = normalise_document(image_path, settings)
+        normalised_decode_ms = (time.perf_counter() - start) * 1000
+        normalised_tokens, normalised_ocr_ms = ocr_tokens(normalised_image, args.lang, args.config)
+
+        recall, mean_iou, max_shift = compare_tokens(full_tokens, normalised_tokens)
+        print(f"{os.path.basename(image_path):<32} {full_image.size[0]}x{full_image.size[1]} -> {normalised_image.size[0]}x{normalised_image.size[1]} | "
+              f"decode {full_decode_ms:7.1f} -> {normalised_decode_ms:7.1f} ms | OCR {full_ocr_ms:8.1f} -> {normalised_ocr_ms:8.1f} ms | "
+              f"tokens {len(full_tokens)} -> {len(normalised_tokens)}, recall {recall:.3f}, mean IoU {mean_iou:.3f}, max shift {max_shift} px")
+        totals["full_ms"] += full_decode_ms + full_ocr_ms
+        totals["normalised_ms"] += normalised_decode_ms + normalised_ocr_ms
+        totals["recall"] += recall
+        totals["mean_iou"] += mean_iou
+
+    count = len(args.image_paths)
+    print(f"Total {totals['full_ms']:.1f} ms -> {totals['normalised_ms']:.1f} ms ({totals['full_ms'] / max(totals['normalised_ms'], 1e-9):.2f}x), "
+          f"average recall {totals['recall'] / count:.3f}, average IoU {totals['mean_iou'] / count:.3f}")
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.ocr_backend import PytesseractBackend, TesserocrBackend
+
+def benchmark_backend(backend, image_paths, runs, lang, config):
+    # Warm up the backend so that model loading is reported separately
+    start = time.perf_counter()
+    backend.image_to_data(image_paths[0], lang=lang, config=config)
+    warm_up_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(runs):
+        for image_path in image_paths:
+            start = time.perf_counter()
+            backend.image_to_data(image_path, lang=lang, config=config)
+            timings.append((time.perf_counter() - start) * 1000)
+    return warm_up_ms, timings
+
+def print_result(name, warm_up_ms, timings):
+    timings = sorted(timings)
+    mean_ms = sum(timings) / len(timings)
+    median_ms = timings[len(timings) // 2]
+    print(f"{name:<12} warm-up {warm_up_ms:9.1f} ms | per document: mean {mean_ms:9.1f} ms, median {median_ms:9.1f} ms, min {timings[0]:9.1f} ms, max {timings[-1]:9.1f} ms ({len(timings)} calls)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-document OCR latency of the pytesseract and tesserocr backends.")
+    parser.add_argument("image_paths", nargs="+", help="Paths to the document images")
+    parser.add_argument("--runs", type=int, default=3, help="Number of passes over the images")
+    parser.add_argument("--lang", default="eng", help="Tesseract language")
+    parser.add_argument("--config", default=r"--oem 3 --psm 11", help="Tesseract configuration")
+    parser.add_argument("--tessdata-path", default=None, help="tessdata directory for the tesserocr backend")
+
+    args = parser.parse_args()
+
+    backends = [PytesseractBackend()]
+    try:
+        backends.append(TesserocrBackend(args.tessdata_path))
+    except Exception as e:
+        print(f"Skipping tesserocr backend: {e}")
+
+    for backend in backends:
+        warm_up_ms, timings = benchmark_backend(backend, args.image_paths, args.runs, args.lang, args.config)
+        print_result(backend.name, warm_up_ms, timings)
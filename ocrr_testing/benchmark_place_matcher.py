@@ -0,0 +1,70 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.places import places_list
+from helper.place_matcher import PlaceMatcher
+
+def match_with_loop(tokens):
+    # Previous implementation: one re.search per place per token
+    matched = []
+    for text in tokens:
+        for place in places_list:
+            if re.search(place, text, flags=re.IGNORECASE):
+                matched.append(text)
+                break
+    return matched
+
+def match_with_place_matcher(place_matcher, tokens):
+    return [text for text in tokens if place_matcher.contains_place(text)]
+
+def generate_tokens(count, seed):
+    # Mix of OCR-like noise, numbers and (partially) embedded place names
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/-,.:"
+    tokens = []
+    for _ in range(count):
+        choice = rng.random()
+        if choice < 0.15:
+            place = rng.choice(places_list)
+            tokens.append(rng.choice([place, place.upper(), place.title(), f"{place},", f"s/o{place}"]))
+        elif choice < 0.30:
+            tokens.append(str(rng.randint(0, 999999)))
+        else:
+            tokens.append("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))))
+    return tokens
+
+def time_runs(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, min(timings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the per-place regex loop with PlaceMatcher on synthetic OCR tokens.")
+    parser.add_argument("--tokens", type=int, default=200, help="Number of OCR tokens per document")
+    parser.add_argument("--runs", type=int, default=3, help="Number of timed runs (best is reported)")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed for the token generator")
+
+    args = parser.parse_args()
+    tokens = generate_tokens(args.tokens, args.seed)
+
+    start = time.perf_counter()
+    place_matcher = PlaceMatcher(places_list)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    loop_result, loop_ms = time_runs(lambda: match_with_loop(tokens), args.runs)
+    matcher_result, matcher_ms = time_runs(lambda: match_with_place_matcher(place_matcher, tokens), args.runs)
+
+    print(f"places: {len(places_list)}, tokens: {len(tokens)}, matched tokens: {len(matcher_result)}")
+    print(f"regex loop    {loop_ms:9.2f} ms per document")
+    print(f"PlaceMatcher  {matcher_ms:9.2f} ms per document (built once in {build_ms:.2f} ms)")
+    print(f"speed-up      {loop_ms / matcher_ms:9.1f}x")
+    print(f"same matches: {loop_result == matcher_result}")
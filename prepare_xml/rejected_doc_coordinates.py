@@ -1,15 +1,17 @@
-import numpy as np
-import cv2
+from helper.image_dimensions import get_image_dimensions
 
 class GetRejectedDocumentCoordinates:
-    def __init__(self, document_path: str) -> None:
+    def __init__(self, document_path: str, image_size: tuple = None) -> None:
         self.document_path = document_path
-    
+        self.image_size = image_size
+
     def get_coordinates(self) -> list:
-        """Read the image"""
-        image = cv2.imread(self.document_path)
         """Get the image height and width"""
-        height, width = image.shape[:2]
+        if self.image_size is not None:
+            width, height = self.image_size
+        else:
+            """Read the dimensions from the image header"""
+            width, height = get_image_dimensions(self.document_path)
         """Calculate the coordinates of the 80% of the image"""
         x1 = 0
         y1 = 0
@@ -0,0 +1,247 @@
+"""
+FairScheduler: Per-client fair scheduling of claimed documents with priority lanes.
+
+Documents used to be processed in poll order, so one client uploading a large batch
+starved all other clients until its batch was done. The poller now puts claimed documents
+into the scheduler instead of the worker queue. The scheduler keeps one sub-queue per
+client (tenant) in every priority lane and a dispatcher thread moves documents to the
+worker queue as the workers take them:
+  - lanes are served by strict priority: a document of a higher lane always goes first
+  - within a lane, clients are served by deficit round-robin: every turn a client may
+    send documents worth its weight, so a client with weight 2 gets twice the share of a
+    client with weight 1, and a client with few documents is never behind a large batch
+  - a client holds at most max_per_tenant documents in the scheduler; the poller does not
+    claim more documents of saturated clients, so the backlog of a large client stays
+    'IN_PROGRESS' in MongoDB while the documents of other clients are claimed
+
+The scheduler reports the documents it holds, and the most recent ones it handed to the
+worker queue which a worker may not have started yet, with held_task_ids(); the lease
+heartbeat only renews those and the documents of live workers.
+
+The lane of a document is the integer priority_field of its fileDetails document (default
+0, higher is served first). Per-client queue depth and wait time metrics are available
+from get_metrics().
+
+The scheduler is configured with the [Scheduling] section of configuration.ini:
+    [Scheduling]
+    capacity = 0
+    max_per_tenant = 4
+    priority_field = priority
+    weights = client-a:2, client-b:0.5
+
+Example usage:
+    scheduler = FairScheduler(capacity=64, max_per_tenant=4, logger=logger)
+    scheduler.put(document_info)
+    scheduler.start_dispatcher(worker_queue, recent_dispatch_limit=queue_capacity + worker_count + 1)
+"""
+
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from helper.configuration import read_configuration
+
+def parse_tenant_weights(weights: str) -> dict:
+    """
+    Parse 'client-a:2, client-b:0.5' into {'client-a': 2.0, 'client-b': 0.5}.
+    """
+    tenant_weights = {}
+    for entry in filter(None, (part.strip() for part in (weights or '').split(','))):
+        tenant, _, weight = entry.rpartition(':')
+        if tenant and float(weight) > 0:
+            tenant_weights[tenant.strip()] = float(weight)
+    return tenant_weights
+
+class FairScheduler:
+    def __init__(self, capacity: int, max_per_tenant: int = None, tenant_weights: dict = None, priority_field: str = None,
+                 metrics_log_interval: float = 60, logger: object = None) -> None:
+        config = read_configuration()
+        # Documents held by the scheduler in total and per client
+        self.capacity = capacity
+        self.max_per_tenant = max_per_tenant if max_per_tenant else config.getint('Scheduling', 'max_per_tenant', fallback=4)
+        self.tenant_weights = tenant_weights if tenant_weights is not None else parse_tenant_weights(config.get('Scheduling', 'weights', fallback=''))
+        self.priority_field = priority_field if priority_field else config.get('Scheduling', 'priority_field', fallback='priority').strip()
+        self.metrics_log_interval = metrics_log_interval
+        self.logger = logger if logger is not None else logging.getLogger('OCRR')
+
+        # (lane, tenant) -> documents in claim order
+        self._queues = {}
+        # Lane -> tenants with documents, in round-robin order
+        self._rotations = defaultdict(deque)
+        # (lane, tenant) -> deficit of the tenant's current turn
+        self._deficits = {}
+        # Tenant -> documents held
+        self._tenant_depths = defaultdict(int)
+        self._size = 0
+        self._condition = threading.Condition()
+
+        # Tenant -> dispatched documents and their wait in the scheduler
+        self._tenant_metrics = defaultdict(lambda: {"dispatched": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0})
+        self._dispatcher_thread = None
+        # Task ids most recently put into the worker queue, possibly not started by a worker yet
+        self._recent_dispatches = deque()
+        self._recent_dispatch_limit = 0
+
+    def _weight(self, tenant: str) -> float:
+        return self.tenant_weights.get(tenant, 1.0)
+
+    def get_priority(self, document: dict) -> int:
+        """
+        Return the lane of a fileDetails document.
+        """
+        try:
+            return int(document.get(self.priority_field) or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def put(self, document_info: dict) -> None:
+        """
+        Add a document to the sub-queue of its client ('clientId') in its lane ('priority').
+        """
+        lane = document_info.get('priority', 0)
+        tenant = document_info['clientId']
+        with self._condition:
+            if (lane, tenant) not in self._queues:
+                self._queues[(lane, tenant)] = deque()
+                self._rotations[lane].append(tenant)
+            self._queues[(lane, tenant)].append((time.monotonic(), document_info))
+            self._tenant_depths[tenant] += 1
+            self._size += 1
+            self._condition.notify()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def free_capacity(self) -> int:
+        return max(0, self.capacity - self._size)
+
+    def saturated_tenants(self) -> list:
+        """
+        Return the clients holding max_per_tenant documents; the poller must not claim more of theirs.
+        """
+        with self._condition:
+            return [tenant for tenant, depth in self._tenant_depths.items() if depth >= self.max_per_tenant]
+
+    def _next_from_lane(self, lane: int) -> tuple:
+        # Deficit round-robin over the clients of one lane
+        rotation = self._rotations[lane]
+        while rotation:
+            tenant = rotation[0]
+            key = (lane, tenant)
+            # A client starting its turn is credited with its weight
+            if self._deficits.get(key, 0.0) < 1:
+                self._deficits[key] = self._deficits.get(key, 0.0) + self._weight(tenant)
+            if self._deficits[key] >= 1:
+                self._deficits[key] -= 1
+                queued_at, document_info = self._queues[key].popleft()
+                if not self._queues[key]:
+                    # The client leaves the rotation; an idle client does not bank credit
+                    rotation.popleft()
+                    del self._queues[key]
+                    del self._deficits[key]
+                elif self._deficits[key] < 1:
+                    # Turn over, next client
+                    rotation.rotate(-1)
+                return tenant, queued_at, document_info
+            # Weight below 1: credit accumulates over several rounds
+            rotation.rotate(-1)
+        return None
+
+    def get(self, timeout: float = None) -> dict:
+        """
+        Remove and return the next document, or None if none arrives within timeout seconds.
+        """
+        with self._condition:
+            if not self._size and not self._condition.wait_for(lambda: self._size > 0, timeout=timeout):
+                return None
+            for lane in sorted(self._rotations, reverse=True):
+                selected = self._next_from_lane(lane)
+                if selected is None:
+                    del self._rotations[lane]
+                    continue
+                tenant, queued_at, document_info = selected
+                self._size -= 1
+                self._tenant_depths[tenant] -= 1
+                if self._tenant_depths[tenant] <= 0:
+                    del self._tenant_depths[tenant]
+                self._record_dispatch(tenant, time.monotonic() - queued_at)
+                return document_info
+            return None
+
+    def _record_dispatch(self, tenant: str, wait_seconds: float) -> None:
+        metrics = self._tenant_metrics[tenant]
+        metrics["dispatched"] += 1
+        metrics["total_wait_seconds"] += wait_seconds
+        metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], wait_seconds)
+
+    def get_metrics(self) -> dict:
+        """
+        Return the queue depth and scheduler wait times per client.
+        """
+        with self._condition:
+            tenants = set(self._tenant_depths) | set(self._tenant_metrics)
+            metrics = {}
+            for tenant in sorted(tenants):
+                tenant_metrics = self._tenant_metrics.get(tenant, {"dispatched": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0})
+                dispatched = tenant_metrics["dispatched"]
+                metrics[tenant] = {
+                    "depth": self._tenant_depths.get(tenant, 0),
+                    "dispatched": dispatched,
+                    "average_wait_seconds": round(tenant_metrics["total_wait_seconds"] / dispatched, 3) if dispatched else 0.0,
+                    "max_wait_seconds": round(tenant_metrics["max_wait_seconds"], 3)
+                }
+            return metrics
+
+    def held_task_ids(self) -> list:
+        """
+        Return the task ids held by the scheduler or recently put into the worker queue.
+        """
+        with self._condition:
+            task_ids = [document_info['taskId'] for documents in self._queues.values() for _, document_info in documents]
+            task_ids.extend(self._recent_dispatches)
+            return task_ids
+
+    def _record_queued(self, document_info: dict) -> None:
+        # The worker queue is FIFO and bounded, so older dispatches have been taken by a worker
+        with self._condition:
+            self._recent_dispatches.append(document_info['taskId'])
+            while len(self._recent_dispatches) > self._recent_dispatch_limit:
+                self._recent_dispatches.popleft()
+
+    def _forget_queued(self, document_info: dict) -> None:
+        with self._condition:
+            if document_info['taskId'] in self._recent_dispatches:
+                self._recent_dispatches.remove(document_info['taskId'])
+
+    def _dispatch_loop(self, worker_queue: object) -> None:
+        last_metrics_log = time.monotonic()
+        while True:
+            try:
+                document_info = self.get(timeout=1.0)
+                if document_info is not None:
+                    # Recorded before the put, which blocks while the bounded worker queue is full
+                    self._record_queued(document_info)
+                    try:
+                        worker_queue.put(document_info)
+                    except Exception:
+                        # Not queued: the lease of the document must expire so that it is reclaimed
+                        self._forget_queued(document_info)
+                        raise
+                # Log the per-client metrics periodically
+                if time.monotonic() - last_metrics_log >= self.metrics_log_interval:
+                    self.logger.info(f"| Scheduler metrics per client: {self.get_metrics()}")
+                    last_metrics_log = time.monotonic()
+            except Exception as e:
+                self.logger.error(f"| Failed to dispatch document to the worker queue: {e}")
+
+    def start_dispatcher(self, worker_queue: object, recent_dispatch_limit: int = 0) -> None:
+        """
+        Move documents to the worker queue on a daemon thread, in scheduling order.
+
+        :param recent_dispatch_limit: Documents the worker queue, the workers before starting them
+            and a blocked put can hold; their task ids are reported by held_task_ids().
+        """
+        self._recent_dispatch_limit = recent_dispatch_limit
+        if self._dispatcher_thread is None or not self._dispatcher_thread.is_alive():
+            self._dispatcher_thread = threading.Thread(target=self._dispatch_loop, args=(worker_queue,), name="OCRRScheduler", daemon=True)
+            self._dispatcher_thread.start()
@@ -0,0 +1,123 @@
+"""
+Resolution normalisation of documents before OCR.
+
+Phone photos and 600 dpi scans used to reach Tesseract at full resolution, although text
+is recognised just as well at around 300 dpi and Tesseract's run time grows with the pixel
+count. normalise_document() decodes the document at a reduced resolution instead:
+  - the target scale is target_dpi / document dpi when the file records a plausible
+    resolution (at least min_trusted_dpi; phone cameras write a meaningless 72 dpi);
+    otherwise the document is only capped so that its long side is at most max_long_side
+    pixels, which keeps a 300 dpi A4 page (3508 px) at full size
+  - JPEGs are decoded directly at 1/2, 1/4 or 1/8 resolution with
+    cv2.IMREAD_REDUCED_GRAYSCALE_* (or _COLOR_* when preprocessing needs colour), which
+    skips most of the decode work, choosing the strongest reduction that stays at or
+    above the target
+  - the remainder is an INTER_AREA resize to the exact target
+Documents are never upscaled. The returned DocumentImage records the scale and the
+original size; OCRPage and locate_qr_codes map every box back to original pixel space, so
+the redaction coordinates are unaffected. Normalisation is off until its latency and OCR
+drift have been measured on a reference set with ocrr_testing/benchmark_normalisation.py.
+
+Normalisation is configured with the [Normalisation] section of configuration.ini:
+    [Normalisation]
+    enabled = off
+    target_dpi = 300
+    min_trusted_dpi = 150
+    max_long_side = 3600
+
+Example usage:
+    document_image = normalise_document('/path/to/upload/document.jpg')
+    x1, y1, x2, y2 = document_image.to_original_box(box)
+"""
+
+import cv2
+import logging
+from PIL import Image
+from helper.configuration import read_configuration
+from helper.document_image import DocumentImage
+from helper.image_dimensions import get_image_dimensions
+
+# Reduction factor -> cv2 decode flag
+REDUCED_GRAYSCALE_FLAGS = {8: cv2.IMREAD_REDUCED_GRAYSCALE_8, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2}
+REDUCED_COLOR_FLAGS = {8: cv2.IMREAD_REDUCED_COLOR_8, 4: cv2.IMREAD_REDUCED_COLOR_4, 2: cv2.IMREAD_REDUCED_COLOR_2}
+
+def get_normalisation_settings() -> dict:
+    """
+    Return the [Normalisation] settings of configuration.ini.
+    """
+    config = read_configuration()
+    return {
+        "enabled": config.get('Normalisation', 'enabled', fallback='off').strip().lower() == 'on',
+        "target_dpi": config.getfloat('Normalisation', 'target_dpi', fallback=300),
+        "min_trusted_dpi": config.getfloat('Normalisation', 'min_trusted_dpi', fallback=150),
+        "max_long_side": config.getint('Normalisation', 'max_long_side', fallback=3600)
+    }
+
+def get_image_dpi(path: str) -> float:
+    """
+    Return the horizontal resolution recorded in the image header, or None.
+    """
+    try:
+        # PIL only parses the header on open
+        with Image.open(path) as image:
+            dpi = image.info.get('dpi')
+        return float(dpi[0]) if dpi and dpi[0] else None
+    except Exception:
+        return None
+
+def get_target_scale(path: str, original_size: tuple, target_dpi: float, min_trusted_dpi: float, max_long_side: int) -> float:
+    """
+    Return the scale (at most 1) the document should be processed at.
+    """
+    scale = 1.0
+    dpi = get_image_dpi(path)
+    if dpi is not None and dpi >= min_trusted_dpi:
+        return min(scale, target_dpi / dpi)
+    # Without a trusted resolution only the size cap applies
+    if max_long_side:
+        scale = min(scale, max_long_side / float(max(original_size)))
+    return scale
+
+def _decode_full(path: str, grayscale: bool) -> DocumentImage:
+    document_image = DocumentImage.from_file(path)
+    return document_image.to_grayscale() if grayscale else document_image
+
+def normalise_document(path: str, settings: dict = None, logger: object = None, grayscale: bool = True) -> DocumentImage:
+    """
+    Decode a document as a DocumentImage at its normalised resolution.
+
+    :param settings: Normalisation settings, read from configuration.ini if not given.
+    :param grayscale: Decode single-channel; otherwise BGR, for the colour checks of preprocessing.
+    :raises ValueError: If the file cannot be decoded.
+    """
+    settings = settings if settings is not None else get_normalisation_settings()
+    logger = logger if logger is not None else logging.getLogger('OCRR')
+    if not settings["enabled"]:
+        return _decode_full(path, grayscale)
+
+    original_size = get_image_dimensions(path)
+    scale = get_target_scale(path, original_size, settings["target_dpi"], settings["min_trusted_dpi"], settings["max_long_side"])
+    if scale >= 1.0:
+        return _decode_full(path, grayscale)
+
+    # Strongest decoder reduction which does not go below the target
+    reduced_flags = REDUCED_GRAYSCALE_FLAGS if grayscale else REDUCED_COLOR_FLAGS
+    reduction = next((factor for factor in sorted(reduced_flags, reverse=True) if 1.0 / factor >= scale), 1)
+    if reduction > 1:
+        document_image = DocumentImage.from_file(path, reduced_flags[reduction])
+    else:
+        document_image = _decode_full(path, grayscale)
+
+    # The header and the decoder must agree on the orientation
+    height, width = document_image.array.shape[:2]
+    if (width > height) != (original_size[0] > original_size[1]) and original_size[0] != original_size[1]:
+        original_size = (original_size[1], original_size[0])
+
+    # Area resize of the remainder to the exact target
+    target_size = (max(1, int(round(original_size[0] * scale))), max(1, int(round(original_size[1] * scale))))
+    array = document_image.array
+    if array.shape[1] > target_size[0]:
+        array = cv2.resize(array, target_size, interpolation=cv2.INTER_AREA)
+    document_image = DocumentImage(array, source_path=path, original_size=original_size)
+    logger.info(f"| Normalised document from {original_size[0]}x{original_size[1]} to {document_image.size[0]}x{document_image.size[1]} (decoder reduction 1/{reduction})")
+    return document_image
@@ -0,0 +1,179 @@
+"""
+Adaptive preprocessing of documents before OCR.
+
+The old colour path ran fastNlMeansDenoisingColored on every colour document, which took
+seconds per page, so it was disabled and documents got no preprocessing besides the
+grayscale conversion. preprocess_document() measures a few cheap statistics first and runs
+only the stages a document needs:
+  - route: documents detected as grayscale are decoded single-channel from the start (see
+    helper/colour_detection.py); a colour decode that turns out grayscale on a strided
+    sample is reduced to one channel, a colour one gets the weighted BGR to gray conversion
+  - noise (Immerkaer's fast estimate of the noise sigma): a 3x3 median filter above
+    noise_threshold, an edge-preserving bilateral filter above strong_noise_threshold;
+    NL-means is only used when allow_nl_means is on
+  - contrast (background minus ink level, split by Otsu's threshold on a sample): CLAHE
+    below contrast_threshold
+  - sharpness (strong gradients of the ink edges relative to the contrast, about 1 for a
+    crisp edge): an unsharp mask below sharpness_threshold, unless the document was denoised
+Contrast and sharpness are measured on the ink and its edges only, so sparse documents,
+where ink covers a percent of the page, are not taken for faded or blurred ones. A page
+without ink gets neither stage.
+Statistics and stages work on the normalised image, so their cost follows its size. The
+time of every stage is logged with the document. Preprocessing changes the image Tesseract
+sees, so it is off until its thresholds have been checked against OCR output.
+
+Preprocessing is configured with the [Preprocessing] section of configuration.ini:
+    [Preprocessing]
+    enabled = off
+    sample_step = 4
+    grayscale_tolerance = 12
+    max_colour_fraction = 0.002
+    noise_threshold = 4
+    strong_noise_threshold = 10
+    allow_nl_means = off
+    contrast_threshold = 100
+    sharpness_threshold = 0.7
+
+Example usage:
+    grayscale = detect_grayscale('/path/to/upload/document.jpg')
+    document_image = normalise_document('/path/to/upload/document.jpg', grayscale=grayscale is True)
+    document_image = preprocess_document(document_image)
+"""
+
+import cv2
+import time
+import logging
+import numpy as np
+from helper.configuration import read_configuration
+from helper.document_image import DocumentImage
+from helper.colour_detection import is_grayscale_array
+
+# Kernel of Immerkaer's noise estimate: the difference of two Laplacians cancels image structure
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+def get_preprocessing_settings() -> dict:
+    """
+    Return the [Preprocessing] settings of configuration.ini.
+    """
+    config = read_configuration()
+    return {
+        "enabled": config.get('Preprocessing', 'enabled', fallback='off').strip().lower() == 'on',
+        "sample_step": max(1, config.getint('Preprocessing', 'sample_step', fallback=4)),
+        "grayscale_tolerance": config.getint('Preprocessing', 'grayscale_tolerance', fallback=12),
+        "max_colour_fraction": config.getfloat('Preprocessing', 'max_colour_fraction', fallback=0.002),
+        "noise_threshold": config.getfloat('Preprocessing', 'noise_threshold', fallback=4),
+        "strong_noise_threshold": config.getfloat('Preprocessing', 'strong_noise_threshold', fallback=10),
+        "allow_nl_means": config.get('Preprocessing', 'allow_nl_means', fallback='off').strip().lower() == 'on',
+        "contrast_threshold": config.getfloat('Preprocessing', 'contrast_threshold', fallback=100),
+        "sharpness_threshold": config.getfloat('Preprocessing', 'sharpness_threshold', fallback=0.7)
+    }
+
+def measure_noise(gray: np.ndarray) -> float:
+    """
+    Return the estimated sigma of the noise of a grayscale image (Immerkaer, 1996).
+    """
+    height, width = gray.shape
+    if height < 3 or width < 3:
+        return 0.0
+    # The response of 8-bit input is at most 16 * 255, so 16-bit arithmetic is enough
+    response = cv2.filter2D(gray, cv2.CV_16S, NOISE_KERNEL)[1:-1, 1:-1]
+    return float(np.sqrt(np.pi / 2) * cv2.norm(response, cv2.NORM_L1) / (6.0 * (width - 2) * (height - 2)))
+
+def measure_contrast(gray: np.ndarray, sample_step: int, min_ink_fraction: float = 0.0005) -> float:
+    """
+    Return the difference between the median background and ink levels of the sampled
+    gray levels, split by Otsu's threshold, or None if the sample holds almost no ink.
+    """
+    sample = np.ascontiguousarray(gray[::sample_step, ::sample_step])
+    threshold, _ = cv2.threshold(sample, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ink = sample[sample <= threshold]
+    background = sample[sample > threshold]
+    if ink.size < max(1, min_ink_fraction * sample.size) or not background.size:
+        return None
+    return float(np.median(background) - np.median(ink))
+
+def measure_sharpness(gray: np.ndarray, contrast: float) -> float:
+    """
+    Return the strong edge gradients relative to the contrast: about 1 for crisp ink edges,
+    lower the more the document is blurred. None if there are no edges.
+    """
+    gradient_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0)
+    gradient_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1)
+    magnitude = cv2.magnitude(gradient_x, gradient_y)
+    # Pixels on ink edges; the 3x3 Sobel response of a crisp edge is 4 times its contrast
+    edges = magnitude[magnitude >= contrast]
+    if not edges.size:
+        return None
+    return float(np.percentile(edges, 90)) / (4.0 * contrast)
+
+def _to_grayscale(array: np.ndarray, settings: dict) -> tuple:
+    # Return the gray image and the route which produced it
+    if array.ndim == 2:
+        return array, "grayscale"
+    if is_grayscale_array(array, settings["grayscale_tolerance"], settings["max_colour_fraction"], settings["sample_step"]):
+        # The channels are nearly equal: any one of them is the gray image
+        return np.ascontiguousarray(array[:, :, 1]), "grayscale"
+    return cv2.cvtColor(array, cv2.COLOR_BGRA2GRAY if array.shape[2] == 4 else cv2.COLOR_BGR2GRAY), "colour"
+
+def preprocess_document(document_image: DocumentImage, settings: dict = None, logger: object = None, document_name: str = None) -> DocumentImage:
+    """
+    Return the grayscale, preprocessed version of a document image.
+
+    :param settings: Preprocessing settings, read from configuration.ini if not given.
+    """
+    settings = settings if settings is not None else get_preprocessing_settings()
+    logger = logger if logger is not None else logging.getLogger('OCRR')
+    if not settings["enabled"]:
+        return document_image.to_grayscale()
+
+    timings = {}
+    stages = []
+    start = time.perf_counter()
+
+    # Grayscale conversion, routed by the sampled colour check
+    gray, route = _to_grayscale(document_image.array, settings)
+    timings["grayscale"] = time.perf_counter() - start
+
+    # Cheap statistics of the gray image
+    stage_start = time.perf_counter()
+    noise = measure_noise(gray)
+    contrast = measure_contrast(gray, settings["sample_step"])
+    sharpness = measure_sharpness(gray, contrast) if contrast else None
+    timings["measure"] = time.perf_counter() - stage_start
+
+    # Denoise with the cheapest filter for the noise level
+    denoised = False
+    if noise >= settings["noise_threshold"]:
+        stage_start = time.perf_counter()
+        if noise >= settings["strong_noise_threshold"] and settings["allow_nl_means"]:
+            gray = cv2.fastNlMeansDenoising(gray, None, h=min(noise * 1.5, 30), templateWindowSize=7, searchWindowSize=21)
+            stages.append("nl_means")
+        elif noise >= settings["strong_noise_threshold"]:
+            gray = cv2.bilateralFilter(gray, 5, noise * 2, 5)
+            stages.append("bilateral")
+        else:
+            gray = cv2.medianBlur(gray, 3)
+            stages.append("median")
+        denoised = True
+        timings["denoise"] = time.perf_counter() - stage_start
+
+    # Local contrast equalisation of faded documents
+    if contrast is not None and contrast < settings["contrast_threshold"]:
+        stage_start = time.perf_counter()
+        gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+        stages.append("clahe")
+        timings["contrast"] = time.perf_counter() - stage_start
+
+    # Unsharp mask of blurred documents; sharpening would bring back removed noise
+    if sharpness is not None and sharpness < settings["sharpness_threshold"] and not denoised:
+        stage_start = time.perf_counter()
+        gaussian_blur = cv2.GaussianBlur(gray, (5, 5), sigmaX=1, sigmaY=1)
+        gray = cv2.addWeighted(gray, 1.5, gaussian_blur, -0.5, 0)
+        stages.append("sharpen")
+        timings["sharpen"] = time.perf_counter() - stage_start
+
+    timings["total"] = time.perf_counter() - start
+    logger.info(f"| Pre-Processed document {document_name or document_image.source_path}: "
+                f"route {route}, noise {noise:.2f}, contrast {contrast}, sharpness {None if sharpness is None else round(sharpness, 2)}, "
+                f"stages {stages or ['none']}, timings (ms) { {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()} }")
+    return DocumentImage(gray, document_image.source_path, document_image.original_size)
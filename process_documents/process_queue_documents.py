@@ -1,120 +1,106 @@
 import os
-import shutil
-from time import sleep
-import cv2
-import numpy as np
+import time
+import queue
+from helper.configuration import read_configuration
+from helper.document_image import DocumentImage
+from helper.colour_detection import detect_grayscale
+from process_documents.normalise_document import normalise_document, get_normalisation_settings
+from process_documents.preprocess_document import preprocess_document, get_preprocessing_settings
 from ocrr_document.process_ocrr import ProcessDocumentOCRR
 
 class ProcessQueueDocuments:
-    def __init__(self, doc_in_progress_status_queue: object, doc_upload_path: str, ocrr_workspace_path: str, logger: object, redaction_level: int) -> None:
+    def __init__(self, doc_in_progress_status_queue: object, doc_upload_path: str, ocrr_workspace_path: str, logger: object, redaction_level: int, queue_get_timeout: float = 1.0, metrics_log_interval: float = 60) -> None:
         self.doc_in_progress_status_queue = doc_in_progress_status_queue
         self.doc_upload_path = doc_upload_path
         self.ocrr_workspace_path = ocrr_workspace_path
         self.logger = logger
         self.redaction_level = redaction_level
+        # Seconds to block on an empty queue before checking again
+        self.queue_get_timeout = queue_get_timeout
+
+        # Time documents waited in the queue
+        self.metrics_log_interval = metrics_log_interval
+        self.queue_metrics = {"documents": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        self._last_metrics_log = time.monotonic()
+
+        # Documents are decoded in memory; a workspace copy is only written when enabled
+        config = read_configuration()
+        self.write_workspace_copy = config.get('Workspace', 'write_workspace_copy', fallback='off').strip().lower() == 'on'
+
+        # Resolution the documents are processed at
+        self.normalisation_settings = get_normalisation_settings()
+        # Adaptive preprocessing stages
+        self.preprocessing_settings = get_preprocessing_settings()
     
     def process_queue_document(self):
         while True:
             try:
-                document_info = self.doc_in_progress_status_queue.get()
+                # Block until a document arrives; the next one is taken as soon as this one is done
+                try:
+                    document_info = self.doc_in_progress_status_queue.get(timeout=self.queue_get_timeout)
+                except queue.Empty:
+                    continue
                 if document_info:
-                    # Pre-Process the document
-                    self._pre_process_queue_document(document_info)
+                    self._record_queue_wait(document_info)
+                    # Pre-Process the document into its in-memory image
+                    document_image = self._pre_process_queue_document(document_info)
                     # Process the document using OCRR
-                    ProcessDocumentOCRR(document_info, self.logger, self.redaction_level).start_ocrr()
-                sleep(5)
+                    ProcessDocumentOCRR(document_info, self.logger, self.redaction_level, document_image=document_image).start_ocrr()
             except Exception as e:
                 self.logger.error(f"| Failed to process document: {e}")
 
-    def _pre_process_queue_document(self, document_info: dict):
-        try:
-            # Copy the document to the OCRR workspace
-            shutil.copy(document_info['path'], os.path.join(self.ocrr_workspace_path, document_info['renamedDoc']))
-            self.logger.info(f"| Copied document to OCRR workspace: {document_info['renamedDoc']}")
-
-            # Convert the document to grayscale
-            self.logger.info(f"| Converting document to grayscale: {document_info['renamedDoc']}")
-            self._convert_document_to_grayscale(os.path.join(self.ocrr_workspace_path, document_info['renamedDoc']))
-               
-            # # Identify document as Grayscale and Pre-Process Colored document
-            # if self._check_document_is_grayscale(os.path.join(self.ocrr_workspace_path, document_info['renamedDoc'])):
-            #     # Convert the document to grayscale
-            #     self.logger.info(f"| Converting document to grayscale: {document_info['renamedDoc']}")
-            #     self._convert_document_to_grayscale(os.path.join(self.ocrr_workspace_path, document_info['renamedDoc']))
-            # elif self._check_document_is_colored(os.path.join(self.ocrr_workspace_path, document_info['renamedDoc'])):
-            #     # Pre-Process the colored document
-            #     self.logger.info(f"| Pre-Processing colored document: {document_info['renamedDoc']}")
-            #     self._pre_process_colored_document(os.path.join(self.ocrr_workspace_path, document_info['renamedDoc']))
-        except Exception as e:
-            self.logger.error(f"| Failed to Pre-Process document: {e}")
-            return False
-    
-    def _check_document_is_grayscale(self, ocrr_workspace_doc_path: str) -> bool:
-        try:
-            # Load the image
-            document = cv2.imread(ocrr_workspace_doc_path)
+    def _record_queue_wait(self, document_info: dict):
+        # Update the wait time metrics with a document taken from the queue
+        if 'queuedAt' not in document_info:
+            return
+        wait_seconds = max(0.0, time.time() - document_info['queuedAt'])
+        self.queue_metrics["documents"] += 1
+        self.queue_metrics["total_wait_seconds"] += wait_seconds
+        self.queue_metrics["max_wait_seconds"] = max(self.queue_metrics["max_wait_seconds"], wait_seconds)
+        self.logger.info(f"| Document waited {wait_seconds:.2f}s in queue: {document_info['taskId']}")
 
-            # Check if the image has less than 3 dimensions (i.e., grayscale or single channel)
-            if len(document.shape) < 3:
-                return True
+        # Log a summary of the wait times periodically
+        if time.monotonic() - self._last_metrics_log >= self.metrics_log_interval:
+            self.logger.info(f"| Queue wait metrics: {self.get_queue_metrics()}")
+            self._last_metrics_log = time.monotonic()
 
-            # Check if the third dimension has only one channel
-            if document.shape[2] == 1:
-                return True
+    def get_queue_metrics(self) -> dict:
+        """
+        Return the queue wait time metrics of this worker so far.
+        """
+        metrics = dict(self.queue_metrics)
+        metrics["average_wait_seconds"] = round(metrics["total_wait_seconds"] / metrics["documents"], 3) if metrics["documents"] else 0.0
+        metrics["total_wait_seconds"] = round(metrics["total_wait_seconds"], 3)
+        metrics["max_wait_seconds"] = round(metrics["max_wait_seconds"], 3)
+        return metrics
 
-            # Split the image into its color channels
-            b, g, r = document[:, :, 0], document[:, :, 1], document[:, :, 2]
-
-            # Check if all channels are the same
-            if (b == g).all() and (b == r).all():
-                return True
-            # If the above conditions are not met, the image is colored
-            return False
-        except Exception as e:
-            self.logger.error(f"| Failed to check if document is grayscale: {e}")
-            return False
-    
-    def _check_document_is_colored(self, ocrr_workspace_doc_path: str) -> bool:
+    def _pre_process_queue_document(self, document_info: dict) -> DocumentImage:
         try:
-            # Load the image
-            document = cv2.imread(ocrr_workspace_doc_path)
+            # Grayscale documents are decoded single-channel; colour only when preprocessing needs to check it
+            grayscale = True
+            if self.preprocessing_settings["enabled"]:
+                grayscale = self._check_document_is_grayscale(document_info['path'])
 
-            # Check if the image has more than 3 dimensions (i.e., color)
-            if len(document.shape) == 3:
-                return True
+            # Decode the uploaded document once, at its normalised resolution
+            self.logger.info(f"| Decoding document ({'grayscale' if grayscale else 'colour'}): {document_info['renamedDoc']}")
+            document_image = normalise_document(document_info['path'], self.normalisation_settings, self.logger, grayscale=grayscale is True)
 
-            # If the above conditions are not met, the image is colored
-            return False
-        except Exception as e:
-            self.logger.error(f"| Failed to check if document is colored: {e}")
-            return False
+            # Run the preprocessing stages the document needs
+            document_image = preprocess_document(document_image, self.preprocessing_settings, self.logger, document_info['renamedDoc'])
 
-    def _pre_process_colored_document(self, ocrr_workspace_doc_path: str) -> bool:
-        try:
-            sigma_x = 1
-            sigma_y = 1
-            sig_alpha = 1.5
-            sig_beta = -0.2
-            gamma = 0
-        
-            document = cv2.imread(ocrr_workspace_doc_path)
-            denoise_document = cv2.fastNlMeansDenoisingColored(document, None, 10, 10, 7, 21)
-            gray_document = cv2.cvtColor(denoise_document, cv2.COLOR_BGR2GRAY)
-            gaussian_blur_document = cv2.GaussianBlur(gray_document, (5, 5), sigmaX=sigma_x, sigmaY=sigma_y)
-            sharpened_image = cv2.addWeighted(gray_document, sig_alpha, gaussian_blur_document, sig_beta, gamma)
-            sharpened_image_gray = cv2.cvtColor(sharpened_image, cv2.COLOR_GRAY2BGR)
-            cv2.imwrite(ocrr_workspace_doc_path, sharpened_image_gray)
-            return True
+            # Write the grayscale document to the OCRR workspace only when asked for
+            if self.write_workspace_copy:
+                document_image.save(os.path.join(self.ocrr_workspace_path, document_info['renamedDoc']))
+                self.logger.info(f"| Wrote document to OCRR workspace: {document_info['renamedDoc']}")
+            return document_image
         except Exception as e:
-            self.logger.error(f"| Failed to pre-process colored document: {e}")
-            return False
+            self.logger.error(f"| Failed to Pre-Process document: {e}")
+            return None
     
-    def _convert_document_to_grayscale(self, ocrr_workspace_doc_path: str) -> bool:
+    def _check_document_is_grayscale(self, document_path: str) -> bool:
         try:
-            document = cv2.imread(ocrr_workspace_doc_path)
-            gray_document = cv2.cvtColor(document, cv2.COLOR_BGR2GRAY)
-            cv2.imwrite(ocrr_workspace_doc_path, gray_document)
-            return True
+            # Header or reduced-decode check; None when only the decoded document can tell
+            return detect_grayscale(document_path, self.preprocessing_settings["grayscale_tolerance"], self.preprocessing_settings["max_colour_fraction"])
         except Exception as e:
-            self.logger.error(f"| Failed to convert document to gray: {e}")
-            return False
\ No newline at end of file
+            self.logger.error(f"| Failed to check if document is grayscale: {e}")
+            return None
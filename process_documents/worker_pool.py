@@ -0,0 +1,145 @@
+"""
+DocumentWorkerPool: A fleet of worker processes consuming the 'IN_PROGRESS' queue.
+
+OCR and regex extraction are CPU-bound and were serialised by the GIL in a single consumer
+thread. The pool starts N worker processes (default: one per core), each running its own
+ProcessQueueDocuments loop on a multiprocessing queue filled by the poller. Every worker
+configures its own logger and warms up its own OCR backend and QR detector, so models are
+loaded once per process. A worker that dies (e.g. a native crash in Tesseract) is replaced
+by the supervisor without affecting the others.
+
+The number of workers is configured with the [Workers] section of configuration.ini:
+    [Workers]
+    count = 0
+
+Example usage:
+    pool = DocumentWorkerPool(worker_count, document_queue, upload_path, workspace_path, redaction_level, logger)
+    pool.start()
+    pool.supervise()
+"""
+
+import os
+import sys
+import signal
+import multiprocessing
+from time import sleep
+from ocrr_logger.ocrrlogger import OCRRLogger
+from helper.configuration import read_configuration
+from helper.ocr_backend import get_ocr_backend
+from helper.qr_detector import warm_up_qr_reader
+from database.connection import close_db_client
+from database.status_batcher import get_status_batcher
+from process_documents.process_queue_documents import ProcessQueueDocuments
+
+def get_worker_count() -> int:
+    """
+    Return the number of worker processes from configuration.ini (0 or unset: one per core).
+    """
+    config = read_configuration()
+    try:
+        worker_count = int(config.get('Workers', 'count', fallback='0') or 0)
+    except ValueError:
+        worker_count = 0
+    if worker_count <= 0:
+        worker_count = os.cpu_count() or 1
+    return worker_count
+
+def _exit_worker(signum, frame) -> None:
+    sys.exit(0)
+
+def run_document_worker(worker_id: int, doc_in_progress_status_queue: object, doc_upload_path: str, ocrr_workspace_path: str, redaction_level: int) -> None:
+    """
+    Entry point of a worker process. Must stay at module level to be usable with the spawn start method.
+    """
+    # Configure the logger of this process
+    logger = OCRRLogger().configure_logger()
+    logger.info(f"| Worker {worker_id} started.")
+
+    # Load the OCR backend and the QR detection model once for this worker
+    get_ocr_backend()
+    warm_up_qr_reader(logger)
+
+    # Terminating the worker raises SystemExit, so that its pending writes are flushed and its MongoDB
+    # client is closed (POSIX only; on Windows terminate() ends the process without running handlers)
+    signal.signal(signal.SIGTERM, _exit_worker)
+
+    # Consume documents until the process is terminated
+    try:
+        ProcessQueueDocuments(doc_in_progress_status_queue, doc_upload_path, ocrr_workspace_path, logger, redaction_level).process_queue_document()
+    finally:
+        try:
+            get_status_batcher().flush()
+        finally:
+            close_db_client()
+        logger.info(f"| Worker {worker_id} stopped.")
+
+class DocumentWorkerPool:
+    def __init__(self, worker_count: int, doc_in_progress_status_queue: object, doc_upload_path: str, ocrr_workspace_path: str, redaction_level: int, logger: object,
+                 supervise_interval: float = 5, on_worker_exit: object = None) -> None:
+        self.worker_count = worker_count
+        self.doc_in_progress_status_queue = doc_in_progress_status_queue
+        self.doc_upload_path = doc_upload_path
+        self.ocrr_workspace_path = ocrr_workspace_path
+        self.redaction_level = redaction_level
+        self.logger = logger
+        self.supervise_interval = supervise_interval
+        # Called with the pid of a worker process which exited unexpectedly
+        self.on_worker_exit = on_worker_exit
+
+        # Worker id -> process
+        self.workers = {}
+        self._stopping = False
+
+    def _start_worker(self, worker_id: int) -> None:
+        process = multiprocessing.Process(
+            target=run_document_worker,
+            args=(worker_id, self.doc_in_progress_status_queue, self.doc_upload_path, self.ocrr_workspace_path, self.redaction_level),
+            name=f"OCRRWorker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.workers[worker_id] = process
+        self.logger.info(f"| Started worker {worker_id} (pid {process.pid}).")
+
+    def start(self) -> None:
+        """
+        Start all worker processes.
+        """
+        for worker_id in range(self.worker_count):
+            self._start_worker(worker_id)
+        self.logger.info(f"| Worker pool started with {self.worker_count} worker processes.")
+
+    def supervise(self) -> None:
+        """
+        Block and replace workers that exit unexpectedly until stop() is called.
+        """
+        while not self._stopping:
+            for worker_id, process in list(self.workers.items()):
+                if not process.is_alive() and not self._stopping:
+                    self.logger.error(f"| Worker {worker_id} (pid {process.pid}) exited with code {process.exitcode}, restarting.")
+                    process.join(timeout=0)
+                    if self.on_worker_exit is not None:
+                        try:
+                            self.on_worker_exit(process.pid)
+                        except Exception as e:
+                            self.logger.error(f"| Failed to release documents of worker {worker_id}: {e}")
+                    self._start_worker(worker_id)
+            sleep(self.supervise_interval)
+
+    def live_pids(self) -> list:
+        """
+        Return the pids of the worker processes which are alive.
+        """
+        return [process.pid for process in list(self.workers.values()) if process.is_alive()]
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Terminate all worker processes.
+        """
+        self._stopping = True
+        for process in self.workers.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.workers.values():
+            process.join(timeout=timeout)
+        self.logger.info("| Worker pool stopped.")
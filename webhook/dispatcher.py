@@ -0,0 +1,155 @@
+"""
+WebhookDispatcher: Delivers the entries of the webhook outbox in the background.
+
+The dispatcher claims due outbox entries and posts them from a pool of delivery threads,
+fully decoupled from document processing:
+  - one requests.Session per client host, so keep-alive connections are reused
+  - (connect, read) timeouts on every request
+  - failed deliveries are retried with exponential backoff and jitter, up to max_attempts
+  - at most per_client_concurrency deliveries per client are in flight; a slow client
+    endpoint only delays its own notifications
+
+Entries are claimed with a lease, so several engine nodes can run dispatchers on the same
+outbox, and an entry of a dispatcher which died is delivered by another one.
+
+The dispatcher is configured with the [Webhooks] section of configuration.ini:
+    [Webhooks]
+    workers = 8
+    per_client_concurrency = 2
+    connect_timeout = 3.05
+    read_timeout = 10
+    max_attempts = 8
+    backoff_base_seconds = 2
+    backoff_max_seconds = 300
+
+Example usage:
+    dispatcher = WebhookDispatcher(WebhookOutbox(db_client), logger)
+    dispatcher.start()
+"""
+
+import random
+import logging
+import threading
+from urllib.parse import urlsplit
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from helper.configuration import read_configuration
+from webhook.post_trigger import WebhookPostTrigger
+
+class WebhookDispatcher:
+    def __init__(self, outbox: object, logger: object = None, poll_interval: float = 1) -> None:
+        config = read_configuration()
+        self.outbox = outbox
+        self.logger = logger if logger is not None else logging.getLogger('OCRR')
+        self.poll_interval = poll_interval
+        self.workers = config.getint('Webhooks', 'workers', fallback=8)
+        self.per_client_concurrency = config.getint('Webhooks', 'per_client_concurrency', fallback=2)
+        self.timeout = (config.getfloat('Webhooks', 'connect_timeout', fallback=3.05), config.getfloat('Webhooks', 'read_timeout', fallback=10))
+        self.max_attempts = config.getint('Webhooks', 'max_attempts', fallback=8)
+        self.backoff_base_seconds = config.getfloat('Webhooks', 'backoff_base_seconds', fallback=2)
+        self.backoff_max_seconds = config.getfloat('Webhooks', 'backoff_max_seconds', fallback=300)
+
+        # Client host -> keep-alive session
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+        # Client id -> deliveries in flight
+        self._in_flight = defaultdict(int)
+        self._in_flight_total = 0
+        self._in_flight_lock = threading.Lock()
+
+        # Set when a delivery finished, so the next entry is claimed right away
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start dispatching on a daemon thread.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="OCRRWebhook")
+            self._thread = threading.Thread(target=self._dispatch_loop, name="OCRRWebhookDispatcher", daemon=True)
+            self._thread.start()
+            self.logger.info(f"| Webhook dispatcher started with {self.workers} delivery threads.")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _saturated_clients(self) -> list:
+        with self._in_flight_lock:
+            return [client_id for client_id, count in self._in_flight.items() if count >= self.per_client_concurrency]
+
+    def _dispatch_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                # Claim due entries while delivery threads are free
+                while self._in_flight_total < self.workers and not self._stop_event.is_set():
+                    entry = self.outbox.claim_next(exclude_clients=self._saturated_clients())
+                    if entry is None:
+                        break
+                    with self._in_flight_lock:
+                        self._in_flight[entry['clientId']] += 1
+                        self._in_flight_total += 1
+                    self._executor.submit(self._deliver, entry)
+            except Exception as e:
+                self.logger.error(f"| Failed to claim webhook outbox entries: {e}")
+            self._wake_event.wait(self.poll_interval)
+            self._wake_event.clear()
+
+    def _get_session(self, url: str) -> requests.Session:
+        # One session (and connection pool) per client host
+        host = urlsplit(url).netloc
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_client_concurrency)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def _backoff_seconds(self, attempts: int) -> float:
+        # Exponential backoff with jitter: half the delay is fixed, half is random
+        delay = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** max(0, attempts - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _deliver(self, entry: dict) -> None:
+        taskid = entry['taskId']
+        try:
+            trigger = WebhookPostTrigger(entry['url'], entry['payload'], session=self._get_session(entry['url']), timeout=self.timeout)
+            try:
+                delivered = trigger.send_post()
+                error = None if delivered else f"HTTP {trigger.status_code}"
+            except requests.RequestException as e:
+                delivered = False
+                error = str(e)
+
+            if delivered:
+                self.outbox.mark_delivered(entry)
+                self.logger.info(f"| Webhook request sent successfully for task: {taskid}")
+            elif entry['attempts'] >= self.max_attempts:
+                self.outbox.mark_failed(entry, error)
+                self.logger.error(f"| Failed to send webhook request for task: {taskid} after {entry['attempts']} attempts: {error}")
+            else:
+                delay = self._backoff_seconds(entry['attempts'])
+                self.outbox.mark_retry(entry, error, delay)
+                self.logger.warning(f"| Webhook request for task: {taskid} failed ({error}), retrying in {delay:.1f}s")
+        except Exception as e:
+            # The lease of the entry expires and it is claimed again
+            self.logger.error(f"| Failed to deliver webhook for task: {taskid}: {e}")
+        finally:
+            with self._in_flight_lock:
+                self._in_flight[entry['clientId']] -= 1
+                if self._in_flight[entry['clientId']] <= 0:
+                    del self._in_flight[entry['clientId']]
+                self._in_flight_total -= 1
+            self._wake_event.set()
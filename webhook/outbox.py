@@ -0,0 +1,122 @@
+"""
+WebhookOutbox: Durable queue of webhook notifications in ocrrworkspace.webhook_outbox.
+
+Webhooks used to be posted inline on the processing thread, so a slow or failing client
+endpoint stalled the pipeline (or, on the 'IN_PROGRESS' path, terminated it). Processing
+now only records the notification in the outbox, through the status batcher, so the
+entry is written with the same bulk write as the status it reports. The
+WebhookDispatcher delivers the entries independently of processing.
+
+The webhook URL of the client is resolved (and cached per client) when the notification
+is recorded; clients without a registered webhook get no outbox entry, as before.
+
+Outbox entry lifecycle:
+    PENDING    waiting for delivery (attempt due at nextAttemptAt)
+    SENDING    claimed by a dispatcher until leaseExpiresAt
+    DELIVERED  the client endpoint answered 200
+    FAILED     max_attempts deliveries failed
+
+Example usage:
+    outbox = WebhookOutbox(db_client)
+    outbox.enqueue(payload)
+    entry = outbox.claim_next(exclude_clients=["client-1"])
+"""
+
+import time
+import logging
+import datetime
+from pymongo import ReturnDocument
+from database.status_batcher import get_status_batcher
+
+class WebhookOutbox:
+    def __init__(self, db_client: object, lease_seconds: float = 60, url_cache_seconds: float = 60, logger: object = None) -> None:
+        self.collection_outbox = db_client['ocrrworkspace']['webhook_outbox']
+        self.collection_webhooks = db_client['upload']['webhooks']
+        self.lease_seconds = lease_seconds
+        self.url_cache_seconds = url_cache_seconds
+        self.logger = logger if logger is not None else logging.getLogger('OCRR')
+
+        # Client id -> (webhook url, time it was read)
+        self._url_cache = {}
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def get_webhook_url(self, client_id: str) -> str:
+        # Get the webhook URL of a client, cached for url_cache_seconds
+        cached = self._url_cache.get(client_id)
+        if cached is not None and time.monotonic() - cached[1] < self.url_cache_seconds:
+            return cached[0]
+        webhook = self.collection_webhooks.find_one({"clientId": client_id}, {"url": 1})
+        webhook_url = webhook['url'] if webhook is not None else None
+        self._url_cache[client_id] = (webhook_url, time.monotonic())
+        return webhook_url
+
+    def enqueue(self, payload: dict) -> bool:
+        """
+        Record a webhook notification for the client of the payload.
+
+        The entry is batched; it is written with the next flush of the status batcher.
+
+        :param payload: Webhook body with at least 'taskId' and 'clientId'.
+        :return: False if the client has no registered webhook.
+        """
+        webhook_url = self.get_webhook_url(payload['clientId'])
+        if webhook_url is None:
+            return False
+        now = self._now()
+        get_status_batcher().insert_one('ocrrworkspace', 'webhook_outbox', {
+            "taskId": payload['taskId'],
+            "clientId": payload['clientId'],
+            "url": webhook_url,
+            "payload": payload,
+            "status": "PENDING",
+            "attempts": 0,
+            "nextAttemptAt": now,
+            "createdAt": now,
+            "updatedAt": now
+        })
+        return True
+
+    def claim_next(self, exclude_clients: list = None) -> dict:
+        """
+        Claim the next due entry: 'PENDING' and due, or 'SENDING' with an expired lease.
+
+        :param exclude_clients: Client ids which must not be claimed (e.g. at their concurrency cap).
+        :return: The claimed entry, or None if no entry is due.
+        """
+        now = self._now()
+        claim_filter = {"$or": [
+            {"status": "PENDING", "nextAttemptAt": {"$lte": now}},
+            {"status": "SENDING", "leaseExpiresAt": {"$lt": now}}
+        ]}
+        if exclude_clients:
+            claim_filter = {"$and": [claim_filter, {"clientId": {"$nin": list(exclude_clients)}}]}
+        return self.collection_outbox.find_one_and_update(
+            claim_filter,
+            {"$set": {"status": "SENDING", "leaseExpiresAt": now + datetime.timedelta(seconds=self.lease_seconds), "updatedAt": now},
+             "$inc": {"attempts": 1}},
+            sort=[("nextAttemptAt", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def mark_delivered(self, entry: dict) -> None:
+        self.collection_outbox.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"status": "DELIVERED", "deliveredAt": self._now(), "updatedAt": self._now()}, "$unset": {"leaseExpiresAt": ""}}
+        )
+
+    def mark_retry(self, entry: dict, error: str, delay_seconds: float) -> None:
+        self.collection_outbox.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"status": "PENDING", "lastError": error, "updatedAt": self._now(),
+                      "nextAttemptAt": self._now() + datetime.timedelta(seconds=delay_seconds)},
+             "$unset": {"leaseExpiresAt": ""}}
+        )
+
+    def mark_failed(self, entry: dict, error: str) -> None:
+        self.collection_outbox.update_one(
+            {"_id": entry["_id"]},
+            {"$set": {"status": "FAILED", "lastError": error, "updatedAt": self._now()}, "$unset": {"leaseExpiresAt": ""}}
+        )
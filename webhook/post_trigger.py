@@ -4,21 +4,30 @@
     Attributes:
         url (str): The base URL to which the POST request will be sent.
         payload_data (dict): The payload data to be included in the POST request body.
+        session (requests.Session): Optional session whose keep-alive connections are reused.
+        timeout (tuple): (connect, read) timeout in seconds.
 
     Methods:
         send_post() -> bool:
             Sends a POST request to the specified URL with the payload data.
             Returns True if the request is successful (status code 200), otherwise False.
+            Connection errors and timeouts are raised as requests.RequestException.
 """
 
 import json
 import requests
 
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+
 class WebhookPostTrigger:
-    def __init__(self, url, payload_data: dict) -> None:
+    def __init__(self, url, payload_data: dict, session: requests.Session = None, timeout: tuple = DEFAULT_TIMEOUT) -> None:
         self.url = url
         self.payload_data = payload_data
-    
+        self.session = session
+        self.timeout = timeout
+        self.status_code = None
+
     def send_post(self) -> bool:
         """
         Sends a POST request to the webhook URL with the payload data.
@@ -28,7 +37,9 @@ class WebhookPostTrigger:
         """
         url = f"{self.url}/CVCore/processstatus"
         headers = {'Content-Type': 'application/json'}
-        response = requests.post(url, data=json.dumps(self.payload_data) ,headers=headers)
+        http = self.session if self.session is not None else requests
+        response = http.post(url, data=json.dumps(self.payload_data), headers=headers, timeout=self.timeout)
+        self.status_code = response.status_code
         if response.status_code == 200:
             return True
         else: